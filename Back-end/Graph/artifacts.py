@@ -0,0 +1,140 @@
+import json
+import os
+import re
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+class ArtifactWriter:
+    """
+    Writes the files of one new artifact version into a staging directory
+    Nothing is visible to readers until commit
+    """
+    def __init__(self, store, version):
+        self.store = store
+        self.version = version
+        self.directory = store.version_directory(version) + ".tmp"
+        self.entries = {}
+        os.makedirs(self.directory)
+
+    def write_table(self, name, frame):
+        """Write a DataFrame as a compressed Parquet file."""
+        file_name = f"{name}.parquet"
+        frame.to_parquet(os.path.join(self.directory, file_name), compression=self.store.compression, index=False)
+        self.entries[name] = {"file": file_name, "format": "parquet", "rows": len(frame), "columns": list(frame.columns)}
+
+    def write_array_blocks(self, name, blocks, shape, dtype=np.float32):
+        """Write an array given as consecutive row blocks to a .npy file, without holding it in memory."""
+        file_name = f"{name}.npy"
+        array = np.lib.format.open_memmap(os.path.join(self.directory, file_name), mode="w+", dtype=dtype, shape=shape)
+        row = 0
+        for block in blocks:
+            array[row:row + len(block)] = block
+            row += len(block)
+        array.flush()
+        del array
+        self.entries[name] = {"file": file_name, "format": "npy", "shape": list(shape), "dtype": np.dtype(dtype).name}
+
+    def commit(self, inputs, parameters):
+        """Write the manifest and make this version the current one, returns the version."""
+        manifest = {
+            "version": self.version,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "inputs": inputs,
+            "parameters": parameters,
+            "artifacts": self.entries
+        }
+        with open(os.path.join(self.directory, "manifest.json"), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        os.replace(self.directory, self.store.version_directory(self.version))
+        self.store.set_current(self.version)
+        self.store.prune()
+        return self.version
+
+    def abort(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+class ArtifactStore:
+    """
+    Versioned outputs of the graph pipeline (chunks, edges, communities, embeddings)
+    Each version is a directory v000001, v000002, ... holding Parquet tables (zstd-compressed),
+    .npy arrays and a manifest.json with the input document hashes and pipeline parameters.
+    The CURRENT file names the version readers get, tables can be read column by column and
+    arrays are memory-mapped
+    """
+    def __init__(self, directory, keep_versions=3, compression="zstd"):
+        self.directory = directory
+        self.keep_versions = keep_versions
+        self.compression = compression
+        self.current_path = os.path.join(directory, "CURRENT")
+        os.makedirs(directory, exist_ok=True)
+
+    def version_directory(self, version):
+        return os.path.join(self.directory, f"v{version:06d}")
+
+    def versions(self):
+        """Committed versions, oldest first."""
+        return sorted(
+            int(match.group(1)) for match in map(re.compile(r"^v(\d+)$").match, os.listdir(self.directory)) if match
+        )
+
+    def current_version(self):
+        if not os.path.exists(self.current_path):
+            return None
+        with open(self.current_path) as f:
+            return int(f.read().strip())
+
+    def set_current(self, version):
+        temporary_path = self.current_path + ".tmp"
+        with open(temporary_path, "w") as f:
+            f.write(str(version))
+        os.replace(temporary_path, self.current_path)
+
+    def begin(self):
+        """Start writing a new version, see ArtifactWriter."""
+        # Staging directories left by interrupted runs are never committed
+        for name in os.listdir(self.directory):
+            if name.endswith(".tmp") and name.startswith("v"):
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+        versions = self.versions()
+        return ArtifactWriter(self, (versions[-1] if versions else 0) + 1)
+
+    def manifest(self, version=None):
+        """Manifest of a version (the current one by default), None if there is no such version."""
+        version = self.current_version() if version is None else version
+        if version is None:
+            return None
+        path = os.path.join(self.version_directory(version), "manifest.json")
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def read_table(self, name, columns=None, version=None):
+        """Read a table, only the given columns when columns is set."""
+        manifest = self._require_manifest(version)
+        entry = manifest["artifacts"][name]
+        return pd.read_parquet(os.path.join(self.version_directory(manifest["version"]), entry["file"]), columns=columns)
+
+    def load_array(self, name, version=None, mmap=True):
+        """Load an array, memory-mapped unless mmap is False."""
+        manifest = self._require_manifest(version)
+        entry = manifest["artifacts"][name]
+        path = os.path.join(self.version_directory(manifest["version"]), entry["file"])
+        return np.load(path, mmap_mode="r" if mmap else None)
+
+    def prune(self):
+        """Remove the oldest versions beyond keep_versions, never the current one."""
+        current = self.current_version()
+        for version in self.versions()[:-self.keep_versions]:
+            if version != current:
+                shutil.rmtree(self.version_directory(version), ignore_errors=True)
+
+    def _require_manifest(self, version):
+        manifest = self.manifest(version)
+        if manifest is None:
+            raise FileNotFoundError(f"No artifact version {version if version is not None else 'committed'} in {self.directory}")
+        return manifest
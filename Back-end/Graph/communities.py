@@ -0,0 +1,65 @@
+import time
+
+import networkx as nx
+
+COMMUNITY_METHODS = ("louvain", "label_propagation", "girvan_newman")
+
+class CommunityTimeout(Exception):
+    pass
+
+# Communities with the most modularity found by the Louvain method, using edge weights.
+# The same seed gives the same communities
+def louvain_communities(G, weight="weight", seed=0, resolution=1.0):
+    return nx.community.louvain_communities(G, weight=weight, resolution=resolution, seed=seed)
+
+# Communities found by asynchronous label propagation, using edge weights.
+# The same seed gives the same communities
+def label_propagation_communities(G, weight="weight", seed=0):
+    return nx.community.asyn_lpa_communities(G, weight=weight, seed=seed)
+
+# Girvan–Newman communities after up to levels splits, only meant for small graphs.
+# Splitting stops at the last level completed within time_budget seconds, None if no level completed
+def girvan_newman_communities(G, levels=2, time_budget=30.0):
+    deadline = time.monotonic() + time_budget
+
+    # Same edge choice as the NetworkX default, checking the time budget before each betweenness pass
+    def most_valuable_edge(graph):
+        if time.monotonic() > deadline:
+            raise CommunityTimeout()
+        if graph.number_of_edges() == 0:
+            return None
+        betweenness = nx.edge_betweenness_centrality(graph)
+        return max(betweenness, key=betweenness.get)
+
+    communities = None
+    try:
+        for level, split in enumerate(nx.community.girvan_newman(G, most_valuable_edge), start=1):
+            communities = split
+            if level == levels:
+                break
+    except CommunityTimeout:
+        print(f"Girvan-Newman stopped after its {time_budget}s time budget")
+    return communities
+
+# Detect the communities of G with one of COMMUNITY_METHODS, as sorted lists of nodes.
+# Girvan–Newman falls back to Louvain when not even one level fits in the time budget
+def detect_communities(G, method="louvain", weight="weight", seed=0, resolution=1.0, levels=2, time_budget=30.0):
+    if G.number_of_nodes() == 0:
+        return []
+
+    started = time.time()
+    if method == "louvain":
+        communities = louvain_communities(G, weight, seed, resolution)
+    elif method == "label_propagation":
+        communities = label_propagation_communities(G, weight, seed)
+    elif method == "girvan_newman":
+        communities = girvan_newman_communities(G, levels, time_budget)
+        if communities is None:
+            print("Girvan-Newman did not complete a level in time, using Louvain instead")
+            communities = louvain_communities(G, weight, seed, resolution)
+    else:
+        raise ValueError(f"Unknown community detection method {method}, expected one of {COMMUNITY_METHODS}")
+
+    communities = sorted(map(sorted, communities))
+    print(f"Found {len(communities)} communities with {method} in {time.time() - started:.2f}s")
+    return communities
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+
+def chunk_hash(text):
+    """Hex SHA-256 digest of a chunk's text, the key of its embedding."""
+    # Hex keeps the digest free of NUL bytes, which fixed-width NumPy byte strings would strip
+    return hashlib.sha256(text.encode("utf-8")).hexdigest().encode("ascii")
+
+class EmbeddingStore:
+    """
+    Persistent embeddings keyed by (model name, chunk text hash)
+    Each model gets its own directory containing:
+    - vectors.f32: float32 rows in insertion order, memory-mapped for reading
+    - index.npy: text hashes, entry i is the key of row i
+    - meta.json: model name and embedding dimension
+    """
+    def __init__(self, directory, model_name):
+        self.model_name = model_name
+        self.directory = os.path.join(directory, re.sub(r"[^\w.-]", "_", model_name))
+        self.vectors_path = os.path.join(self.directory, "vectors.f32")
+        self.index_path = os.path.join(self.directory, "index.npy")
+        self.meta_path = os.path.join(self.directory, "meta.json")
+        os.makedirs(self.directory, exist_ok=True)
+
+        self.dimension = None
+        self.keys = np.empty(0, dtype="S64")
+        if os.path.exists(self.meta_path) and os.path.exists(self.index_path):
+            with open(self.meta_path) as f:
+                self.dimension = json.load(f)["dimension"]
+            self.keys = np.load(self.index_path)
+
+            # Drop rows appended by a run that stopped before its index was saved
+            expected_size = len(self.keys) * self.dimension * 4
+            actual_size = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+            if actual_size > expected_size:
+                with open(self.vectors_path, "r+b") as f:
+                    f.truncate(expected_size)
+            elif actual_size < expected_size:
+                # Interrupted garbage collection, start over rather than serve wrong vectors
+                print(f"Embedding store {self.directory} is inconsistent, discarding it")
+                self.keys = np.empty(0, dtype="S64")
+                open(self.vectors_path, "wb").close()
+                self._save_index(self.keys)
+
+        self.rows = {key: row for row, key in enumerate(self.keys.tolist())}
+        self._vectors = None
+
+    def __len__(self):
+        return len(self.keys)
+
+    def vectors(self):
+        """Memory-mapped (rows, dimension) matrix of all stored embeddings."""
+        if self._vectors is None and len(self.keys):
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r",
+                                      shape=(len(self.keys), self.dimension))
+        return self._vectors
+
+    def get_many(self, texts):
+        """Get the stored embedding of each text, None for texts that were never embedded."""
+        vectors = self.vectors()
+        found = []
+        for text in texts:
+            row = self.rows.get(chunk_hash(text))
+            found.append(np.array(vectors[row]) if row is not None else None)
+        return found
+
+    def put_many(self, texts, embeddings):
+        """Store the embeddings of texts, texts already stored are skipped."""
+        new_keys = []
+        new_vectors = []
+        for text, embedding in zip(texts, embeddings):
+            key = chunk_hash(text)
+            if key in self.rows or embedding is None:
+                continue
+            self.rows[key] = len(self.keys) + len(new_keys)
+            new_keys.append(key)
+            new_vectors.append(embedding)
+        if not new_keys:
+            return 0
+
+        new_vectors = np.asarray(new_vectors, dtype=np.float32)
+        if self.dimension is None:
+            self.dimension = new_vectors.shape[1]
+            self._save_meta()
+        elif new_vectors.shape[1] != self.dimension:
+            raise ValueError(f"Expected {self.dimension}-dimensional embeddings for {self.model_name}")
+
+        # Append the vectors first, the index is only replaced once they are on disk
+        with open(self.vectors_path, "ab") as f:
+            f.write(new_vectors.tobytes())
+        self.keys = np.concatenate([self.keys, np.array(new_keys, dtype="S64")])
+        self._save_index(self.keys)
+        self._vectors = None
+        return len(new_keys)
+
+    def gc(self, live_texts):
+        """Remove the embeddings of chunks that are not in live_texts, returns how many were removed."""
+        live_keys = {chunk_hash(text) for text in live_texts}
+        keep = np.array([key in live_keys for key in self.keys.tolist()], dtype=bool)
+        removed = int(len(keep) - keep.sum())
+        if removed == 0:
+            return 0
+
+        # Rewrite the kept rows into a new file in blocks, then swap it in
+        vectors = self.vectors()
+        temporary_path = self.vectors_path + ".tmp"
+        with open(temporary_path, "wb") as f:
+            for start in range(0, len(keep), 65536):
+                block_keep = keep[start:start + 65536]
+                f.write(np.ascontiguousarray(vectors[start:start + 65536][block_keep]).tobytes())
+        self._vectors = None
+        del vectors
+        os.replace(temporary_path, self.vectors_path)
+
+        self.keys = self.keys[keep]
+        self._save_index(self.keys)
+        self.rows = {key: row for row, key in enumerate(self.keys.tolist())}
+        return removed
+
+    def _save_index(self, keys):
+        temporary_path = self.index_path + ".tmp.npy"
+        np.save(temporary_path, keys)
+        os.replace(temporary_path, self.index_path)
+
+    def _save_meta(self):
+        with open(self.meta_path, "w") as f:
+            json.dump({"model": self.model_name, "dimension": self.dimension}, f)
@@ -1,178 +1,376 @@
 import os
+import time
 import numpy as np
 import pandas as pd
 import random
 import networkx as nx
 import seaborn as sns
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pyvis.network import Network
-from sklearn.metrics.pairwise import cosine_similarity
-from langchain_community.document_loaders.pdf import PyPDFDirectoryLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.embeddings import OllamaEmbeddings
 import matplotlib.colors as mcolors
+from embedding_store import EmbeddingStore
+from ingest import find_pdfs, stream_pdf_chunks, stream_pdf_files
+from artifacts import ArtifactStore
+from graph_state import GraphState, CHUNK_COLUMNS, empty_chunks, empty_edges, hash_documents
+from similarity import similarity_join, similarity_top_k
+from communities import COMMUNITY_METHODS, detect_communities
+from layout import compute_layout, save_graph_payload
 
-# Convert documents to a DataFrame format
+# Stages of a build, in order, as reported to the progress callback of generate_save_html_graph
+# ("load" is the fetching of the documents, done before the pipeline by the job runner)
+BUILD_STAGES = ("load", "split", "embed", "similarity", "communities", "render")
+
+# Report the start of a build stage with optional details (counts) to a progress callback
+def report_progress(progress, stage, **details):
+    if progress is not None:
+        progress(stage, details)
+
+# Convert documents (any iterable, e.g. the chunk stream) to a DataFrame format, one column at a time
 def documents2Dataframe(docs):
-    df = pd.DataFrame(columns=["page_content", "source", "page"])
+    page_content, source, page = [], [], []
     for doc in docs:
-        source = doc.metadata.get("source", "")
-        page = doc.metadata.get("page", 0)
-        df = pd.concat([df, pd.DataFrame([{
-            "page_content": doc.page_content,
-            "source": source,
-            "page": page
-        }])], ignore_index=True)
-    return df
+        page_content.append(doc.page_content)
+        source.append(doc.metadata.get("source", ""))
+        page.append(doc.metadata.get("page", 0))
+    return pd.DataFrame({"page_content": page_content, "source": source, "page": page},
+                        columns=["page_content", "source", "page"])
 
-# Generate graph from DataFrame using embeddings and similarity
-def df2Graph(df, model, similarity_threshold=0.8):
-    # Get embeddings for all text chunks
-    embeddings = []
-    for _, row in df.iterrows():
+# Embed a single chunk, retrying with backoff before giving up
+def embed_chunk(text, model, max_retries=2):
+    for attempt in range(max_retries + 1):
         try:
-            embedding = model.embed_query(row["page_content"])
-            embeddings.append(embedding)
+            return model.embed_query(text)
         except Exception as e:
-            print(f"Error embedding text: {e}")
-            embeddings.append(None)
-    
-    # Calculate similarity matrix
-    valid_indices = [i for i, e in enumerate(embeddings) if e is not None]
-    valid_embeddings = [embeddings[i] for i in valid_indices]
+            if attempt == max_retries:
+                print(f"Error embedding text: {e}")
+                return None
+            time.sleep(0.5 * 2 ** attempt)
+
+# Embed one batch of chunks, falling back to chunk by chunk if the batch request fails
+def embed_batch(texts, model, max_retries=2):
+    try:
+        embeddings = model.embed_documents(texts)
+        if len(embeddings) == len(texts):
+            return embeddings
+        print(f"Batch returned {len(embeddings)} embeddings for {len(texts)} chunks, retrying individually")
+    except Exception as e:
+        print(f"Error embedding batch, retrying individually: {e}")
+    return [embed_chunk(text, model, max_retries) for text in texts]
+
+# Embed texts in batches with a bounded number of concurrent requests to the embedding server
+def embed_chunks(texts, model, batch_size=64, max_in_flight=4, max_retries=2):
+    embeddings = [None] * len(texts)
+    if not texts:
+        return embeddings
+
+    starts = range(0, len(texts), batch_size)
+    done = 0
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        futures = {
+            executor.submit(embed_batch, texts[start:start + batch_size], model, max_retries): start
+            for start in starts
+        }
+        for batches_done, future in enumerate(as_completed(futures), start=1):
+            start = futures[future]
+            batch_embeddings = future.result()
+            embeddings[start:start + len(batch_embeddings)] = batch_embeddings
+            done += len(batch_embeddings)
+            if batches_done % 10 == 0 or batches_done == len(futures):
+                elapsed = max(time.time() - started, 1e-9)
+                print(f"Embedded {done}/{len(texts)} chunks ({done / elapsed:.1f} chunks/s)")
+
+    return embeddings
+
+# Embeddings of every chunk of a DataFrame, reusing the stored embeddings of chunks that were already
+# embedded and storing the new ones. Chunks that could not be embedded get None
+def embed_dataframe(df, model, embedding_store=None, batch_size=64, max_in_flight=4):
+    texts = df["page_content"].tolist()
+    embeddings = embedding_store.get_many(texts) if embedding_store is not None else [None] * len(texts)
+    missing = [i for i, e in enumerate(embeddings) if e is None]
+    if embedding_store is not None:
+        print(f"Reusing {len(texts) - len(missing)} stored embeddings, embedding {len(missing)} chunks")
+
+    # Get embeddings for the remaining text chunks
+    missing_embeddings = embed_chunks([texts[i] for i in missing], model, batch_size, max_in_flight)
+    for i, embedding in zip(missing, missing_embeddings):
+        embeddings[i] = embedding
+
+    if embedding_store is not None:
+        embedding_store.put_many([texts[i] for i in missing], [embeddings[i] for i in missing])
+    return embeddings
+
+# Positions and float32 matrix of the chunks that could be embedded
+def valid_embeddings(embeddings):
+    valid_indices = np.array([i for i, e in enumerate(embeddings) if e is not None], dtype=np.int64)
+    if len(valid_indices) == 0:
+        return valid_indices, None
+    return valid_indices, np.asarray([embeddings[i] for i in valid_indices], dtype=np.float32)
+
+# Generate graph from DataFrame using embeddings and similarity
+# similarity_mode is "exact" (all pairs above the threshold) or "ann"/"knn" (the top_k most
+# similar chunks of each chunk above the threshold, approximate with faiss for "ann").
+# Returns the edges as columns of arrays
+def df2Graph(df, model, similarity_threshold=0.8, embedding_store=None, batch_size=64, max_in_flight=4,
+             similarity_mode="exact", top_k=10, block_size=2048, progress=None):
+    report_progress(progress, "embed", chunks=len(df))
+    embeddings = embed_dataframe(df, model, embedding_store, batch_size, max_in_flight)
     
-    if not valid_embeddings:
-        return []
+    # Only chunks that could be embedded take part in the similarity join
+    valid_indices, vectors = valid_embeddings(embeddings)
     
-    similarity_matrix = cosine_similarity(valid_embeddings)
+    if len(valid_indices) == 0:
+        return empty_concepts()
     
-    # Build concept graph from similarity
-    concepts_list = []
-    for i in range(len(valid_indices)):
-        source_idx = valid_indices[i]
-        source_text = df.iloc[source_idx]["page_content"]
-        source_doc = df.iloc[source_idx]["source"]
-        
-        for j in range(i + 1, len(valid_indices)):
-            target_idx = valid_indices[j]
-            similarity = similarity_matrix[i][j]
-            
-            if similarity >= similarity_threshold:
-                target_text = df.iloc[target_idx]["page_content"]
-                target_doc = df.iloc[target_idx]["source"]
-                
-                # Create a shorter representation for nodes
-                source_short = " ".join(source_text.split()[:5]) + "..."
-                target_short = " ".join(target_text.split()[:5]) + "..."
-                
-                concepts_list.append({
-                    "source": source_short,
-                    "target": target_short,
-                    "source_doc": source_doc,
-                    "target_doc": target_doc,
-                    "similarity": similarity,
-                    "relationship": f"Similarity: {similarity:.2f}"
-                })
+    report_progress(progress, "similarity", chunks=len(valid_indices))
+    # Threshold join in bounded-memory tiles, or top-k neighbours per chunk
+    if similarity_mode == "exact":
+        sources, targets, similarities = similarity_join(vectors, similarity_threshold, block_size)
+    else:
+        sources, targets, similarities = similarity_top_k(
+            vectors, top_k, similarity_threshold, similarity_mode, block_size
+        )
+    return edges2Concepts(df, valid_indices[sources], valid_indices[targets], similarities)
+
+# Edge columns between chunks given by their row positions in df
+def edges2Concepts(df, sources, targets, similarities):
+    # Create a shorter representation for nodes, once per chunk rather than once per edge
+    short_texts = np.array([" ".join(text.split()[:5]) + "..." for text in df["page_content"]], dtype=object)
+    documents = df["source"].to_numpy()
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    similarities = np.asarray(similarities, dtype=np.float64)
     
-    return concepts_list
+    return {
+        "source": short_texts[sources],
+        "target": short_texts[targets],
+        "source_chunk": sources,
+        "target_chunk": targets,
+        "source_doc": documents[sources],
+        "target_doc": documents[targets],
+        "similarity": similarities,
+        "relationship": np.char.mod("Similarity: %.2f", similarities).astype(object)
+    }
+
+# Update the chunk table and edge list of the previous run with the PDFs that were added, changed or
+# removed since, keeping the state in state_directory. Only the new chunks are parsed, embedded and
+# compared, against each other and against the existing chunks, so the edges are the same as a full
+# rebuild with similarity_join. Without a previous state (or with other parameters) everything is built.
+# Returns the chunk DataFrame (with a stable chunk_id column) and the edge columns like df2Graph
+def update_graph_incremental(input_directory, state_directory, model, model_name, embedding_store=None,
+                             similarity_threshold=0.8, chunk_size=1500, chunk_overlap=150,
+                             batch_size=64, max_in_flight=4, block_size=2048, progress=None):
+    parameters = {
+        "model": model_name,
+        "similarity_threshold": similarity_threshold,
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap
+    }
+    graph_state = GraphState(state_directory)
+    state = graph_state.load()
+    if state is not None and state["parameters"] != parameters:
+        print("Pipeline parameters changed since the last run, rebuilding the graph")
+        state = None
+    if state is None:
+        state = {"version": None, "documents": {}, "next_chunk_id": 0, "chunks": empty_chunks(), "edges": empty_edges()}
+
+    previous_documents = state["documents"]
+    documents = hash_documents(find_pdfs(input_directory), previous_documents)
+    removed = {
+        path for path, known in previous_documents.items()
+        if path not in documents or documents[path]["sha256"] != known["sha256"]
+    }
+    added = [path for path in documents if path not in previous_documents or path in removed]
+    print(f"{len(added)} new or changed documents, {len(removed - set(documents))} removed documents")
 
-# Convert graph data to DataFrame format
-def graph2Df(concepts_list):
-    if not concepts_list:
+    # Drop the chunks of removed or changed documents and every edge touching them
+    chunks = state["chunks"]
+    chunks = chunks[~chunks["source"].isin(removed)].reset_index(drop=True)
+    edges = state["edges"]
+    kept_ids = chunks["chunk_id"].to_numpy()
+    keep = np.isin(edges["source_chunk_id"], kept_ids) & np.isin(edges["target_chunk_id"], kept_ids)
+    edges = {name: values[keep] for name, values in edges.items()}
+
+    # Parse, split and embed the new documents only
+    report_progress(progress, "split", documents=len(added))
+    failed_paths = []
+    new_chunks = documents2Dataframe(
+        stream_pdf_files(added, chunk_size=chunk_size, chunk_overlap=chunk_overlap, failed_paths=failed_paths)
+    )
+    # Documents that could not be parsed are left out of the manifest, so the next run retries them
+    for path in failed_paths:
+        del documents[path]
+    next_chunk_id = state["next_chunk_id"]
+    new_chunks.insert(0, "chunk_id", np.arange(next_chunk_id, next_chunk_id + len(new_chunks), dtype=np.int64))
+    next_chunk_id += len(new_chunks)
+
+    report_progress(progress, "embed", chunks=len(new_chunks))
+    new_indices, new_vectors = valid_embeddings(
+        embed_dataframe(new_chunks, model, embedding_store, batch_size, max_in_flight)
+    )
+    if new_vectors is not None:
+        # New chunks against each other, then against the chunks kept from the previous run
+        report_progress(progress, "similarity", chunks=len(new_indices))
+        new_ids = new_chunks["chunk_id"].to_numpy()[new_indices]
+        sources, targets, similarities = similarity_join(new_vectors, similarity_threshold, block_size)
+        source_ids, target_ids, similarity_parts = [new_ids[sources]], [new_ids[targets]], [similarities]
+
+        old_indices, old_vectors = valid_embeddings(
+            embed_dataframe(chunks, model, embedding_store, batch_size, max_in_flight)
+        )
+        if old_vectors is not None:
+            old_ids = chunks["chunk_id"].to_numpy()[old_indices]
+            sources, targets, similarities = similarity_join(
+                new_vectors, similarity_threshold, block_size, other=old_vectors
+            )
+            source_ids.append(new_ids[sources])
+            target_ids.append(old_ids[targets])
+            similarity_parts.append(similarities)
+
+        edges = {
+            "source_chunk_id": np.concatenate([edges["source_chunk_id"]] + source_ids),
+            "target_chunk_id": np.concatenate([edges["target_chunk_id"]] + target_ids),
+            "similarity": np.concatenate([edges["similarity"]] + [p.astype(np.float64) for p in similarity_parts])
+        }
+        print(f"Patched the graph with {sum(len(p) for p in similarity_parts)} new edges")
+
+    chunks = pd.concat([chunks, new_chunks], ignore_index=True)[CHUNK_COLUMNS]
+    chunks = chunks.astype({"chunk_id": np.int64, "page": np.int64})
+    graph_state.save(chunks, edges, documents, parameters, next_chunk_id, state["version"])
+
+    # Edges refer to chunks by ID, the concept columns by row position
+    positions = pd.Index(chunks["chunk_id"])
+    concepts = edges2Concepts(
+        chunks,
+        positions.get_indexer(edges["source_chunk_id"]),
+        positions.get_indexer(edges["target_chunk_id"]),
+        edges["similarity"]
+    )
+    return chunks, concepts
+
+# Edge columns of a graph without edges
+def empty_concepts():
+    return {
+        "source": np.empty(0, dtype=object),
+        "target": np.empty(0, dtype=object),
+        "source_chunk": np.empty(0, dtype=np.int64),
+        "target_chunk": np.empty(0, dtype=np.int64),
+        "source_doc": np.empty(0, dtype=object),
+        "target_doc": np.empty(0, dtype=object),
+        "similarity": np.empty(0, dtype=np.float64),
+        "relationship": np.empty(0, dtype=object)
+    }
+
+# Convert graph data (edge columns from df2Graph) to DataFrame format
+def graph2Df(concepts):
+    concepts = pd.DataFrame(concepts)
+    if concepts.empty:
         return pd.DataFrame(columns=["node_1", "node_2", "edge", "weight"])
     
-    df = pd.DataFrame(columns=["node_1", "node_2", "edge", "weight"])
-    for concept in concepts_list:
-        df = pd.concat([df, pd.DataFrame([{
-            "node_1": concept["source"],
-            "node_2": concept["target"],
-            "edge": concept["relationship"],
-            "weight": concept["similarity"]
-        }])], ignore_index=True)
-    return df
+    return pd.DataFrame({
+        "node_1": concepts["source"].to_numpy(),
+        "node_2": concepts["target"].to_numpy(),
+        "edge": concepts["relationship"].to_numpy(),
+        "weight": concepts["similarity"].to_numpy()
+    })
 
 # Assign colors to community clusters
 def colors2Community(communities):
     # Get a list of distinct colors
     color_list = list(mcolors.TABLEAU_COLORS.values())
+    communities = [list(community) for community in communities]
     
-    # Extend color list if needed
-    while len(color_list) < len(communities):
-        color_list.extend(mcolors.TABLEAU_COLORS.values())
+    # One row per node, built from flat columns instead of one frame per row
+    sizes = np.array([len(community) for community in communities], dtype=np.int64)
+    groups = np.repeat(np.arange(len(communities), dtype=np.int64), sizes)
+    colors = np.array(color_list, dtype=object)[groups % len(color_list)]
+    nodes = [node for community in communities for node in community]
     
-    df = pd.DataFrame(columns=["node", "group", "color"])
-    
-    for i, community in enumerate(communities):
-        color = color_list[i % len(color_list)]
-        for node in community:
-            df = pd.concat([df, pd.DataFrame([{
-                "node": node,
-                "group": i, 
-                "color": color
-            }])], ignore_index=True)
-    
-    return df
-
-def generate_save_html_graph(input_directory, output_path):
-    outputdirectory = os.path.join("knowledge_graph", "data_output")
-    loader = PyPDFDirectoryLoader(input_directory)
-    documents = loader.load()
-
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1500,
-        chunk_overlap=150,
-        length_function=len,
-        is_separator_regex=False,
-    )
-    pages = splitter.split_documents(documents)
-    df = documents2Dataframe(pages)
+    return pd.DataFrame({"node": nodes, "group": groups, "color": colors}, columns=["node", "group", "color"])
 
-    model = OllamaEmbeddings(model="nomic-embed-text")
-    regenerate = True
+# Build the NetworkX graph of an edge DataFrame (node_1, node_2, edge, weight) in bulk,
+# the similarity of each edge is its weight
+def build_networkx_graph(dfg):
+    G = nx.Graph()
+    nodes = pd.concat([dfg['node_1'], dfg['node_2']], axis=0).unique()
+    G.add_nodes_from(str(node) for node in nodes)
+    G.add_edges_from(
+        (str(node_1), str(node_2), {"title": edge, "weight": float(weight)})
+        for node_1, node_2, edge, weight in zip(dfg["node_1"], dfg["node_2"], dfg["edge"], dfg["weight"])
+    )
+    return G
 
-    if regenerate:
-        print("Computing embeddings and building graph...")
-        concepts_list = df2Graph(df, model=model, similarity_threshold=0.8)
-        print("Graph construction complete.")
+# Set the community and display attributes of every node from colors2Community's output
+def add_node_attributes(G, colors):
+    degrees = dict(G.degree)
+    nx.set_node_attributes(G, {
+        node: {
+            "group": int(group),
+            "color": color,
+            "size": degrees[node] * 2 + 5,  # Scale node size based on degree
+            "font": {"color": "#36454F"},
+            "label": node,
+            "shape": "dot"
+        }
+        for node, group, color in zip(colors["node"], colors["group"], colors["color"])
+    })
 
-        dfg1 = graph2Df(concepts_list)
-        os.makedirs(outputdirectory, exist_ok=True)
-        dfg1.to_csv(os.path.join(outputdirectory, "graph.csv"), sep="|", index=False)
-        df.to_csv(os.path.join(outputdirectory, "chunks.csv"), sep="|", index=False)
-    else:
-        dfg1 = pd.read_csv(os.path.join(outputdirectory, "graph.csv"), sep="|")
+# Node table of a laid-out graph: community, display attributes, degree and position
+def layout2Df(G, positions):
+    node_ids = list(G.nodes)
+    return pd.DataFrame({
+        "node": node_ids,
+        "group": np.array([G.nodes[node].get("group", 0) for node in node_ids], dtype=np.int64),
+        "color": [G.nodes[node].get("color", "#97c2fc") for node in node_ids],
+        "size": np.array([G.nodes[node].get("size", 10) for node in node_ids], dtype=np.int64),
+        "degree": np.array([G.degree[node] for node in node_ids], dtype=np.int64),
+        "x": np.array([positions[node][0] for node in node_ids], dtype=np.float32),
+        "y": np.array([positions[node][1] for node in node_ids], dtype=np.float32)
+    }, columns=["node", "group", "color", "size", "degree", "x", "y"])
 
-    dfg1.replace("", np.nan, inplace=True)
-    dfg1.dropna(subset=["node_1", "node_2", "edge"], inplace=True)
-    dfg1['count'] = 4
+# Stored embeddings of texts in blocks of rows, NaN rows for texts that have no embedding
+def embedding_blocks(texts, embedding_store, block_size=65536):
+    for start in range(0, len(texts), block_size):
+        found = embedding_store.get_many(texts[start:start + block_size])
+        block = np.full((len(found), embedding_store.dimension), np.nan, dtype=np.float32)
+        for i, embedding in enumerate(found):
+            if embedding is not None:
+                block[i] = embedding
+        yield block
 
-    G = nx.Graph()
-    nodes = pd.concat([dfg1['node_1'], dfg1['node_2']], axis=0).unique()
-    for node in nodes:
-        G.add_node(str(node))
+# Save the chunks, edges, communities and chunk embeddings of a build as a new artifact version,
+# with the hashes of the input documents and the pipeline parameters in its manifest
+def save_artifacts(artifact_store, df, concepts, colors, embedding_store, input_directory, parameters, nodes=None):
+    previous = artifact_store.manifest()
+    inputs = hash_documents(find_pdfs(input_directory), previous["inputs"] if previous else None)
 
-    for _, row in dfg1.iterrows():
-        G.add_edge(str(row["node_1"]), str(row["node_2"]), title=row["edge"], weight=row['count'] / 4)
+    edges = graph2Df(concepts)
+    for column in ("source_chunk", "target_chunk", "source_doc", "target_doc"):
+        edges[column] = concepts[column]
 
-    communities_generator = nx.community.girvan_newman(G)
+    writer = artifact_store.begin()
     try:
-        next_level_communities = next(communities_generator)
-        next_level_communities = next(communities_generator)
-    except StopIteration:
-        next_level_communities = [list(G.nodes)]
-
-    communities = sorted(map(sorted, next_level_communities))
-    colors = colors2Community(communities)
-    
-    # Add node attributes
-    for _, row in colors.iterrows():
-        G.nodes[row['node']]['group'] = row['group']
-        G.nodes[row['node']]['color'] = row['color']
-        G.nodes[row['node']]['size'] = G.degree[row['node']] * 2 + 5  # Scale node size based on degree
-        G.nodes[row['node']]['font'] = {"color": "#36454F"}
-        G.nodes[row['node']]['label'] = row['node']
-        G.nodes[row['node']]['shape'] = "dot"
+        writer.write_table("chunks", df)
+        writer.write_table("edges", edges)
+        writer.write_table("communities", colors)
+        if nodes is not None:
+            writer.write_table("nodes", nodes)
+        if embedding_store is not None and embedding_store.dimension is not None:
+            texts = df["page_content"].tolist()
+            writer.write_array_blocks("embeddings", embedding_blocks(texts, embedding_store),
+                                      (len(texts), embedding_store.dimension))
+        version = writer.commit(inputs, parameters)
+    except Exception:
+        writer.abort()
+        raise
+    print(f"Saved artifact version {version} to {artifact_store.directory}")
+    return version
 
+# Save the graph as a self-contained pyvis HTML page that lays itself out in the browser,
+# the output of earlier versions of the pipeline
+def save_pyvis_html(G, output_path):
     # Create the network visualization
     net = Network(
         notebook=False,
@@ -292,77 +490,77 @@ def generate_save_html_graph(input_directory, output_path):
                 // Store original colors
                 var nodeColors = {JSON_COLORS};
                 
-                function neighbourhoodHighlight(params) {
-                    allNodes = nodes.get({ returnType: "Object" });
-                    if (params.nodes.length > 0) {
-                        highlightActive = true;
-                        var selectedNode = params.nodes[0];
-                        var degrees = 2;
-
-                        for (let nodeId in allNodes) {
-                            allNodes[nodeId].color = "rgba(200,200,200,0.5)";
-                            if (allNodes[nodeId].hiddenLabel === undefined) {
-                                allNodes[nodeId].hiddenLabel = allNodes[nodeId].label;
-                                allNodes[nodeId].label = undefined;
-                            }
-                        }
-                        var connectedNodes = network.getConnectedNodes(selectedNode);
-                        var allConnectedNodes = [];
-
-                        for (i = 1; i < degrees; i++) {
-                            for (j = 0; j < connectedNodes.length; j++) {
-                                allConnectedNodes = allConnectedNodes.concat(network.getConnectedNodes(connectedNodes[j]));
-                            }
-                        }
+                // Only the nodes whose highlight level changes are updated, the 2-hop neighbourhood
+                // is walked breadth-first with each node visited once
+                var highlightLevels = null;
 
-                        for (i = 0; i < allConnectedNodes.length; i++) {
-                            allNodes[allConnectedNodes[i]].color = "rgba(150,150,150,0.75)";
-                            if (allNodes[allConnectedNodes[i]].hiddenLabel !== undefined) {
-                                allNodes[allConnectedNodes[i]].label = allNodes[allConnectedNodes[i]].hiddenLabel;
-                                allNodes[allConnectedNodes[i]].hiddenLabel = undefined;
-                            }
-                        }
-
-                        for (i = 0; i < connectedNodes.length; i++) {
-                            allNodes[connectedNodes[i]].color = nodeColors[connectedNodes[i]];
-                            if (allNodes[connectedNodes[i]].hiddenLabel !== undefined) {
-                                allNodes[connectedNodes[i]].label = allNodes[connectedNodes[i]].hiddenLabel;
-                                allNodes[connectedNodes[i]].hiddenLabel = undefined;
+                function neighbourhoodLevels(selectedNode, degrees) {
+                    var levels = new Map([[selectedNode, 0]]);
+                    var frontier = [selectedNode];
+                    for (var hop = 1; hop <= degrees && frontier.length > 0; hop++) {
+                        var next = [];
+                        for (const nodeId of frontier) {
+                            for (const neighbour of network.getConnectedNodes(nodeId)) {
+                                if (!levels.has(neighbour)) {
+                                    levels.set(neighbour, hop);
+                                    next.push(neighbour);
+                                }
                             }
                         }
+                        frontier = next;
+                    }
+                    return levels;
+                }
 
-                        allNodes[selectedNode].color = nodeColors[selectedNode];
-                        if (allNodes[selectedNode].hiddenLabel !== undefined) {
-                            allNodes[selectedNode].label = allNodes[selectedNode].hiddenLabel;
-                            allNodes[selectedNode].hiddenLabel = undefined;
-                        }
-                    } else if (highlightActive === true) {
-                        for (let nodeId in allNodes) {
-                            allNodes[nodeId].color = nodeColors[nodeId];
-                            if (allNodes[nodeId].hiddenLabel !== undefined) {
-                                allNodes[nodeId].label = allNodes[nodeId].hiddenLabel;
-                                allNodes[nodeId].hiddenLabel = undefined;
-                            }
+                // Node update for a level (0 selected, 1 first degree, 2 second degree), dimmed when undefined
+                function highlightStyle(node, level) {
+                    var update = { id: node.id };
+                    if (level === undefined) {
+                        update.color = "rgba(200,200,200,0.5)";
+                        if (node.hiddenLabel === undefined) {
+                            update.hiddenLabel = node.label;
+                            update.label = undefined;
                         }
-                        highlightActive = false;
+                        return update;
+                    }
+                    update.color = level <= 1 ? nodeColors[node.id] : "rgba(150,150,150,0.75)";
+                    if (node.hiddenLabel !== undefined) {
+                        update.label = node.hiddenLabel;
+                        update.hiddenLabel = undefined;
                     }
+                    return update;
+                }
 
+                function neighbourhoodHighlight(params) {
                     var updateArray = [];
                     if (params.nodes.length > 0) {
-                        for (let nodeId in allNodes) {
-                            if (allNodes.hasOwnProperty(nodeId)) {
-                                updateArray.push(allNodes[nodeId]);
-                            }
-                        }
-                        nodes.update(updateArray);
-                    } else {
-                        for (let nodeId in allNodes) {
-                            if (allNodes.hasOwnProperty(nodeId)) {
-                                updateArray.push(allNodes[nodeId]);
-                            }
+                        var levels = neighbourhoodLevels(params.nodes[0], 2);
+                        if (highlightLevels === null) {
+                            // Entering the highlight dims every other node once
+                            nodes.forEach(function (node) {
+                                updateArray.push(highlightStyle(node, levels.get(node.id)));
+                            });
+                        } else {
+                            var changed = new Set();
+                            highlightLevels.forEach(function (level, nodeId) {
+                                if (levels.get(nodeId) !== level) changed.add(nodeId);
+                            });
+                            levels.forEach(function (level, nodeId) {
+                                if (highlightLevels.get(nodeId) !== level) changed.add(nodeId);
+                            });
+                            changed.forEach(function (nodeId) {
+                                updateArray.push(highlightStyle(nodes.get(nodeId), levels.get(nodeId)));
+                            });
                         }
-                        nodes.update(updateArray);
+                        highlightLevels = levels;
+                    } else if (highlightLevels !== null) {
+                        // reset all nodes
+                        nodes.forEach(function (node) {
+                            updateArray.push(highlightStyle(node, 0));
+                        });
+                        highlightLevels = null;
                     }
+                    nodes.update(updateArray);
                 }
                 
                 function selectNode(nodes) {
@@ -491,19 +689,110 @@ def generate_save_html_graph(input_directory, output_path):
     
     return output_path
 
+# With incremental=True, only the PDFs added, changed or removed since the previous incremental run
+# are processed and the stored graph is patched (see update_graph_incremental).
+# community_method is one of COMMUNITY_METHODS, Girvan–Newman is only suitable for small graphs.
+# output_format is "payload" (laid-out columnar JSON at output_path with a .json extension, for graph-payload.html),
+# "html" (self-contained pyvis page at output_path) or "both".
+# data_directory holds the embedding cache, incremental state and artifacts shared between runs;
+# progress, when given, is called with (stage, details) at the start of each of BUILD_STAGES
+def generate_save_html_graph(input_directory, output_path, incremental=False, community_method="louvain",
+                             output_format="payload", data_directory=os.path.join("knowledge_graph", "data_output"),
+                             progress=None):
+    outputdirectory = data_directory
+
+    model_name = "nomic-embed-text"
+    model = OllamaEmbeddings(model=model_name)
+    regenerate = True
+    artifact_store = ArtifactStore(os.path.join(outputdirectory, "artifacts"))
+
+    if regenerate:
+        print("Computing embeddings and building graph...")
+        # Chunks embedded by previous runs are read back instead of embedded again
+        embedding_store = EmbeddingStore(os.path.join(outputdirectory, "embeddings"), model_name)
+        if incremental:
+            df, concepts_list = update_graph_incremental(
+                input_directory, os.path.join(outputdirectory, "state"), model, model_name,
+                embedding_store=embedding_store, similarity_threshold=0.8, chunk_size=1500, chunk_overlap=150,
+                progress=progress
+            )
+        else:
+            # PDFs are parsed and split in parallel, chunks are consumed as they arrive
+            report_progress(progress, "split", documents=len(find_pdfs(input_directory)))
+            pages = stream_pdf_chunks(input_directory, chunk_size=1500, chunk_overlap=150)
+            df = documents2Dataframe(pages)
+            concepts_list = df2Graph(df, model=model, similarity_threshold=0.8, embedding_store=embedding_store,
+                                     progress=progress)
+        removed = embedding_store.gc(df["page_content"])
+        print(f"Graph construction complete ({removed} stale embeddings removed).")
+
+        dfg1 = graph2Df(concepts_list)
+    else:
+        # Only the columns needed to draw the graph are read from the last build
+        dfg1 = artifact_store.read_table("edges", columns=["node_1", "node_2", "edge", "weight"])
+
+    dfg1.replace("", np.nan, inplace=True)
+    dfg1.dropna(subset=["node_1", "node_2", "edge"], inplace=True)
+
+    G = build_networkx_graph(dfg1)
+
+    report_progress(progress, "communities", nodes=G.number_of_nodes(), edges=G.number_of_edges())
+    communities = detect_communities(G, method=community_method, weight="weight", seed=0)
+    colors = colors2Community(communities)
+
+    # Add node attributes
+    add_node_attributes(G, colors)
+
+    # Positions are computed here so the browser does not have to run the physics simulation
+    report_progress(progress, "render", communities=len(communities))
+    positions = compute_layout(G, communities, seed=0)
+
+    if regenerate:
+        save_artifacts(artifact_store, df, concepts_list, colors, embedding_store, input_directory, {
+            "model": model_name,
+            "similarity_threshold": 0.8,
+            "chunk_size": 1500,
+            "chunk_overlap": 150,
+            "community_method": community_method,
+            "incremental": incremental
+        }, nodes=layout2Df(G, positions))
+
+    payload_path = os.path.splitext(output_path)[0] + ".json"
+    if output_format in ("payload", "both"):
+        save_graph_payload(G, positions, payload_path)
+    if output_format in ("html", "both"):
+        save_pyvis_html(G, output_path)
+    
+    return payload_path if output_format == "payload" else output_path
+
 # Add a main function to make it runnable as a script
 if __name__ == "__main__":
     import sys
     
-    if len(sys.argv) < 3:
-        print("Usage: python generate_graph.py <pdf_directory> <output_html_path>")
+    arguments = [argument for argument in sys.argv[1:] if not argument.startswith("--")]
+    options = dict(argument[2:].partition("=")[::2] for argument in sys.argv[1:] if argument.startswith("--"))
+    if len(arguments) < 2:
+        print("Usage: python generate_graph.py <pdf_directory> <output_html_path> [--incremental] "
+              f"[--communities={'|'.join(COMMUNITY_METHODS)}] [--format=payload|html|both] [--data-dir=<directory>] "
+              "[--progress]")
         sys.exit(1)
     
-    pdf_directory = sys.argv[1]
-    output_html_path = sys.argv[2]
+    pdf_directory = arguments[0]
+    output_html_path = arguments[1]
     
     if not os.path.exists(pdf_directory):
         print(f"Error: PDF directory {pdf_directory} does not exist")
         sys.exit(1)
     
-    generate_save_html_graph(pdf_directory, output_html_path)
\ No newline at end of file
+    # With --progress, stages are printed as "PROGRESS {json}" lines for the job runner (build_jobs.py)
+    def print_progress(stage, details):
+        print("PROGRESS " + json.dumps({"stage": stage, **details}), flush=True)
+    
+    generate_save_html_graph(
+        pdf_directory, output_html_path,
+        incremental="incremental" in options,
+        community_method=options.get("communities") or "louvain",
+        output_format=options.get("format") or "payload",
+        data_directory=options.get("data-dir") or os.path.join("knowledge_graph", "data_output"),
+        progress=print_progress if "progress" in options else None
+    )
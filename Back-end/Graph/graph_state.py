@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+CHUNK_COLUMNS = ["chunk_id", "page_content", "source", "page"]
+
+# SHA-256 of a file's content, read in blocks
+def file_hash(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+# Describe documents by size, modification time and content hash.
+# Hashes of files whose size and modification time did not change are reused from previous
+def hash_documents(paths, previous=None):
+    previous = previous or {}
+    documents = {}
+    for path in paths:
+        stat = os.stat(path)
+        known = previous.get(path)
+        if known is not None and known["size"] == stat.st_size and known["mtime"] == stat.st_mtime:
+            documents[path] = known
+        else:
+            documents[path] = {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": file_hash(path)}
+    return documents
+
+# Chunk table without any chunk
+def empty_chunks():
+    return pd.DataFrame({
+        "chunk_id": np.empty(0, dtype=np.int64),
+        "page_content": np.empty(0, dtype=object),
+        "source": np.empty(0, dtype=object),
+        "page": np.empty(0, dtype=np.int64)
+    }, columns=CHUNK_COLUMNS)
+
+# Edge list without any edge, edges refer to chunks by chunk_id
+def empty_edges():
+    return {
+        "source_chunk_id": np.empty(0, dtype=np.int64),
+        "target_chunk_id": np.empty(0, dtype=np.int64),
+        "similarity": np.empty(0, dtype=np.float64)
+    }
+
+class GraphState:
+    """
+    Chunk table, edge list and document manifest kept between pipeline runs for incremental updates
+    Every save writes a new version of the chunk and edge files, then switches manifest.json to it,
+    so an interrupted save leaves the previous version intact
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, "manifest.json")
+
+    def load(self):
+        """Load the last saved state as a dict, None if there is none."""
+        if not os.path.exists(self.manifest_path):
+            return None
+        with open(self.manifest_path) as f:
+            manifest = json.load(f)
+
+        version = manifest["version"]
+        chunks = pd.read_json(os.path.join(self.directory, f"chunks-{version}.jsonl"),
+                              orient="records", lines=True, dtype={"page_content": object, "source": object})
+        if chunks.empty:
+            chunks = empty_chunks()
+        with np.load(os.path.join(self.directory, f"edges-{version}.npz")) as stored:
+            edges = {name: stored[name] for name in stored.files}
+
+        return {
+            "version": version,
+            "parameters": manifest["parameters"],
+            "documents": manifest["documents"],
+            "next_chunk_id": manifest["next_chunk_id"],
+            "chunks": chunks[CHUNK_COLUMNS],
+            "edges": edges
+        }
+
+    def save(self, chunks, edges, documents, parameters, next_chunk_id, previous_version=None):
+        """Save a new version of the state and remove the previous one, returns the new version."""
+        os.makedirs(self.directory, exist_ok=True)
+        version = (previous_version or 0) + 1
+
+        chunks[CHUNK_COLUMNS].to_json(os.path.join(self.directory, f"chunks-{version}.jsonl"),
+                                      orient="records", lines=True, force_ascii=False)
+        np.savez(os.path.join(self.directory, f"edges-{version}.npz"), **edges)
+
+        temporary_path = self.manifest_path + ".tmp"
+        with open(temporary_path, "w") as f:
+            json.dump({
+                "version": version,
+                "parameters": parameters,
+                "documents": documents,
+                "next_chunk_id": int(next_chunk_id)
+            }, f)
+        os.replace(temporary_path, self.manifest_path)
+
+        # The new version is live, older files are no longer referenced
+        for name in os.listdir(self.directory):
+            if name.startswith(("chunks-", "edges-")) and not name.startswith((f"chunks-{version}.", f"edges-{version}.")):
+                os.remove(os.path.join(self.directory, name))
+        return version
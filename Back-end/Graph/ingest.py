@@ -0,0 +1,112 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Find the PDF files of a directory and its subdirectories, in a stable order
+def find_pdfs(directory):
+    paths = []
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        paths.extend(
+            os.path.join(root, name) for name in files
+            if name.lower().endswith(".pdf") and not name.startswith(".")
+        )
+    return sorted(paths)
+
+# Parse one PDF and split it into chunks, runs in a worker process.
+# Returns (path, chunks, error) so a corrupt file never raises in the parent
+def load_and_split_pdf(path, chunk_size=1500, chunk_overlap=150):
+    from langchain_community.document_loaders import PyPDFLoader
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    try:
+        documents = PyPDFLoader(path).load()
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            length_function=len,
+            is_separator_regex=False,
+        )
+        return path, splitter.split_documents(documents), None
+    except Exception as e:
+        return path, None, f"{type(e).__name__}: {e}"
+
+# Yield the chunks of every PDF in a directory, parsing and splitting the files in a process pool
+def stream_pdf_chunks(directory, workers=None, max_pending=None, chunk_size=1500, chunk_overlap=150):
+    paths = find_pdfs(directory)
+    if not paths:
+        print(f"No PDF files found in {directory}")
+        return
+    yield from stream_pdf_files(paths, workers, max_pending, chunk_size, chunk_overlap)
+
+# Yield the chunks of the given PDF files, parsing and splitting them in a process pool.
+# At most max_pending files are parsed or waiting to be consumed at any time, so memory is bounded
+# by the number of workers rather than by the corpus size. Chunks come out in file order.
+# Files that cannot be parsed are logged, skipped and appended to failed_paths when it is given.
+# A worker that dies (e.g. a crash or out of memory in the PDF parser) breaks the whole pool: the
+# files that were in flight are then retried one at a time in a new pool, so only the file that
+# crashed is skipped
+def stream_pdf_files(paths, workers=None, max_pending=None, chunk_size=1500, chunk_overlap=150, failed_paths=None):
+    paths = list(paths)
+    if not paths:
+        return
+
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    max_pending = max_pending or 2 * workers
+    files_done = 0
+    chunks_done = 0
+    failed = 0
+
+    queue = deque(paths)  # Files not submitted yet, in file order
+    pending = deque()  # (path, future) in file order
+    isolated = set()  # Files in flight when the pool broke, retried on their own
+    executor = ProcessPoolExecutor(max_workers=workers)
+
+    def submit_more():
+        while queue and len(pending) < max_pending:
+            if pending and (queue[0] in isolated or pending[-1][0] in isolated):
+                break
+            try:
+                future = executor.submit(load_and_split_pdf, queue[0], chunk_size, chunk_overlap)
+            except BrokenProcessPool:
+                break  # Handled when the pending futures fail
+            pending.append((queue.popleft(), future))
+
+    try:
+        submit_more()
+        while pending:
+            path, future = pending.popleft()
+            try:
+                _, chunks, error = future.result()
+            except BrokenProcessPool as e:
+                executor.shutdown(wait=False, cancel_futures=True)
+                executor = ProcessPoolExecutor(max_workers=workers)
+                if path not in isolated:
+                    # Any of the files in flight may have crashed the worker, retry them all
+                    retried = [path] + [pending_path for pending_path, _ in pending]
+                    pending.clear()
+                    queue.extendleft(reversed(retried))
+                    isolated.update(retried)
+                    submit_more()
+                    continue
+                chunks, error = None, f"worker process died ({e})"
+            except Exception as e:
+                chunks, error = None, f"{type(e).__name__}: {e}"
+            isolated.discard(path)
+            submit_more()
+
+            files_done += 1
+            if error is not None:
+                failed += 1
+                if failed_paths is not None:
+                    failed_paths.append(path)
+                print(f"Skipping {path}: {error}")
+            else:
+                chunks_done += len(chunks)
+                yield from chunks
+
+            if files_done % 100 == 0 or files_done == len(paths):
+                print(f"Parsed {files_done}/{len(paths)} PDF files ({chunks_done} chunks, {failed} skipped)")
+    finally:
+        executor.shutdown(cancel_futures=True)
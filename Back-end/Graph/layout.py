@@ -0,0 +1,143 @@
+import json
+import math
+import os
+
+import networkx as nx
+import numpy as np
+
+NODE_SPACING = 40.0  # Roughly the distance between neighbouring nodes, in screen pixels
+SPRING_LAYOUT_MAX_NODES = 300  # Larger communities get a spectral layout, which scales to sparse graphs
+SPRING_ITERATIONS = 50
+CENTRE_SPRING_MAX_COMMUNITIES = 500  # More communities are placed on a spiral instead
+GOLDEN_ANGLE = math.pi * (3 - math.sqrt(5))
+
+# Centres of the communities: a force-directed layout of the community graph (edge weights summed
+# between communities), or a spiral with the largest communities in the middle when there are many.
+# Communities are spaced by the square root of their size so they do not overlap
+def community_centres(G, communities, seed=0):
+    sizes = np.array([len(community) for community in communities], dtype=np.float64)
+    radii = NODE_SPACING * np.sqrt(sizes)
+    if len(communities) == 1:
+        return np.zeros((1, 2)), radii
+
+    if len(communities) > CENTRE_SPRING_MAX_COMMUNITIES:
+        order = np.argsort(-sizes, kind="stable")
+        # Each community takes an area proportional to its size on the spiral
+        area = np.cumsum(sizes[order]) - sizes[order] / 2
+        distance = 2 * NODE_SPACING * np.sqrt(area)
+        angle = np.arange(len(order)) * GOLDEN_ANGLE
+        centres = np.empty((len(order), 2))
+        centres[order, 0] = distance * np.cos(angle)
+        centres[order, 1] = distance * np.sin(angle)
+        return centres, radii
+
+    membership = {node: c for c, community in enumerate(communities) for node in community}
+    community_graph = nx.Graph()
+    community_graph.add_nodes_from(range(len(communities)))
+    for u, v, weight in G.edges(data="weight", default=1.0):
+        cu, cv = membership[u], membership[v]
+        if cu != cv:
+            previous = community_graph.get_edge_data(cu, cv, {"weight": 0.0})["weight"]
+            community_graph.add_edge(cu, cv, weight=previous + weight)
+
+    positions = nx.spring_layout(community_graph, weight="weight", seed=seed)
+    centres = np.array([positions[c] for c in range(len(communities))])
+    # The spring layout fits in [-1, 1], stretch it to leave room for the largest communities
+    return centres * 2 * NODE_SPACING * math.sqrt(sizes.sum()), radii
+
+# Fruchterman-Reingold force-directed layout of a small graph given as a dense adjacency matrix,
+# same forces as nx.spring_layout but with all pairwise forces computed at once in float32
+def force_directed_layout(adjacency, seed=0, iterations=SPRING_ITERATIONS):
+    n = adjacency.shape[0]
+    positions = np.random.default_rng(seed).random((n, 2), dtype=np.float32)
+    adjacency = adjacency.astype(np.float32)
+    k = np.float32(math.sqrt(1.0 / n))  # Optimal distance between nodes
+    temperature = 0.1
+    cooling = temperature / (iterations + 1)
+
+    for _ in range(iterations):
+        dx = positions[:, 0:1] - positions[:, 0]
+        dy = positions[:, 1:2] - positions[:, 1]
+        distance_squared = np.maximum(dx * dx + dy * dy, 1e-4)
+        # Repulsion between every pair, attraction along edges
+        force = k * k / distance_squared - adjacency * np.sqrt(distance_squared) / k
+        displacement = np.stack([(dx * force).sum(axis=1), (dy * force).sum(axis=1)], axis=1)
+        length = np.maximum(np.linalg.norm(displacement, axis=1), 0.01)
+        positions += displacement * (temperature / length)[:, None]
+        temperature -= cooling
+    return positions
+
+# Positions of the nodes of one community in the unit disc, in subgraph.nodes order
+def community_layout(subgraph, seed=0):
+    n = subgraph.number_of_nodes()
+    if n == 1:
+        return np.zeros((1, 2))
+    if n <= SPRING_LAYOUT_MAX_NODES:
+        coordinates = force_directed_layout(nx.to_numpy_array(subgraph, weight="weight"), seed).astype(np.float64)
+    else:
+        positions = nx.spectral_layout(subgraph, weight="weight")
+        coordinates = np.array([positions[node] for node in subgraph.nodes], dtype=np.float64)
+    coordinates -= coordinates.mean(axis=0)
+    scale = np.abs(coordinates).max() or 1.0
+    return coordinates / scale
+
+# Precompute a community-aware layout: communities are placed around each other and laid out
+# separately, so the cost grows with the community sizes rather than the whole graph.
+# Returns {node: (x, y)} in screen pixels
+def compute_layout(G, communities, seed=0):
+    communities = [list(community) for community in communities if len(community)]
+    if not communities:
+        return {}
+
+    centres, radii = community_centres(G, communities, seed)
+    positions = {}
+    for c, community in enumerate(communities):
+        subgraph = G.subgraph(community)
+        coordinates = community_layout(subgraph, seed) * radii[c] + centres[c]
+        positions.update(zip(subgraph.nodes, map(tuple, coordinates)))
+    return positions
+
+# Compact columnar payload of a laid-out graph for the front-end loader (graph-payload.js):
+# node columns, one colour per community and edges as indices into the node columns
+def graph2Payload(G, positions):
+    node_ids = list(G.nodes)
+    index = {node: i for i, node in enumerate(node_ids)}
+    attributes = [G.nodes[node] for node in node_ids]
+
+    communities = [int(a.get("group", 0)) for a in attributes]
+    palette = {}
+    for community, a in zip(communities, attributes):
+        palette.setdefault(community, a.get("color", "#97c2fc"))
+
+    edges = list(G.edges(data="weight", default=1.0))
+    return {
+        "format": "credleaf-graph",
+        "version": 1,
+        "nodes": {
+            "id": node_ids,
+            "label": [str(a.get("label", node)) for node, a in zip(node_ids, attributes)],
+            "x": [round(float(positions[node][0]), 1) for node in node_ids],
+            "y": [round(float(positions[node][1]), 1) for node in node_ids],
+            "community": communities,
+            "size": [int(a.get("size", 10)) for a in attributes]
+        },
+        "communities": {
+            "id": sorted(palette),
+            "color": [palette[community] for community in sorted(palette)]
+        },
+        "edges": {
+            "source": [index[u] for u, _, _ in edges],
+            "target": [index[v] for _, v, _ in edges],
+            "weight": [round(float(weight), 3) for _, _, weight in edges]
+        }
+    }
+
+# Write the payload of a laid-out graph as compact JSON
+def save_graph_payload(G, positions, output_path):
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(graph2Payload(G, positions), f, separators=(",", ":"), ensure_ascii=False)
+    print(f"Graph payload saved to {output_path}")
+    return output_path
@@ -0,0 +1,106 @@
+import numpy as np
+
+try:
+    import faiss
+except ImportError:  # Only needed for the approximate nearest-neighbour mode
+    faiss = None
+
+# Normalize embeddings to float32 unit vectors so dot products are cosine similarities
+def normalize_embeddings(embeddings):
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return embeddings / norms
+
+# All pairs (i < j) with cosine similarity >= threshold, computed tile by tile so memory stays
+# bounded by block_size x block_size whatever the number of embeddings.
+# With other, pairs are taken between the rows of embeddings (i) and the rows of other (j) instead.
+# Returns (sources, targets, similarities) arrays
+def similarity_join(embeddings, threshold, block_size=2048, other=None):
+    left = normalize_embeddings(embeddings)
+    right = left if other is None else normalize_embeddings(other)
+    sources, targets, similarities = [], [], []
+
+    for row_start in range(0, len(left), block_size):
+        tile = left[row_start:row_start + block_size]
+        # Within one set only the upper triangle is needed
+        first_column = row_start if other is None else 0
+        for column_start in range(first_column, len(right), block_size):
+            scores = tile @ right[column_start:column_start + block_size].T
+            mask = scores >= threshold
+            if other is None and column_start == row_start:
+                mask &= np.triu(np.ones(mask.shape, dtype=bool), k=1)
+            rows, columns = np.nonzero(mask)
+            sources.append(rows + row_start)
+            targets.append(columns + column_start)
+            similarities.append(scores[rows, columns])
+
+    if not sources:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    return np.concatenate(sources), np.concatenate(targets), np.concatenate(similarities)
+
+# Exact k nearest neighbours of every row, merging per-tile results so memory stays bounded
+def exact_top_k(vectors, k, block_size=2048):
+    count = len(vectors)
+    best_scores = np.empty((count, k), dtype=np.float32)
+    best_ids = np.empty((count, k), dtype=np.int64)
+
+    for row_start in range(0, count, block_size):
+        tile = vectors[row_start:row_start + block_size]
+        tile_scores = np.full((len(tile), k), -np.inf, dtype=np.float32)
+        tile_ids = np.full((len(tile), k), -1, dtype=np.int64)
+        for column_start in range(0, count, block_size):
+            scores = tile @ vectors[column_start:column_start + block_size].T
+            # A chunk is not its own neighbour
+            if column_start == row_start:
+                np.fill_diagonal(scores, -np.inf)
+            kth = min(k, scores.shape[1]) - 1
+            top = np.argpartition(-scores, kth, axis=1)[:, :k]
+            scores = np.concatenate([tile_scores, np.take_along_axis(scores, top, axis=1)], axis=1)
+            ids = np.concatenate([tile_ids, top + column_start], axis=1)
+            keep = np.argsort(-scores, axis=1)[:, :k]
+            tile_scores = np.take_along_axis(scores, keep, axis=1)
+            tile_ids = np.take_along_axis(ids, keep, axis=1)
+        best_scores[row_start:row_start + len(tile)] = tile_scores
+        best_ids[row_start:row_start + len(tile)] = tile_ids
+
+    return best_scores, best_ids
+
+# Approximate k nearest neighbours of every row with an HNSW index (requires faiss)
+def approximate_top_k(vectors, k):
+    index = faiss.IndexHNSWFlat(vectors.shape[1], 32, faiss.METRIC_INNER_PRODUCT)
+    index.add(vectors)
+    # Ask for one more neighbour since each vector finds itself
+    scores, ids = index.search(vectors, k + 1)
+    is_self = ids == np.arange(len(vectors))[:, None]
+    scores[is_self] = -np.inf
+    keep = np.argsort(-scores, axis=1)[:, :k]
+    return np.take_along_axis(scores, keep, axis=1), np.take_along_axis(ids, keep, axis=1)
+
+# Edges to the k most similar chunks of every chunk (above the threshold), as undirected i < j pairs.
+# mode="ann" uses an approximate index when faiss is installed, otherwise the exact blocked search
+def similarity_top_k(embeddings, k, threshold=None, mode="ann", block_size=2048):
+    vectors = normalize_embeddings(embeddings)
+    if len(vectors) < 2:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    k = min(k, len(vectors) - 1)
+
+    if mode == "ann" and faiss is not None:
+        scores, ids = approximate_top_k(vectors, k)
+    else:
+        if mode == "ann":
+            print("faiss is not installed, using exact nearest-neighbour search")
+        scores, ids = exact_top_k(vectors, k, block_size)
+
+    sources = np.repeat(np.arange(len(vectors)), k)
+    targets = ids.reshape(-1)
+    similarities = scores.reshape(-1)
+    valid = (targets >= 0) & np.isfinite(similarities)
+    if threshold is not None:
+        valid &= similarities >= threshold
+    sources, targets, similarities = sources[valid], targets[valid], similarities[valid]
+
+    # Neighbour relations found in both directions become a single edge
+    low, high = np.minimum(sources, targets), np.maximum(sources, targets)
+    _, first = np.unique(low * len(vectors) + high, return_index=True)
+    return low[first], high[first], similarities[first]
@@ -1,10 +1,23 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, send_file
 import requests
+from requests.adapters import HTTPAdapter
 import json
+import os
+import threading
+import time
 import pandas as pd
 import numpy as np
 from datetime import datetime
-import networkx as nx
+from urllib.parse import parse_qsl
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from provider_cache import ProviderCache, MemoryBackend, RedisBackend, normalize_claim
+from temporal import TemporalAnalyzer, temporal_scores_batch
+from timeseries import TimeSeriesStore, DOWNSAMPLING_METHODS
+from reference_index import ReferenceIndex
+from semantic_embeddings import EmbeddingIndex
+from graph_cache import GraphCache
+from graph_store import GraphStore, style_changes
+from build_jobs import JobQueue
 
 app = Flask(__name__)
 
@@ -12,18 +25,121 @@ app = Flask(__name__)
 FACT_CHECK_APIS = {
     "google_factcheck": {
         "url": "https://factchecktools.googleapis.com/v1alpha1/claims:search",
-        "key": "YOUR_GOOGLE_FACTCHECK_API_KEY"  # Replace with actual API key
+        "key": "YOUR_GOOGLE_FACTCHECK_API_KEY",  # Replace with actual API key
+        "cache_ttl": 24 * 3600  # Published fact-checks rarely change
     },
     "politifact": {
         "url": "https://www.politifact.com/api/factchecks/",
-        "key": None  # PolitiFact doesn't require an API key for public endpoints
+        "key": None,  # PolitiFact doesn't require an API key for public endpoints
+        "cache_ttl": 6 * 3600
     },
     "open_ai": {
         "url": "https://api.openai.com/v1/completions",
-        "key": "YOUR_OPENAI_API_KEY"  # Replace with actual API key
+        "key": "YOUR_OPENAI_API_KEY",  # Replace with actual API key
+        "cache_ttl": 3600
     }
 }
 
+# Overall deadline (in seconds) for querying all fact-checking APIs in one request,
+# requests can lower it down to the minimum
+FACT_CHECK_DEADLINE = 12.0
+FACT_CHECK_MIN_DEADLINE = 0.5
+
+# Shared thread pool so the fact-checking APIs are queried concurrently
+api_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="factcheck")
+
+# Keep-alive connection pool and retry settings for the fact-checking API sessions
+# (an API entry can override the pool size with a "pool_size" key).
+# Retries only happen while the request deadline leaves time for them
+HTTP_POOL_SIZE = 16
+HTTP_MAX_RETRIES = 2
+HTTP_BACKOFF_FACTOR = 0.3
+HTTP_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# One shared session per fact-checking API, created on first use
+api_sessions = {}
+api_sessions_lock = threading.Lock()
+
+# Cache of API responses, kept in-process unless a Redis URL is configured for multiple workers
+CACHE_REDIS_URL = os.environ.get("CREDLEAF_CACHE_REDIS_URL")
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+CACHE_DEFAULT_TTL = 3600
+
+api_cache = ProviderCache(
+    RedisBackend(CACHE_REDIS_URL) if CACHE_REDIS_URL else MemoryBackend(CACHE_MAX_BYTES),
+    default_ttl=CACHE_DEFAULT_TTL
+)
+
+# Live engagement streams, changes older than the half-life (in seconds) count half as much
+TEMPORAL_HALF_LIFE = 6 * 3600
+temporal_analyzer = TemporalAnalyzer(half_life=TEMPORAL_HALF_LIFE)
+
+# Engagement events behind the time series view, kept on disk when a directory is configured
+# The hourly engagement of each claim is passed on to the temporal analyzer
+TIMESERIES_PATH = os.environ.get("CREDLEAF_TIMESERIES_PATH")
+TIMESERIES_DEFAULT_POINTS = 500
+TIMESERIES_MIN_POINTS = 3
+TIMESERIES_MAX_POINTS = 5000
+timeseries_store = TimeSeriesStore(TIMESERIES_PATH, on_claim_bucket=temporal_analyzer.append)
+
+# Origin allowed to call the API from the browser when the front end is served separately,
+# cross-origin requests are not allowed unless it is set
+CORS_ALLOWED_ORIGIN = os.environ.get("CREDLEAF_CORS_ORIGIN")
+
+# Curated reference corpus for semantic alignment (JSONL file or directory of .txt files), indexed once at startup
+REFERENCE_CORPUS_PATH = os.environ.get("CREDLEAF_REFERENCE_CORPUS")
+REFERENCE_TOP_K = 5
+REFERENCE_MAX_K = 100
+reference_index = ReferenceIndex.from_path(REFERENCE_CORPUS_PATH) if REFERENCE_CORPUS_PATH else None
+
+# Pre-embedded reference chunks (built with semantic_embeddings.build_embedding_index), when configured
+# semantic alignment uses embedding similarity instead of word overlap
+EMBEDDING_INDEX_PATH = os.environ.get("CREDLEAF_EMBEDDING_INDEX")
+EMBEDDING_BATCH_SIZE = 256
+embedding_index = EmbeddingIndex(EMBEDDING_INDEX_PATH) if EMBEDDING_INDEX_PATH else None
+
+# Parsed knowledge graphs and their centralities, by content hash / registered graph ID
+GRAPH_CACHE_SIZE = 32
+graph_cache = GraphCache(max_graphs=GRAPH_CACHE_SIZE)
+
+# Above this many nodes the "auto" centrality mode samples betweenness instead of computing it exactly
+GRAPH_EXACT_MAX_NODES = 2000
+GRAPH_BETWEENNESS_SAMPLES = 256
+
+# Artifacts of the graph pipeline (knowledge_graph/data_output/artifacts) served to the network viewer
+# by level of detail, a page or viewport never returns more than the node and edge limits
+GRAPH_ARTIFACTS_PATH = os.environ.get("CREDLEAF_GRAPH_ARTIFACTS")
+NETWORK_DEFAULT_NODES = 500
+NETWORK_MAX_NODES = 5000
+NETWORK_MAX_EDGES = 20000
+NETWORK_MAX_HOPS = 3
+NETWORK_MAX_QUERY_NODES = 100000  # Neighbourhood and filter results are capped at this many nodes
+NETWORK_SEARCH_LIMIT = 20
+graph_store = GraphStore(GRAPH_ARTIFACTS_PATH) if GRAPH_ARTIFACTS_PATH else None
+
+# Graph builds submitted through /jobs, run in subprocesses by a bounded pool of worker threads.
+# Jobs are kept in the directory so queued builds survive a restart; builds can read server-side
+# documents only below CREDLEAF_BUILD_INPUT_ROOT. Serve a workspace's builds by pointing
+# CREDLEAF_GRAPH_ARTIFACTS at <jobs directory>/workspaces/<workspace>/artifacts
+BUILD_JOBS_PATH = os.environ.get("CREDLEAF_BUILD_JOBS")
+BUILD_INPUT_ROOT = os.environ.get("CREDLEAF_BUILD_INPUT_ROOT")
+BUILD_WORKERS = int(os.environ.get("CREDLEAF_BUILD_WORKERS", 2))
+BUILD_MAX_DOCUMENTS = 1000
+BUILD_MAX_DOWNLOAD_BYTES = 50 * 1024 * 1024
+job_queue = JobQueue(
+    BUILD_JOBS_PATH, workers=BUILD_WORKERS, input_root=BUILD_INPUT_ROOT, max_documents=BUILD_MAX_DOCUMENTS,
+    max_download_bytes=BUILD_MAX_DOWNLOAD_BYTES
+) if BUILD_JOBS_PATH else None
+
+# Limits for /factcheck/batch. Batches are scored on their own pool and query the fact-checking
+# APIs through their own pool too, so they can't starve the API queries of single /factcheck requests
+BATCH_MAX_CLAIMS = 50000
+BATCH_WORKERS = 8
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix="factcheck-batch")
+batch_api_executor = ThreadPoolExecutor(
+    max_workers=BATCH_WORKERS * len(FACT_CHECK_APIS), thread_name_prefix="factcheck-batch-api"
+)
+
 def normalize_score(score, min_val=0, max_val=10):
     """Normalize scores to a 0-10 scale."""
     return ((score - min_val) / (max_val - min_val)) * 10
@@ -53,6 +169,12 @@ def check_temporal_patterns(claim, temporal_weight=1.0):
     engagement_data = claim.get("engagement_timeseries", [])
     
     if not engagement_data:
+        # Use the live engagement stream of the claim when one was sent to /temporal. Only claims
+        # sent with a claim_id have one, the others would all share the default 'unknown' id
+        streamed_score = temporal_analyzer.score(claim["id"]) if claim.get("has_id") else None
+        if streamed_score is not None:
+            return streamed_score * temporal_weight
+        
         # If no time series data, fall back to basic days-based heuristic
         if days_since_claim < 1:
             return 5.0 * temporal_weight  # New claims start neutral
@@ -93,6 +215,44 @@ def check_temporal_patterns(claim, temporal_weight=1.0):
         # If analysis fails, return neutral score
         return 5.0 * temporal_weight
 
+def check_temporal_patterns_batch(claims, temporal_weight=1.0):
+    """
+    Analyze the temporal patterns of many claims at once
+    temporal_weight can be a single weight or one weight per claim.
+    Returns an array of scores identical to calling check_temporal_patterns on each claim
+    """
+    weights = np.broadcast_to(np.asarray(temporal_weight, dtype=np.float64), (len(claims),))
+    
+    # Collect numeric 1-D series for the vectorized path, anything else goes through the scalar function
+    series = []
+    series_rows = []
+    fallback_rows = []
+    for i, claim in enumerate(claims):
+        engagement_data = claim.get("engagement_timeseries", [])
+        data = np.asarray(engagement_data) if engagement_data else None
+        if data is not None and data.ndim == 1 and data.dtype.kind in "if":
+            series.append(data.astype(np.float64))
+            series_rows.append(i)
+        else:
+            fallback_rows.append(i)
+    
+    scores = np.empty(len(claims))
+    if series:
+        offsets = np.zeros(len(series) + 1, dtype=np.intp)
+        np.cumsum([len(s) for s in series], out=offsets[1:])
+        scores[series_rows] = temporal_scores_batch(np.concatenate(series), offsets=offsets) * weights[series_rows]
+    for i in fallback_rows:
+        scores[i] = check_temporal_patterns(claims[i], weights[i])
+    
+    return scores
+
+def parse_reference_k(value):
+    """Parse a number of reference matches, at least 1 and capped at REFERENCE_MAX_K"""
+    k = int(value)
+    if k < 1:
+        raise ValueError("k must be at least 1")
+    return min(k, REFERENCE_MAX_K)
+
 def analyze_semantic_alignment(claim, reference_data, semantic_weight=1.0):
     """
     Analyze semantic alignment between the claim and reference data
@@ -105,7 +265,25 @@ def analyze_semantic_alignment(claim, reference_data, semantic_weight=1.0):
     claim_text = claim.get("text", "").lower()
     reference_text = reference_data.get("reference_text", "").lower()
     
+    if embedding_index is not None:
+        # Embedding similarity with the reference text, or with the closest reference chunk
+        if reference_text:
+            similarity = embedding_index.similarity(claim_text, reference_text)
+        else:
+            matches = embedding_index.search([claim_text], k=1)[0]
+            similarity = matches[0]["similarity"] if matches else 0.0
+        return embedding_alignment_score(similarity) * semantic_weight
+    
     if not reference_text:
+        if reference_index is not None:
+            # Align against the best matching documents of the reference corpus instead
+            try:
+                top_k = parse_reference_k(reference_data.get("top_k", REFERENCE_TOP_K))
+            except (TypeError, ValueError):
+                top_k = REFERENCE_TOP_K
+            matches = reference_index.search(claim_text, top_k)
+            best_overlap = matches[0]["overlap"] if matches else 0.0
+            return min(10.0, best_overlap * 10) * semantic_weight
         return 5.0 * semantic_weight  # Neutral score if no reference
         
     # Simple word overlap calculation
@@ -120,53 +298,195 @@ def analyze_semantic_alignment(claim, reference_data, semantic_weight=1.0):
     
     return alignment_score * semantic_weight
 
-def evaluate_graph_structure(claim, graph_data, graph_weight=1.0):
+def embedding_alignment_score(similarity):
+    """Map a cosine similarity to a 0-10 alignment score, unrelated or opposite texts score 0."""
+    return min(10.0, max(0.0, similarity) * 10)
+
+def analyze_semantic_alignment_batch(claims, reference_datas, semantic_weight=1.0):
+    """
+    Analyze the semantic alignment of many claims at once
+    With an embedding index, claims aligned against the reference chunks are embedded
+    and searched in batches. Returns an array with one score per claim
+    """
+    weights = np.broadcast_to(np.asarray(semantic_weight, dtype=np.float64), (len(claims),))
+    scores = np.empty(len(claims))
+    
+    corpus_rows = []
+    for i, (claim, reference_data) in enumerate(zip(claims, reference_datas)):
+        if embedding_index is not None and not reference_data.get("reference_text"):
+            corpus_rows.append(i)
+        else:
+            scores[i] = analyze_semantic_alignment(claim, reference_data, weights[i])
+    
+    for start in range(0, len(corpus_rows), EMBEDDING_BATCH_SIZE):
+        rows = corpus_rows[start:start + EMBEDDING_BATCH_SIZE]
+        matches = embedding_index.search([claims[i].get("text", "").lower() for i in rows], k=1)
+        for i, claim_matches in zip(rows, matches):
+            similarity = claim_matches[0]["similarity"] if claim_matches else 0.0
+            scores[i] = embedding_alignment_score(similarity) * weights[i]
+    
+    return scores
+
+def evaluate_graph_structure(claim, graph_data, graph_weight=1.0, graph_options=None):
     """
     Evaluate the claim based on its position in a knowledge graph
     Returns a score between 0-10 where higher scores indicate better graph positioning
     """
+    return evaluate_graph_structure_details(claim, graph_data, graph_weight, graph_options)[0]
+
+def evaluate_graph_structure_details(claim, graph_data, graph_weight=1.0, graph_options=None):
+    """
+    Evaluate the claim based on its position in a knowledge graph
+    
+    graph_options (optional) selects how centralities are computed:
+    - centrality_mode: "auto" (default, exact up to GRAPH_EXACT_MAX_NODES nodes then sampled),
+      "exact", "sampled" (betweenness from k random sources) or "ego" (exact within the
+      claim's k-hop neighbourhood only)
+    - k, seed: number of betweenness samples and random seed for the sampled mode
+    - radius: neighbourhood size in hops for the ego mode
+    - tol, max_iter: eigenvector centrality tolerance and iteration cap
+    
+    Returns (score, analysis) where analysis reports the mode used and its estimated error
+    """
     # Placeholder for actual graph analysis logic
     # In a real implementation, this would analyze the claim's position in a knowledge graph
     
     if not graph_data:
-        return 5.0 * graph_weight  # Neutral score if no graph data
+        return 5.0 * graph_weight, None  # Neutral score if no graph data
+    
+    graph_options = graph_options or {}
+    analysis = None
         
     try:
-        # Create a graph from the provided data
-        G = nx.Graph()
-        
-        # Add nodes and edges from graph_data
-        for node in graph_data.get("nodes", []):
-            G.add_node(node["id"], **node.get("attributes", {}))
-            
-        for edge in graph_data.get("edges", []):
-            G.add_edge(edge["source"], edge["target"], weight=edge.get("weight", 1.0))
+        # Use the registered or previously seen graph instead of rebuilding it
+        if "graph_id" in graph_data:
+            cached_graph = graph_cache.get(graph_data["graph_id"])
+            if cached_graph is None:
+                print(f"Unknown graph ID: {graph_data['graph_id']}")
+                return 5.0 * graph_weight, None
+        else:
+            cached_graph = graph_cache.get_or_build(graph_data)
             
         # Find the claim node in the graph
         claim_id = claim.get("id")
-        if claim_id in G:
-            # Calculate centrality measures
-            degree_centrality = nx.degree_centrality(G)[claim_id]
+        if claim_id in cached_graph.graph:
+            mode = graph_options.get("centrality_mode", "auto")
+            tol = float(graph_options.get("tol", 1.0e-6))
+            max_iter = int(graph_options.get("max_iter", 100))
             
-            try:
-                betweenness_centrality = nx.betweenness_centrality(G)[claim_id]
-                eigenvector_centrality = nx.eigenvector_centrality(G)[claim_id]
+            if mode == "auto":
+                large = cached_graph.graph.number_of_nodes() > GRAPH_EXACT_MAX_NODES
+                mode = "sampled" if large else "exact"
+            
+            # Centrality measures of the whole graph are computed once and cached
+            if mode == "exact":
+                centralities = cached_graph.get_centralities(tol=tol, max_iter=max_iter)
+            elif mode == "sampled":
+                samples = int(graph_options.get("k", GRAPH_BETWEENNESS_SAMPLES))
+                seed = int(graph_options.get("seed", 0))
+                centralities = cached_graph.get_centralities(samples, seed, tol, max_iter)
+            elif mode == "ego":
+                radius = int(graph_options.get("radius", 2))
+                centralities = cached_graph.get_ego_centralities(claim_id, radius, tol, max_iter)
+            else:
+                raise ValueError(f"Unknown centrality mode {mode}")
+            
+            position = centralities["index"][claim_id]
+            degree_centrality = float(centralities["degree"][position])
+            errors = centralities["estimated_error"]
+            
+            if centralities["betweenness"] is not None:
+                betweenness_centrality = float(centralities["betweenness"][position])
+                eigenvector_centrality = float(centralities["eigenvector"][position])
                 
                 # Higher centrality could indicate more important/verified information
                 graph_score = ((degree_centrality + betweenness_centrality + eigenvector_centrality) / 3) * 10
-            except:
+                estimated_error = ((errors["betweenness"] + errors["eigenvector"]) / 3) * 10
+                fallback = None
+            else:
                 # Fallback if certain centrality measures fail
                 graph_score = degree_centrality * 10
+                estimated_error = 0.0
+                fallback = "degree"
+            
+            analysis = {
+                "mode": mode,
+                "fallback": fallback,
+                # Ego scores are relative to the neighbourhood, their error against the whole graph is unknown
+                "estimated_error": None if mode == "ego" else round(estimated_error * graph_weight, 4)
+            }
+            if mode == "ego":
+                analysis["scope_nodes"] = centralities["scope_nodes"]
                 
-            return min(10.0, graph_score) * graph_weight
+            return min(10.0, graph_score) * graph_weight, analysis
             
     except Exception as e:
         print(f"Error in graph analysis: {str(e)}")
         
-    return 5.0 * graph_weight  # Neutral score on failure
+    return 5.0 * graph_weight, analysis  # Neutral score on failure
+
+def get_api_session(api_name):
+    """
+    Get the pooled keep-alive session for a fact-checking API.
+    Sessions are shared across request threads, the underlying urllib3 pool is thread-safe.
+    """
+    session = api_sessions.get(api_name)
+    if session is not None:
+        return session
+        
+    with api_sessions_lock:
+        session = api_sessions.get(api_name)
+        if session is None:
+            api_info = FACT_CHECK_APIS.get(api_name, {})
+            pool_size = api_info.get("pool_size", HTTP_POOL_SIZE)
+            
+            # Retries are made by get_with_retries, which knows the time left before the deadline
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+            
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            api_sessions[api_name] = session
+            
+    return session
+
+def get_with_retries(session, url, expires_at, **kwargs):
+    """
+    GET a URL, retrying connection errors and transient status codes with exponential backoff.
+    Every attempt is limited to the time left before expires_at (a time.monotonic() value), so all
+    attempts together end by the deadline. Timeouts are not retried since no time is left after them.
+    """
+    response = None
+    error = requests.Timeout("Deadline passed before the API answered")
+    for attempt in range(HTTP_MAX_RETRIES + 1):
+        if attempt:
+            backoff = HTTP_BACKOFF_FACTOR * 2 ** (attempt - 1)
+            if time.monotonic() + backoff >= expires_at:
+                break
+            time.sleep(backoff)
+        
+        remaining = expires_at - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            response = session.get(url, timeout=remaining, **kwargs)
+        except requests.ConnectionError as e:
+            response, error = None, e
+            continue
+        if response.status_code not in HTTP_RETRY_STATUSES:
+            break
+    
+    if response is None:
+        raise error
+    return response
 
-def query_fact_checking_api(api_name, claim):
-    """Query a fact-checking API and get the trust score."""
+def query_fact_checking_api(api_name, claim, expires_at=None):
+    """
+    Query a fact-checking API and get the trust score.
+    The query gives up at expires_at (a time.monotonic() value, default FACT_CHECK_DEADLINE from now).
+    """
+    if expires_at is None:
+        expires_at = time.monotonic() + FACT_CHECK_DEADLINE
     api_info = FACT_CHECK_APIS.get(api_name)
     if not api_info:
         return {"error": f"API {api_name} not configured"}
@@ -178,7 +498,8 @@ def query_fact_checking_api(api_name, claim):
         headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
         params = {"query": claim}
         
-        response = requests.get(url, headers=headers, params=params, timeout=10)
+        session = get_api_session(api_name)
+        response = get_with_retries(session, url, expires_at, headers=headers, params=params)
         
         if response.status_code == 200:
             result = response.json()
@@ -229,24 +550,72 @@ def query_fact_checking_api(api_name, claim):
     except Exception as e:
         return {"error": str(e), "source": api_name}
 
-@app.route('/factcheck', methods=['POST'])
-def fact_check():
+def cached_query_fact_checking_api(api_name, claim, expires_at=None):
+    """Query a fact-checking API through the response cache."""
+    api_info = FACT_CHECK_APIS.get(api_name, {})
+    result, cached = api_cache.get_or_query(
+        api_name, claim,
+        lambda: query_fact_checking_api(api_name, claim, expires_at),
+        ttl=api_info.get("cache_ttl")
+    )
+    # Copy so the cached entry itself is never modified
+    return dict(result, cached=cached)
+
+def query_fact_checking_apis(claim, deadline=FACT_CHECK_DEADLINE, executor=None):
     """
-    API endpoint to check the factuality of a claim
-    
-    Requires JSON input with:
-    - claim: text of the claim to check
-    - temporal_weight: weight for temporal analysis (optional, default 1.0)
-    - semantic_weight: weight for semantic alignment (optional, default 1.0)
-    - graph_weight: weight for graph structure analysis (optional, default 1.0)
-    - reference_data: dictionary containing reference text (optional)
-    - graph_data: dictionary containing nodes and edges for graph analysis (optional)
+    Query all configured fact-checking APIs concurrently, on the shared API pool unless another
+    executor is given.
+    APIs that have not answered when the deadline passes are marked as timed out.
     """
-    data = request.get_json()
+    executor = executor or api_executor
+    # The queries stop at the deadline too, so a slow API doesn't hold a pool thread after it
+    expires_at = time.monotonic() + deadline
+    futures = {
+        api_name: executor.submit(cached_query_fact_checking_api, api_name, claim, expires_at)
+        for api_name in FACT_CHECK_APIS
+    }
+    wait(futures.values(), timeout=deadline)
     
-    if not data or not data.get('claim'):
-        return jsonify({"error": "Missing required 'claim' field"}), 400
+    api_results = {}
+    for api_name, future in futures.items():
+        if future.done():
+            api_results[api_name] = future.result()
+        else:
+            # Don't wait for the slow API, its late answer is simply dropped
+            future.cancel()
+            api_results[api_name] = {"error": "Request timed out", "timed_out": True, "source": api_name}
     
+    return api_results
+
+def get_request_deadline(data):
+    """
+    Get the fact-checking API deadline for a request, clamped between FACT_CHECK_MIN_DEADLINE and
+    the configured one. Raises ValueError when it is not a number.
+    """
+    try:
+        deadline = float(data.get('deadline', FACT_CHECK_DEADLINE))
+    except (TypeError, ValueError):
+        raise ValueError("'deadline' must be a number of seconds")
+    if np.isnan(deadline):
+        raise ValueError("'deadline' must be a number of seconds")
+    return min(max(deadline, FACT_CHECK_MIN_DEADLINE), FACT_CHECK_DEADLINE)
+
+def build_claim_object(data):
+    """Prepare the claim object with metadata from the request data."""
+    return {
+        "text": data.get('claim'),
+        "id": data.get('claim_id', 'unknown'),
+        "has_id": data.get('claim_id') is not None,
+        "date": data.get('claim_date', datetime.now().strftime('%Y-%m-%d')),
+        "engagement_timeseries": data.get('engagement_timeseries', [])
+    }
+
+def score_claim(data, api_results, temporal_score=None, semantic_score=None):
+    """
+    Combine the fact-checking API results with the local analyses of a claim
+    Precomputed temporal and semantic scores (e.g. from a batch) skip those analyses.
+    Returns the /factcheck response for the request data
+    """
     claim = data.get('claim')
     
     # Get optional weight parameters with default values
@@ -258,33 +627,37 @@ def fact_check():
     reference_data = data.get('reference_data', {})
     graph_data = data.get('graph_data', {})
     
-    # Prepare the claim object with metadata
-    claim_obj = {
-        "text": claim,
-        "id": data.get('claim_id', 'unknown'),
-        "date": data.get('claim_date', datetime.now().strftime('%Y-%m-%d'))
-    }
-    
-    # Query fact-checking APIs
-    api_results = {}
-    for api_name in FACT_CHECK_APIS:
-        api_results[api_name] = query_fact_checking_api(api_name, claim)
+    claim_obj = build_claim_object(data)
     
     # Calculate scores from advanced parameters
-    temporal_score = check_temporal_patterns(claim_obj, temporal_weight)
-    semantic_score = analyze_semantic_alignment(claim_obj, reference_data, semantic_weight)
-    graph_score = evaluate_graph_structure(claim_obj, graph_data, graph_weight)
+    if temporal_score is None:
+        temporal_score = check_temporal_patterns(claim_obj, temporal_weight)
+    if semantic_score is None:
+        semantic_score = analyze_semantic_alignment(claim_obj, reference_data, semantic_weight)
+    graph_score, graph_analysis = evaluate_graph_structure_details(
+        claim_obj, graph_data, graph_weight, data.get('graph_options')
+    )
     
     # Calculate the trust scores from APIs
     api_scores = []
     api_details = []
+    cache_hits = 0
     
     for api_name, result in api_results.items():
+        if result.get("cached"):
+            cache_hits += 1
         if "error" not in result:
             api_scores.append(result["score"])
             api_details.append({
                 "source": api_name,
-                "score": result["score"]
+                "score": result["score"],
+                "cached": result.get("cached", False)
+            })
+        elif result.get("timed_out"):
+            # Report the APIs that missed the deadline instead of silently dropping them
+            api_details.append({
+                "source": api_name,
+                "status": "timed_out"
             })
     
     # Calculate the aggregate score
@@ -316,6 +689,11 @@ def fact_check():
             "graph_structure": round(graph_score, 2)
         },
         "api_details": api_details,
+        "graph_analysis": graph_analysis,
+        "cache": {
+            "hits": cache_hits,
+            "misses": len(api_results) - cache_hits
+        },
         "explanation": {
             "score_range": "0-10 where 10 indicates highest trustworthiness",
             "weights": {
@@ -327,12 +705,608 @@ def fact_check():
         }
     }
     
-    return jsonify(response)
+    return response
+
+@app.route('/factcheck', methods=['POST'])
+def fact_check():
+    """
+    API endpoint to check the factuality of a claim
+    
+    Requires JSON input with:
+    - claim: text of the claim to check
+    - temporal_weight: weight for temporal analysis (optional, default 1.0)
+    - semantic_weight: weight for semantic alignment (optional, default 1.0)
+    - graph_weight: weight for graph structure analysis (optional, default 1.0)
+    - reference_data: dictionary containing reference text (optional)
+    - graph_data: dictionary containing nodes and edges for graph analysis, or a registered graph_id (optional)
+    - graph_options: centrality mode and parameters for graph analysis (optional)
+    - engagement_timeseries: engagement counts of the claim over time for temporal analysis (optional)
+    - deadline: overall time limit in seconds for the fact-checking APIs (optional)
+    """
+    data = request.get_json()
+    
+    if not data or not data.get('claim'):
+        return jsonify({"error": "Missing required 'claim' field"}), 400
+    
+    try:
+        deadline = get_request_deadline(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    # Query fact-checking APIs concurrently, bounded by the request deadline
+    api_results = query_fact_checking_apis(data.get('claim'), deadline)
+    
+    return jsonify(score_claim(data, api_results))
+
+def score_claim_group(claim, items, deadline):
+    """
+    Score all batch items that share the same claim text
+    The fact-checking APIs are queried once for the whole group, on the batch API pool
+    """
+    api_results = query_fact_checking_apis(claim, deadline, batch_api_executor)
+    return [
+        (indices, score_claim(item, api_results, temporal_score, semantic_score))
+        for indices, item, temporal_score, semantic_score in items
+    ]
+
+def batch_item_error(item):
+    """Return why a /factcheck/batch item can't be scored, or None if it can"""
+    if not isinstance(item, dict) or not item.get('claim'):
+        return "Missing required 'claim' field"
+    for key in ('temporal_weight', 'semantic_weight', 'graph_weight'):
+        try:
+            float(item.get(key, 1.0))
+        except (TypeError, ValueError):
+            return f"'{key}' must be a number"
+    for key in ('reference_data', 'graph_data'):
+        if not isinstance(item.get(key, {}), dict):
+            return f"'{key}' must be an object"
+    return None
+
+@app.route('/factcheck/batch', methods=['POST'])
+def fact_check_batch():
+    """
+    API endpoint to check the factuality of many claims in one call
+    
+    Requires JSON input with:
+    - claims: list of claim objects, each accepting the same fields as /factcheck
+    - deadline: overall time limit in seconds for the fact-checking APIs of each claim (optional)
+    
+    Results are streamed back as NDJSON in completion order, one line per unique claim object
+    with the "indices" of the input claims it answers. Invalid claim objects get an "error" line.
+    """
+    data = request.get_json()
+    claims = data.get('claims') if data else None
+    
+    if not isinstance(claims, list) or not claims:
+        return jsonify({"error": "Missing required 'claims' list"}), 400
+    if len(claims) > BATCH_MAX_CLAIMS:
+        return jsonify({"error": f"At most {BATCH_MAX_CLAIMS} claims are accepted per batch"}), 400
+    
+    try:
+        deadline = get_request_deadline(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    # Deduplicate identical claim objects, then group them by claim text so
+    # the fact-checking APIs are only queried once per distinct claim
+    invalid = []
+    unique_items = {}
+    for index, item in enumerate(claims):
+        error = batch_item_error(item)
+        if error:
+            invalid.append((index, error))
+            continue
+        key = json.dumps(item, sort_keys=True, default=str)
+        if key in unique_items:
+            unique_items[key][0].append(index)
+        else:
+            unique_items[key] = ([index], item)
+    
+    # The temporal and semantic analyses of all unique claims are run in bulk
+    unique_items = list(unique_items.values())
+    claim_objs = [build_claim_object(item) for _, item in unique_items]
+    temporal_scores = check_temporal_patterns_batch(
+        claim_objs,
+        [float(item.get('temporal_weight', 1.0)) for _, item in unique_items]
+    )
+    semantic_scores = analyze_semantic_alignment_batch(
+        claim_objs,
+        [item.get('reference_data', {}) for _, item in unique_items],
+        [float(item.get('semantic_weight', 1.0)) for _, item in unique_items]
+    )
+    
+    groups = {}
+    for (indices, item), temporal_score, semantic_score in zip(unique_items, temporal_scores, semantic_scores):
+        groups.setdefault(normalize_claim(item['claim']), []).append(
+            (indices, item, float(temporal_score), float(semantic_score))
+        )
+    
+    def generate():
+        for index, error in invalid:
+            yield json.dumps({"indices": [index], "error": error}) + "\n"
+        
+        futures = {
+            batch_executor.submit(score_claim_group, items[0][1]['claim'], items, deadline): items
+            for items in groups.values()
+        }
+        try:
+            for future in as_completed(futures):
+                try:
+                    results = future.result()
+                except Exception as e:
+                    results = [(indices, {"error": str(e)}) for indices, *_ in futures[future]]
+                for indices, result in results:
+                    yield json.dumps(dict(result, indices=indices)) + "\n"
+        finally:
+            # Stop the remaining work if the client goes away
+            for future in futures:
+                future.cancel()
+    
+    return Response(generate(), mimetype="application/x-ndjson")
+
+@app.route('/temporal/<claim_id>', methods=['POST'])
+def append_engagement(claim_id):
+    """
+    API endpoint to stream engagement counts of a claim
+    
+    Requires JSON input with:
+    - values: new engagement counts, in time order
+    - timestamps: time of each count in seconds since the epoch (optional, default now)
+    - temporal_weight: weight for temporal analysis (optional, default 1.0)
+    """
+    data = request.get_json()
+    
+    if not data or not isinstance(data.get('values'), list):
+        return jsonify({"error": "Missing required 'values' list"}), 400
+    
+    temporal_weight = float(data.get('temporal_weight', 1.0))
+    try:
+        temporal_score = temporal_analyzer.append(claim_id, data['values'], data.get('timestamps'))
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    
+    return jsonify({
+        "claim_id": claim_id,
+        "temporal_score": round(temporal_score * temporal_weight, 2),
+        "stats": temporal_analyzer.stats(claim_id)
+    })
+
+@app.route('/temporal/<claim_id>', methods=['GET'])
+def get_temporal_score(claim_id):
+    """API endpoint to get the current temporal score of a streamed claim"""
+    temporal_score = temporal_analyzer.score(claim_id)
+    if temporal_score is None:
+        return jsonify({"error": f"No engagement data for claim {claim_id}"}), 404
+    
+    temporal_weight = float(request.args.get('temporal_weight', 1.0))
+    return jsonify({
+        "claim_id": claim_id,
+        "temporal_score": round(temporal_score * temporal_weight, 2),
+        "stats": temporal_analyzer.stats(claim_id)
+    })
+
+@app.route('/timeseries/events', methods=['POST'])
+def ingest_timeseries_events():
+    """
+    API endpoint to append engagement events to the time series store
+    
+    Requires JSON input with:
+    - events: list of {"timestamp" (seconds since the epoch), "category", "value" (optional, default 1),
+      "claim_id" (optional, feeds the temporal score of that claim)}
+    """
+    data = request.get_json()
+    
+    if not data or not isinstance(data.get('events'), list):
+        return jsonify({"error": "Missing required 'events' list"}), 400
+    
+    events = data['events']
+    try:
+        ingested = timeseries_store.ingest(
+            [event['timestamp'] for event in events],
+            [event['category'] for event in events],
+            [event.get('value', 1) for event in events],
+            [event.get('claim_id') for event in events]
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid events: {str(e)}"}), 400
+    
+    return jsonify({"ingested": ingested, "events": timeseries_store.stats()["events"]})
+
+@app.route('/timeseries', methods=['GET'])
+def query_timeseries():
+    """
+    API endpoint to get downsampled engagement series per category
+    
+    Query parameters:
+    - categories: comma-separated category names (optional, default all)
+    - start, end: time range in seconds since the epoch (optional, default everything stored)
+    - points: maximum number of points per series, at least 3 (optional, default 500)
+    - method: downsampling method, "lttb" or "minmax" (optional, default "lttb")
+    - resolution: "minute", "hour" or "day" (optional, chosen from the time range by default)
+    """
+    categories = request.args.get('categories')
+    try:
+        points = int(request.args.get('points', TIMESERIES_DEFAULT_POINTS))
+        if points < TIMESERIES_MIN_POINTS:
+            raise ValueError(f"points must be at least {TIMESERIES_MIN_POINTS}")
+        result = timeseries_store.query(
+            categories=[c for c in categories.split(',') if c] if categories else None,
+            start=float(request.args['start']) if 'start' in request.args else None,
+            end=float(request.args['end']) if 'end' in request.args else None,
+            points=min(points, TIMESERIES_MAX_POINTS),
+            method=request.args.get('method', DOWNSAMPLING_METHODS[0]),
+            resolution=request.args.get('resolution')
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    return jsonify(result)
+
+@app.route('/reference/search', methods=['GET'])
+def search_reference_corpus():
+    """API endpoint to find the reference documents best aligned with a text (?q=...&k=5, at most REFERENCE_MAX_K)"""
+    if reference_index is None:
+        return jsonify({"error": "No reference corpus configured"}), 404
+    
+    text = request.args.get('q', '')
+    if not text:
+        return jsonify({"error": "Missing required 'q' parameter"}), 400
+    
+    try:
+        k = parse_reference_k(request.args.get('k', REFERENCE_TOP_K))
+    except ValueError as e:
+        return jsonify({"error": f"Invalid 'k' parameter: {str(e)}"}), 400
+    return jsonify({"query": text, "matches": reference_index.search(text, k)})
+
+@app.route('/graphs', methods=['POST'])
+def register_graph():
+    """
+    API endpoint to register a knowledge graph once
+    The returned graph_id can be sent as graph_data {"graph_id": ...} in later requests
+    
+    Requires JSON input with:
+    - nodes: list of {"id", "attributes"}
+    - edges: list of {"source", "target", "weight"}
+    """
+    data = request.get_json()
+    
+    if not data or not isinstance(data.get('nodes'), list):
+        return jsonify({"error": "Missing required 'nodes' list"}), 400
+    
+    try:
+        cached_graph = graph_cache.get_or_build(data)
+    except (KeyError, TypeError) as e:
+        return jsonify({"error": f"Invalid graph data: {str(e)}"}), 400
+    
+    return jsonify(cached_graph.summary()), 201
+
+@app.route('/graphs/<graph_id>', methods=['GET'])
+def get_graph(graph_id):
+    """API endpoint to check whether a graph is still registered"""
+    cached_graph = graph_cache.get(graph_id)
+    if cached_graph is None:
+        return jsonify({"error": f"Unknown graph ID {graph_id}"}), 404
+    return jsonify(cached_graph.summary())
+
+@app.route('/graphs/<graph_id>', methods=['DELETE'])
+def delete_graph(graph_id):
+    """API endpoint to drop a registered graph"""
+    if not graph_cache.remove(graph_id):
+        return jsonify({"error": f"Unknown graph ID {graph_id}"}), 404
+    return jsonify({"graph_id": graph_id, "deleted": True})
+
+def get_stored_graph():
+    """Current graph of the pipeline, or an error response when there is none"""
+    if graph_store is None:
+        return None, (jsonify({"error": "No graph artifacts configured"}), 404)
+    try:
+        return graph_store.get(), None
+    except FileNotFoundError as e:
+        return None, (jsonify({"error": str(e)}), 404)
+
+def get_node_budget():
+    return min(int(request.args.get('budget', NETWORK_DEFAULT_NODES)), NETWORK_MAX_NODES)
+
+@app.route('/network/communities', methods=['GET'])
+def get_network_communities():
+    """
+    API endpoint to get the community-collapsed graph: one node per community, edges weighted by the
+    summed similarity between communities
+    
+    Query parameters:
+    - min_weight: drop community edges lighter than this (optional, default 0)
+    - max_edges: keep only the heaviest community edges (optional, default NETWORK_MAX_EDGES)
+    """
+    graph, error = get_stored_graph()
+    if error:
+        return error
+    
+    try:
+        min_weight = float(request.args.get('min_weight', 0))
+        max_edges = min(int(request.args.get('max_edges', NETWORK_MAX_EDGES)), NETWORK_MAX_EDGES)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    return jsonify(graph.super_graph(min_weight, max_edges))
+
+@app.route('/network/communities/<int:community>', methods=['GET'])
+def get_network_community(community):
+    """
+    API endpoint to expand a community, its nodes are returned by pages, highest degree first
+    
+    Query parameters:
+    - page: page number (optional, default 0), "next_page" in the response is null after the last one
+    - budget: nodes per page (optional, default 500, at most 5000)
+    """
+    graph, error = get_stored_graph()
+    if error:
+        return error
+    
+    try:
+        page = int(request.args.get('page', 0))
+        budget = get_node_budget()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if page < 0 or budget < 1:
+        return jsonify({"error": "'page' must be >= 0 and 'budget' >= 1"}), 400
+    
+    try:
+        return jsonify(graph.community_page(community, page, budget, NETWORK_MAX_EDGES))
+    except KeyError:
+        return jsonify({"error": f"Unknown community {community}"}), 404
+
+@app.route('/network/viewport', methods=['GET'])
+def get_network_viewport():
+    """
+    API endpoint to get the nodes in a rectangle of the precomputed layout, with the edges between them
+    
+    Query parameters:
+    - x0, y0, x1, y1: corners of the rectangle, in layout coordinates
+    - budget: maximum number of nodes, the highest-degree ones are kept (optional, default 500, at most 5000)
+    """
+    graph, error = get_stored_graph()
+    if error:
+        return error
+    
+    try:
+        x0, y0, x1, y1 = (float(request.args[key]) for key in ('x0', 'y0', 'x1', 'y1'))
+        budget = get_node_budget()
+    except KeyError as e:
+        return jsonify({"error": f"Missing required '{e.args[0]}' parameter"}), 400
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        return jsonify(graph.viewport(x0, y0, x1, y1, max(budget, 1), NETWORK_MAX_EDGES))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 409
+
+@app.route('/network/neighbourhood/<int:node>', methods=['GET'])
+def get_network_neighbourhood(node):
+    """
+    API endpoint to highlight the neighbourhood of a node: only the nodes whose distance to the
+    selected node changed since the previous selection are returned
+    
+    Query parameters:
+    - hops: neighbourhood radius (optional, default 2, at most 3)
+    - previous: previously selected node (optional, everything is returned without it)
+    - previous_hops: radius of the previous selection (optional, default hops)
+    
+    "changed" lists node ids with their new level: 0 for the node, the number of hops for its
+    neighbours, -1 for nodes leaving the neighbourhood
+    """
+    graph, error = get_stored_graph()
+    if error:
+        return error
+    
+    try:
+        hops = min(int(request.args.get('hops', 2)), NETWORK_MAX_HOPS)
+        previous = int(request.args['previous']) if 'previous' in request.args else None
+        previous_hops = min(int(request.args.get('previous_hops', hops)), NETWORK_MAX_HOPS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        ids, levels, truncated = graph.neighbourhood(node, max(hops, 0), NETWORK_MAX_QUERY_NODES)
+        previous_ids, previous_levels = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        if previous is not None:
+            previous_ids, previous_levels, _ = graph.neighbourhood(previous, max(previous_hops, 0), NETWORK_MAX_QUERY_NODES)
+    except KeyError as e:
+        return jsonify({"error": f"Unknown node {e.args[0]}"}), 404
+    
+    changed_ids, changed_levels = style_changes(previous_ids, previous_levels, ids, levels)
+    return jsonify({
+        "version": graph.version,
+        "node": node,
+        "hops": hops,
+        "total_nodes": int(len(ids)),
+        "truncated": truncated,
+        "changed": {"id": changed_ids.tolist(), "level": changed_levels.tolist()}
+    })
+
+def parse_network_filter(args):
+    """Keyword arguments of StoredGraph.filter_nodes from query parameters, raises ValueError"""
+    def number(key, convert):
+        return convert(args[key]) if args.get(key, '') != '' else None
+    
+    communities = args.get('community')
+    return {
+        "communities": [int(c) for c in communities.split(',') if c] if communities else None,
+        "min_degree": number('min_degree', int),
+        "max_degree": number('max_degree', int),
+        "min_similarity": number('min_similarity', float),
+        "max_similarity": number('max_similarity', float),
+        "text": args.get('q') or None
+    }
+
+@app.route('/network/filter', methods=['GET'])
+def get_network_filter():
+    """
+    API endpoint to filter the nodes of the graph: only the nodes whose visibility changed since the
+    previous filter are returned
+    
+    Query parameters (all optional, combined with AND):
+    - community: comma-separated community ids
+    - min_degree, max_degree: degree range
+    - min_similarity, max_similarity: nodes with at least one edge whose similarity is in this range
+    - q: words that must all appear in the node label (the last one as a prefix)
+    - previous: URL-encoded query string of the previous filter (everything is returned without it)
+    
+    "changed" lists node ids with 1 when they become visible and -1 when they become hidden
+    """
+    graph, error = get_stored_graph()
+    if error:
+        return error
+    
+    try:
+        matched = graph.filter_nodes(**parse_network_filter(request.args))
+        previous = np.empty(0, dtype=np.int64)
+        if 'previous' in request.args:
+            previous = graph.filter_nodes(**parse_network_filter(dict(parse_qsl(request.args['previous']))))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    truncated = len(matched) > NETWORK_MAX_QUERY_NODES or len(previous) > NETWORK_MAX_QUERY_NODES
+    matched, previous = matched[:NETWORK_MAX_QUERY_NODES], previous[:NETWORK_MAX_QUERY_NODES]
+    changed_ids, changed_visible = style_changes(previous, np.ones(len(previous)), matched, np.ones(len(matched)))
+    return jsonify({
+        "version": graph.version,
+        "total_nodes": int(len(matched)),
+        "truncated": truncated,
+        "changed": {"id": changed_ids.tolist(), "visible": changed_visible.tolist()}
+    })
+
+@app.route('/network/search', methods=['GET'])
+def search_network():
+    """API endpoint to find nodes by label (?q=...&limit=20), highest degree first"""
+    graph, error = get_stored_graph()
+    if error:
+        return error
+    
+    text = request.args.get('q', '')
+    if not text:
+        return jsonify({"error": "Missing required 'q' parameter"}), 400
+    try:
+        limit = min(int(request.args.get('limit', NETWORK_SEARCH_LIMIT)), NETWORK_MAX_NODES)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    return jsonify(graph.search(text, limit))
+
+def get_job_queue():
+    """Job queue, or an error response when builds are not enabled"""
+    if job_queue is None:
+        return None, (jsonify({"error": "No build job directory configured"}), 404)
+    return job_queue, None
+
+@app.route('/jobs', methods=['POST'])
+def submit_build_job():
+    """
+    API endpoint to queue a graph build, returns the job to poll with GET /jobs/<id>
+    
+    Requires JSON input with either:
+    - urls: list of PDF URLs to fetch and build the graph from
+    - directory: directory of PDFs below CREDLEAF_BUILD_INPUT_ROOT
+    Optional:
+    - workspace: builds of a workspace share their embeddings and artifacts (default "default")
+    - communities: community detection method (default "louvain")
+    - format: "payload", "html" or "both" (default "payload")
+    - incremental: only process the documents changed since the workspace's last incremental build
+    """
+    queue, error = get_job_queue()
+    if error:
+        return error
+    
+    data = request.get_json()
+    if not data:
+        return jsonify({"error": "Missing JSON body"}), 400
+    
+    try:
+        job = queue.submit(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    return jsonify(job), 202
+
+@app.route('/jobs', methods=['GET'])
+def list_build_jobs():
+    """API endpoint to list the most recent build jobs (?limit=50)"""
+    queue, error = get_job_queue()
+    if error:
+        return error
+    
+    try:
+        limit = min(int(request.args.get('limit', 50)), 1000)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"jobs": queue.list(limit)})
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_build_job(job_id):
+    """API endpoint to poll a build job: status, current stage and the stages completed so far"""
+    queue, error = get_job_queue()
+    if error:
+        return error
+    
+    job = queue.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown job {job_id}"}), 404
+    return jsonify(job)
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_build_job(job_id):
+    """API endpoint to cancel a queued or running build job"""
+    queue, error = get_job_queue()
+    if error:
+        return error
+    
+    job = queue.cancel(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown job {job_id}"}), 404
+    return jsonify(job)
+
+@app.route('/jobs/<job_id>/artifacts', methods=['GET'])
+def list_build_artifacts(job_id):
+    """API endpoint to list the output files of a build job"""
+    queue, error = get_job_queue()
+    if error:
+        return error
+    
+    if queue.get(job_id) is None:
+        return jsonify({"error": f"Unknown job {job_id}"}), 404
+    return jsonify({"job_id": job_id, "artifacts": queue.artifacts(job_id)})
+
+@app.route('/jobs/<job_id>/artifacts/<name>', methods=['GET'])
+def get_build_artifact(job_id, name):
+    """API endpoint to download an output file of a build job (graph.json, graph.html)"""
+    queue, error = get_job_queue()
+    if error:
+        return error
+    
+    path = queue.artifact_path(job_id, name)
+    if path is None:
+        return jsonify({"error": f"Unknown artifact {name} of job {job_id}"}), 404
+    return send_file(path)
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Simple health check endpoint"""
-    return jsonify({"status": "healthy", "apis": list(FACT_CHECK_APIS.keys())})
+    return jsonify({
+        "status": "healthy",
+        "apis": list(FACT_CHECK_APIS.keys()),
+        "cache": api_cache.stats(),
+        "timeseries": timeseries_store.stats(),
+        "jobs": job_queue.stats() if job_queue is not None else None
+    })
+
+@app.after_request
+def allow_cross_origin(response):
+    """Let the separately served front end call the API, when its origin is configured"""
+    if CORS_ALLOWED_ORIGIN:
+        response.headers['Access-Control-Allow-Origin'] = CORS_ALLOWED_ORIGIN
+        response.headers['Access-Control-Allow-Headers'] = 'Content-Type'
+    return response
 
 if __name__ == '__main__':
     app.run(debug=True, port=8000)
\ No newline at end of file
@@ -0,0 +1,84 @@
+"""
+Scaling benchmark of the DataFrame and graph construction steps of Graph/generate_graph.py
+Each step is timed on inputs of doubling size; with linear scaling the time per row stays flat
+and each doubling takes about twice as long
+
+Usage: python bench_dataframes.py [base_chunks] [doublings]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Graph"))
+from generate_graph import (documents2Dataframe, graph2Df, colors2Community,
+                            build_networkx_graph, add_node_attributes)
+
+EDGES_PER_CHUNK = 10
+COMMUNITY_SIZE = 50
+
+class SyntheticDocument:
+    """Stand-in for a LangChain Document"""
+    def __init__(self, page_content, metadata):
+        self.page_content = page_content
+        self.metadata = metadata
+
+# Synthetic inputs of every step for a corpus of n chunks
+def make_inputs(n, seed=0):
+    rng = np.random.default_rng(seed)
+    documents = [
+        SyntheticDocument(f"chunk {i} of a synthetic document", {"source": f"doc{i // 20}.pdf", "page": i % 20})
+        for i in range(n)
+    ]
+    sources = rng.integers(0, n, n * EDGES_PER_CHUNK)
+    targets = rng.integers(0, n, n * EDGES_PER_CHUNK)
+    similarities = rng.uniform(0.8, 1.0, n * EDGES_PER_CHUNK)
+    names = np.array([f"chunk {i}..." for i in range(n)], dtype=object)
+    concepts = {
+        "source": names[sources],
+        "target": names[targets],
+        "similarity": similarities,
+        "relationship": np.char.mod("Similarity: %.2f", similarities).astype(object)
+    }
+    communities = [list(names[start:start + COMMUNITY_SIZE]) for start in range(0, n, COMMUNITY_SIZE)]
+    return documents, concepts, communities
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+# Time every step for one corpus size, returns {step: (rows, seconds)}
+def run_steps(n):
+    documents, concepts, communities = make_inputs(n)
+    _, documents_time = timed(documents2Dataframe, documents)
+    dfg, graph_df_time = timed(graph2Df, concepts)
+    colors, colors_time = timed(colors2Community, communities)
+    G, build_time = timed(build_networkx_graph, dfg)
+    _, attributes_time = timed(add_node_attributes, G, colors)
+    return {
+        "documents2Dataframe": (n, documents_time),
+        "graph2Df": (len(dfg), graph_df_time),
+        "colors2Community": (n, colors_time),
+        "build_networkx_graph": (len(dfg), build_time),
+        "add_node_attributes": (n, attributes_time)
+    }
+
+def main(base_chunks=5000, doublings=4):
+    sizes = [base_chunks * 2 ** i for i in range(doublings)]
+    results = [run_steps(n) for n in sizes]
+
+    print(f"{'step':<22}{'rows':>10}{'seconds':>10}{'us/row':>10}{'x prev':>8}")
+    for step in results[0]:
+        previous = None
+        for result in results:
+            rows, seconds = result[step]
+            growth = f"{seconds / previous:.2f}" if previous else "-"
+            print(f"{step:<22}{rows:>10}{seconds:>10.3f}{seconds / rows * 1e6:>10.2f}{growth:>8}")
+            previous = seconds
+
+if __name__ == "__main__":
+    base_chunks = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    doublings = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    main(base_chunks, doublings)
@@ -0,0 +1,252 @@
+"""
+Benchmark suite of the scoring and graph-building hot paths on synthetic data
+Every benchmark runs over a sweep of input sizes and records the latency percentiles, the
+throughput and the peak Python memory of one run. The /factcheck path runs end to end through
+the Flask app against local stand-ins of the fact-checking APIs, so no network access is needed
+
+Usage:
+    python bench_suite.py [--quick] [--only=name,...] [--repeats=N] [--output=results.json]
+    python bench_suite.py compare baseline.json results.json [--threshold=0.10]
+
+compare exits with status 1 when a median latency or a peak memory grew by more than the
+threshold, so two result files of the same machine can gate a change
+"""
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime
+
+import numpy as np
+
+BENCHMARKS_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS_DIRECTORY, ".."))
+sys.path.insert(0, os.path.join(BENCHMARKS_DIRECTORY, "..", "Graph"))
+import api
+from graph_cache import GraphCache
+from generate_graph import df2Graph, graph2Df
+from communities import detect_communities
+from similarity import similarity_join
+
+from bench_dataframes import make_inputs, EDGES_PER_CHUNK
+from synthetic import (random_claims, random_text, scale_free_graph, scale_free_graph_data, chunk_dataframe,
+                       embedding_matrix, RandomEmbeddings, StubProviders)
+
+DEFAULT_REPEATS = 5
+DEFAULT_OUTPUT = "benchmark-results.json"
+DEFAULT_THRESHOLD = 0.10
+PROVIDER_LATENCY = 0.005  # Seconds before a stubbed fact-checking API answers
+EMBEDDING_DIMENSION = 256
+
+# Changes below these are noise whatever the threshold
+MIN_LATENCY_CHANGE_MS = 0.5
+MIN_MEMORY_CHANGE_BYTES = 1024 * 1024
+
+# Run run(i) for samples i = 0..repeats-1 and one more traced with tracemalloc for the peak memory,
+# units is the number of items (claims, chunks, edges, ...) one run processes.
+# The progress printed by the measured code is dropped so it does not mix with the results
+def measure(run, units, repeats):
+    timings = []
+    with redirect_stdout(io.StringIO()):
+        for i in range(repeats):
+            started = time.perf_counter()
+            run(i)
+            timings.append(time.perf_counter() - started)
+
+        tracemalloc.start()
+        try:
+            run(repeats)
+            _, peak_memory = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    timings_ms = np.array(timings) * 1000
+    return {
+        "units": units,
+        "samples": repeats,
+        "mean_ms": float(timings_ms.mean()),
+        "p50_ms": float(np.percentile(timings_ms, 50)),
+        "p90_ms": float(np.percentile(timings_ms, 90)),
+        "p99_ms": float(np.percentile(timings_ms, 99)),
+        "throughput": units * repeats / max(sum(timings), 1e-9),
+        "peak_memory_bytes": int(peak_memory)
+    }
+
+# Temporal score of claims with engagement series of the given length
+def bench_temporal(length, repeats):
+    claims = [api.build_claim_object(data) for data in random_claims(repeats + 1, series_length=length)]
+    return measure(lambda i: api.check_temporal_patterns(claims[i]), 1, repeats)
+
+# Word-overlap semantic alignment against a reference text of the given number of words
+def bench_semantic(words, repeats):
+    rng = np.random.default_rng(0)
+    claims = [api.build_claim_object(data) for data in random_claims(repeats + 1, words=20, series_length=0)]
+    reference_data = {"reference_text": random_text(rng, words)}
+    return measure(lambda i: api.analyze_semantic_alignment(claims[i], reference_data), 1, repeats)
+
+# Graph score of a claim on a registered graph, centralities already computed
+def bench_graph_warm(nodes, repeats):
+    api.graph_cache = GraphCache(max_graphs=api.GRAPH_CACHE_SIZE)
+    graph_id = api.graph_cache.get_or_build(scale_free_graph_data(nodes)).graph_id
+    claims = [api.build_claim_object(data) for data in random_claims(repeats + 1, graph_nodes=nodes)]
+    api.evaluate_graph_structure(claims[0], {"graph_id": graph_id})
+    return measure(lambda i: api.evaluate_graph_structure(claims[i], {"graph_id": graph_id}), 1, repeats)
+
+# Graph score of a claim on a graph seen for the first time: parsing, building and centralities
+def bench_graph_cold(nodes, repeats):
+    graph_data = scale_free_graph_data(nodes)
+    claims = [api.build_claim_object(data) for data in random_claims(repeats + 1, graph_nodes=nodes)]
+
+    def run(i):
+        api.graph_cache = GraphCache(max_graphs=api.GRAPH_CACHE_SIZE)
+        api.evaluate_graph_structure(claims[i], graph_data)
+
+    return measure(run, 1, repeats)
+
+# POST /factcheck through the Flask app with stubbed providers, on a registered graph of the given
+# number of nodes (none for 0). Claims are unique so the provider cache never answers
+def bench_factcheck(nodes, repeats):
+    api.graph_cache = GraphCache(max_graphs=api.GRAPH_CACHE_SIZE)
+    bodies = random_claims(repeats + 1, graph_nodes=nodes, seed=nodes)
+    if nodes:
+        graph_id = api.graph_cache.get_or_build(scale_free_graph_data(nodes)).graph_id
+        for body in bodies:
+            body["graph_data"] = {"graph_id": graph_id}
+    client = api.app.test_client()
+
+    def run(i):
+        response = client.post("/factcheck", json=dict(bodies[i], claim=f"{bodies[i]['claim']} {time.time_ns()}"))
+        if response.status_code != 200:
+            raise RuntimeError(f"/factcheck answered {response.status_code}")
+        # A provider error would return early and make the path look faster than it is
+        if len(response.get_json()["api_details"]) != len(api.FACT_CHECK_APIS):
+            raise RuntimeError(f"A stubbed provider failed: {response.get_json()['api_details']}")
+
+    # Prime the sessions and the graph centralities once
+    run(0)
+    return measure(run, 1, repeats)
+
+# Embedding and similarity join of a chunk table with the stub embedding model
+def bench_df2graph(chunks, repeats):
+    df = chunk_dataframe(chunks)
+    model = RandomEmbeddings(EMBEDDING_DIMENSION)
+    return measure(lambda i: df2Graph(df, model), chunks, repeats)
+
+# Threshold similarity join of a random embedding matrix
+def bench_similarity_join(rows, repeats):
+    vectors = embedding_matrix(rows, EMBEDDING_DIMENSION)
+    return measure(lambda i: similarity_join(vectors, 0.8), rows, repeats)
+
+# Node and edge tables of the similarity edges of a chunk corpus
+def bench_graph2df(chunks, repeats):
+    _, concepts, _ = make_inputs(chunks)
+    return measure(lambda i: graph2Df(concepts), chunks * EDGES_PER_CHUNK, repeats)
+
+def bench_communities(method):
+    def bench(nodes, repeats):
+        G = scale_free_graph(nodes)
+        return measure(lambda i: detect_communities(G, method), nodes, repeats)
+    return bench
+
+# name -> (function, sizes, size meaning), the last size is skipped with --quick
+BENCHMARKS = {
+    "temporal": (bench_temporal, [100, 1000, 10000], "engagement points"),
+    "semantic": (bench_semantic, [100, 1000, 10000], "reference words"),
+    "graph_warm": (bench_graph_warm, [500, 2000, 8000], "graph nodes"),
+    "graph_cold": (bench_graph_cold, [500, 2000, 8000], "graph nodes"),
+    "factcheck": (bench_factcheck, [0, 2000, 8000], "graph nodes"),
+    "df2Graph": (bench_df2graph, [1000, 4000, 16000], "chunks"),
+    "similarity_join": (bench_similarity_join, [5000, 10000, 20000], "embeddings"),
+    "graph2Df": (bench_graph2df, [5000, 20000, 80000], "chunks"),
+    "louvain": (bench_communities("louvain"), [1000, 4000, 16000], "graph nodes"),
+    "label_propagation": (bench_communities("label_propagation"), [1000, 4000, 16000], "graph nodes")
+}
+
+def run_benchmarks(names, repeats, quick=False):
+    results = []
+    with StubProviders(PROVIDER_LATENCY) as providers:
+        for api_name in api.FACT_CHECK_APIS:
+            api.FACT_CHECK_APIS[api_name]["url"] = providers.url(api_name)
+
+        print(f"{'benchmark':<18}{'size':>8}{'p50 ms':>11}{'p90 ms':>11}{'p99 ms':>11}{'per s':>12}{'peak MB':>9}")
+        for name in names:
+            bench, sizes, size_name = BENCHMARKS[name]
+            for size in sizes[:-1] if quick else sizes:
+                result = dict(benchmark=name, size=size, size_name=size_name, **bench(size, repeats))
+                results.append(result)
+                print(f"{name:<18}{size:>8}{result['p50_ms']:>11.2f}{result['p90_ms']:>11.2f}"
+                      f"{result['p99_ms']:>11.2f}{result['throughput']:>12.1f}"
+                      f"{result['peak_memory_bytes'] / 2 ** 20:>9.1f}")
+    return results
+
+# Print the changes between two result files, returns the number of regressions
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    previous = {(r["benchmark"], r["size"]): r for r in baseline["results"]}
+    regressions = 0
+
+    print(f"{'benchmark':<18}{'size':>8}{'p50 ms':>22}{'peak MB':>20}")
+    for result in current["results"]:
+        before = previous.get((result["benchmark"], result["size"]))
+        if before is None:
+            continue
+        latency_change = result["p50_ms"] - before["p50_ms"]
+        memory_change = result["peak_memory_bytes"] - before["peak_memory_bytes"]
+        slower = (latency_change > MIN_LATENCY_CHANGE_MS
+                  and result["p50_ms"] > before["p50_ms"] * (1 + threshold))
+        larger = (memory_change > MIN_MEMORY_CHANGE_BYTES
+                  and result["peak_memory_bytes"] > before["peak_memory_bytes"] * (1 + threshold))
+        regressions += slower or larger
+        latency = f"{before['p50_ms']:.2f} -> {result['p50_ms']:.2f}"
+        memory = f"{before['peak_memory_bytes'] / 2 ** 20:.1f} -> {result['peak_memory_bytes'] / 2 ** 20:.1f}"
+        flag = "  REGRESSION" if slower or larger else ""
+        print(f"{result['benchmark']:<18}{result['size']:>8}{latency:>22}{memory:>20}{flag}")
+
+    print(f"{regressions} regression(s) above {threshold:.0%}")
+    return regressions
+
+def parse_options(arguments):
+    options = {}
+    positional = []
+    for argument in arguments:
+        if argument.startswith("--"):
+            key, _, value = argument[2:].partition("=")
+            options[key] = value
+        else:
+            positional.append(argument)
+    return positional, options
+
+def main(arguments):
+    positional, options = parse_options(arguments)
+
+    if positional[:1] == ["compare"]:
+        if len(positional) != 3:
+            sys.exit("Usage: python bench_suite.py compare baseline.json results.json [--threshold=0.10]")
+        with open(positional[1]) as f:
+            baseline = json.load(f)
+        with open(positional[2]) as f:
+            current = json.load(f)
+        sys.exit(1 if compare(baseline, current, float(options.get("threshold", DEFAULT_THRESHOLD))) else 0)
+
+    names = options["only"].split(",") if options.get("only") else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        sys.exit(f"Unknown benchmark(s): {', '.join(unknown)}. Available: {', '.join(BENCHMARKS)}")
+
+    results = run_benchmarks(names, int(options.get("repeats", DEFAULT_REPEATS)), "quick" in options)
+    output_path = options.get("output") or DEFAULT_OUTPUT
+    with open(output_path, "w") as f:
+        json.dump({
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.node(),
+            "results": results
+        }, f, indent=2)
+    print(f"Results saved to {output_path}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,169 @@
+"""
+Synthetic inputs for the benchmarks: claims, engagement series, scale-free graphs, chunk tables,
+embedding matrices, and local stand-ins for the embedding model and the fact-checking APIs
+Everything is generated from a seed, so runs with the same sizes get the same data
+"""
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+VOCABULARY = np.array([
+    "vaccine", "vaccines", "covid", "mrna", "dose", "booster", "immunity", "herd", "trial", "study",
+    "safety", "side", "effects", "autism", "myocarditis", "efficacy", "variant", "spike", "protein",
+    "antibodies", "children", "adults", "elderly", "risk", "death", "hospital", "cases", "data",
+    "report", "government", "pharma", "doctors", "nurses", "mandate", "freedom", "natural", "infection",
+    "fertility", "dna", "microchip", "tracking", "ingredients", "aluminium", "mercury", "flu", "measles",
+    "polio", "outbreak", "pandemic", "lockdown", "masks", "science", "evidence", "peer", "reviewed",
+    "misinformation", "claims", "experts", "warn", "approve", "approved", "emergency", "use", "rollout"
+], dtype=object)
+
+# Random text of n words from the vaccine vocabulary
+def random_text(rng, words):
+    return " ".join(rng.choice(VOCABULARY, words))
+
+# Engagement counts over time: a random walk that may grow, stall or spike, one row per series
+def engagement_series(count, length, seed=0):
+    rng = np.random.default_rng(seed)
+    trend = rng.normal(0.5, 1.0, (count, 1))
+    steps = rng.normal(trend, 3.0, (count, length))
+    spikes = rng.random((count, length)) < 0.02
+    steps[spikes] += rng.exponential(50.0, spikes.sum())
+    return np.maximum(np.cumsum(steps, axis=1) + 100, 0).round()
+
+# /factcheck request bodies with claim text, id, date and an engagement series
+def random_claims(count, words=12, series_length=24, seed=0, graph_nodes=0):
+    rng = np.random.default_rng(seed)
+    series = engagement_series(count, series_length, seed) if series_length else None
+    today = datetime(2025, 1, 1)
+    claims = []
+    for i in range(count):
+        claim = {
+            "claim": random_text(rng, words),
+            "claim_id": int(rng.integers(graph_nodes)) if graph_nodes else f"claim-{seed}-{i}",
+            "claim_date": (today - timedelta(days=int(rng.integers(0, 365)))).strftime("%Y-%m-%d"),
+        }
+        if series is not None:
+            claim["engagement_timeseries"] = series[i].tolist()
+        claims.append(claim)
+    return claims
+
+# Scale-free (Barabási–Albert) graph of n nodes, in the graph_data format of /factcheck and /graphs
+def scale_free_graph_data(n, edges_per_node=3, seed=0):
+    G = nx.barabasi_albert_graph(n, min(edges_per_node, max(n - 1, 1)), seed=seed)
+    rng = np.random.default_rng(seed)
+    weights = rng.uniform(0.5, 1.0, G.number_of_edges())
+    return {
+        "nodes": [{"id": node, "attributes": {}} for node in G.nodes],
+        "edges": [
+            {"source": u, "target": v, "weight": float(weight)} for (u, v), weight in zip(G.edges, weights)
+        ]
+    }
+
+# Scale-free NetworkX graph of n nodes with similarity weights, for community detection
+def scale_free_graph(n, edges_per_node=3, seed=0):
+    G = nx.barabasi_albert_graph(n, min(edges_per_node, max(n - 1, 1)), seed=seed)
+    rng = np.random.default_rng(seed)
+    nx.set_edge_attributes(G, {edge: float(w) for edge, w in zip(G.edges, rng.uniform(0.8, 1.0, G.number_of_edges()))}, "weight")
+    return G
+
+# Chunk table like documents2Dataframe's output, texts drawn from a small set of topics so the
+# chunks of a topic are similar to each other
+def chunk_dataframe(n, words=60, topics=20, seed=0):
+    rng = np.random.default_rng(seed)
+    topic_words = [rng.choice(VOCABULARY, 12, replace=False) for _ in range(topics)]
+    texts = []
+    for i in range(n):
+        topic = topic_words[i % topics]
+        mixed = np.where(rng.random(words) < 0.7, rng.choice(topic, words), rng.choice(VOCABULARY, words))
+        texts.append(" ".join(mixed))
+    return pd.DataFrame({
+        "page_content": texts,
+        "source": [f"doc{i // 20}.pdf" for i in range(n)],
+        "page": [i % 20 for i in range(n)]
+    })
+
+# Random unit vectors, rows in clusters so a similarity threshold keeps a realistic share of pairs
+# (rows of the same cluster have a cosine similarity of about 0.86)
+def embedding_matrix(n, dimension=256, clusters=50, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dimension))
+    vectors = centres[rng.integers(clusters, size=n)] + rng.normal(scale=0.4, size=(n, dimension))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+class RandomEmbeddings:
+    """
+    Embedding model with the LangChain interface returning a fixed random vector per text, clustered
+    like embedding_matrix, with an optional delay per request to stand in for the embedding server
+    """
+    def __init__(self, dimension=256, clusters=50, latency=0.0, seed=0):
+        self.dimension = dimension
+        self.latency = latency
+        self.centres = np.random.default_rng(seed).normal(size=(clusters, dimension))
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    def embed_documents(self, texts):
+        if self.latency:
+            time.sleep(self.latency)
+        vectors = []
+        for text in texts:
+            text_seed = int.from_bytes(hashlib.md5(text.encode("utf-8")).digest()[:8], "little")
+            rng = np.random.default_rng(text_seed)
+            vector = self.centres[text_seed % len(self.centres)] + rng.normal(scale=0.4, size=self.dimension)
+            vectors.append((vector / np.linalg.norm(vector)).tolist())
+        return vectors
+
+# Canned responses of the fact-checking APIs configured in api.py, one per URL path
+STUB_RESPONSES = {
+    "google_factcheck": {"claims": [{"text": "stub", "ratingValue": 4}, {"text": "stub", "ratingValue": 7}]},
+    "politifact": {"results": [{"ruling": {"slug": "half-true"}}, {"ruling": {"slug": "mostly-true"}}]},
+    "open_ai": {"choices": [{"text": " 6.5"}]}
+}
+
+class StubProviders:
+    """
+    Local HTTP server answering like the fact-checking APIs after a fixed latency (in seconds),
+    so the /factcheck path runs end to end without network access. Use as a context manager and
+    point the APIs at url(name)
+    """
+    def __init__(self, latency=0.005):
+        latency_seconds = latency
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                name = self.path.split("?")[0].strip("/")
+                if latency_seconds:
+                    time.sleep(latency_seconds)
+                body = json.dumps(STUB_RESPONSES.get(name, {})).encode("utf-8")
+                self.send_response(200 if name in STUB_RESPONSES else 404)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def url(self, name):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/{name}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,475 @@
+import ipaddress
+import json
+import os
+import re
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from urllib.parse import urljoin, urlparse
+
+import requests
+
+# The community methods are part of the graph pipeline
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "Graph"))
+from communities import COMMUNITY_METHODS
+
+GRAPH_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Graph", "generate_graph.py")
+BUILD_STAGES = ("load", "split", "embed", "similarity", "communities", "render")  # Same as generate_graph.py
+OUTPUT_FORMATS = ("payload", "html", "both")
+JOB_STATES = ("queued", "running", "succeeded", "failed", "cancelled")
+PROGRESS_PREFIX = "PROGRESS "
+WORKSPACE_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+JOB_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+LOG_TAIL_LINES = 20
+HEARTBEAT_INTERVAL = 10.0  # Seconds between the heartbeats of a process's running jobs
+STALE_AFTER = 60.0  # A running job without a heartbeat for this long is queued again
+MAX_REDIRECTS = 5
+HOSTNAME_PATTERN = re.compile(r"^(?=.{1,253}\.?$)[A-Za-z0-9]([A-Za-z0-9-]{0,61}[A-Za-z0-9])?(\.[A-Za-z0-9]([A-Za-z0-9-]{0,61}[A-Za-z0-9])?)*\.?$")
+
+class JobCancelled(Exception):
+    pass
+
+def check_url(url):
+    """
+    Raise ValueError unless url is http(s) with a valid host name, and a public address when the host
+    is a literal IP. This check doesn't resolve the host, check_public_url does
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise ValueError(f"Only http(s) URLs can be fetched: {url}")
+    parsed.port  # Raises ValueError for an invalid port
+    try:
+        ip = ipaddress.ip_address(parsed.hostname)
+    except ValueError:
+        try:
+            hostname = parsed.hostname.encode("idna").decode("ascii")
+        except UnicodeError:
+            hostname = None
+        if not hostname or not HOSTNAME_PATTERN.match(hostname):
+            raise ValueError(f"Invalid host name in {url}")
+    else:
+        check_public_address(ip, parsed.hostname)
+
+def check_public_address(ip, hostname):
+    if not ip.is_global or ip.is_multicast:
+        raise ValueError(f"{hostname} is not a public address")
+
+def check_public_url(url):
+    """
+    Raise ValueError unless url passes check_url and every address of its host is a public one, so
+    builds can't be used to reach the server's own network (loopback, private, link-local, cloud metadata)
+    """
+    check_url(url)
+    parsed = urlparse(url)
+    port = parsed.port or (443 if parsed.scheme == "https" else 80)
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(parsed.hostname, port, proto=socket.IPPROTO_TCP)}
+    except socket.gaierror:
+        raise ValueError(f"Unknown host {parsed.hostname}")
+    for address in addresses:
+        check_public_address(ipaddress.ip_address(address.split("%")[0]), parsed.hostname)
+
+class JobQueue:
+    """
+    Graph builds submitted through the API, run by a bounded pool of worker threads that each
+    start Graph/generate_graph.py in a subprocess, so a build never holds a request thread.
+    Jobs are kept in SQLite, so several server processes can share a queue: each running job records
+    the process that owns it and a heartbeat, and a job whose process stopped sending heartbeats (it
+    stopped or crashed) is queued again. Builds of the same workspace (embedding cache, incremental
+    state and artifacts) run one at a time across all processes
+    """
+    def __init__(self, directory, workers=2, input_root=None, max_documents=1000, max_download_bytes=50 * 1024 * 1024,
+                 download_timeout=30.0, python=sys.executable):
+        self.directory = os.path.abspath(directory)
+        self.input_root = os.path.realpath(input_root) if input_root else None
+        self.max_documents = max_documents
+        self.max_download_bytes = max_download_bytes
+        self.download_timeout = download_timeout
+        self.python = python
+        self.database_path = os.path.join(self.directory, "jobs.sqlite3")
+        os.makedirs(self.directory, exist_ok=True)
+
+        self.owner = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.condition = threading.Condition()
+        self.running = set()  # Ids of the jobs run by this process
+        self.processes = {}  # Job id -> subprocess of the running builds
+        self.cancelled = set()
+
+        with self._connect() as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    workspace TEXT NOT NULL,
+                    request TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    started REAL,
+                    finished REAL,
+                    stage TEXT,
+                    stages TEXT NOT NULL DEFAULT '[]',
+                    error TEXT,
+                    owner TEXT,
+                    heartbeat REAL,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            # Queues created before jobs had owners
+            columns = {row["name"] for row in connection.execute("PRAGMA table_info(jobs)")}
+            for column, definition in (("owner", "TEXT"), ("heartbeat", "REAL"),
+                                       ("cancel_requested", "INTEGER NOT NULL DEFAULT 0")):
+                if column not in columns:
+                    connection.execute(f"ALTER TABLE jobs ADD COLUMN {column} {definition}")
+            self._requeue_stale(connection)
+
+        self.workers = [
+            threading.Thread(target=self._work, name=f"build-worker-{i}", daemon=True) for i in range(workers)
+        ]
+        for worker in self.workers:
+            worker.start()
+        if workers:
+            threading.Thread(target=self._heartbeat, name="build-heartbeat", daemon=True).start()
+
+    @contextmanager
+    def _connect(self):
+        """Connection committing on success, one per operation so any thread can use the queue."""
+        connection = sqlite3.connect(self.database_path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def validate_request(self, data):
+        """Normalized build request, raises ValueError for an invalid one."""
+        if not isinstance(data, dict):
+            raise ValueError("The build request must be a JSON object")
+        urls = data.get("urls") or []
+        directory = data.get("directory")
+        if not isinstance(urls, list) or not all(isinstance(url, str) for url in urls):
+            raise ValueError("'urls' must be a list of URLs")
+        if len(urls) > self.max_documents:
+            raise ValueError(f"Too many documents, at most {self.max_documents} per build")
+        if directory is not None and not isinstance(directory, str):
+            raise ValueError("'directory' must be a path")
+        if bool(urls) == bool(directory):
+            raise ValueError("Give either 'urls' or 'directory'")
+        # Host names are resolved and checked again before each download, not on the request thread
+        for url in urls:
+            check_url(url)
+        if directory is not None:
+            if self.input_root is None:
+                raise ValueError("Building from a server directory is not enabled")
+            path = os.path.realpath(os.path.join(self.input_root, str(directory)))
+            if os.path.commonpath([path, self.input_root]) != self.input_root or not os.path.isdir(path):
+                raise ValueError(f"Unknown input directory {directory}")
+
+        workspace = data.get("workspace", "default")
+        if not isinstance(workspace, str) or not WORKSPACE_PATTERN.match(workspace):
+            raise ValueError("'workspace' must be 1-64 letters, digits, '-' or '_'")
+        communities = data.get("communities", "louvain")
+        if communities not in COMMUNITY_METHODS:
+            raise ValueError(f"'communities' must be one of {COMMUNITY_METHODS}")
+        output_format = data.get("format", "payload")
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"'format' must be one of {OUTPUT_FORMATS}")
+        incremental = data.get("incremental", False)
+        if not isinstance(incremental, bool):
+            raise ValueError("'incremental' must be true or false")
+
+        return {
+            "urls": urls,
+            "directory": directory,
+            "workspace": workspace,
+            "communities": communities,
+            "format": output_format,
+            "incremental": incremental
+        }
+
+    def submit(self, data):
+        """Queue a build, returns the job. Raises ValueError for an invalid request."""
+        build = self.validate_request(data)
+        job_id = uuid.uuid4().hex
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT INTO jobs (id, status, workspace, request, created) VALUES (?, 'queued', ?, ?, ?)",
+                (job_id, build["workspace"], json.dumps(build), time.time())
+            )
+        with self.condition:
+            self.condition.notify()
+        return self.get(job_id)
+
+    def get(self, job_id):
+        """Job as a dict, None for an unknown job."""
+        with self._connect() as connection:
+            row = connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row) if row is not None else None
+
+    def list(self, limit=50):
+        """Most recent jobs first."""
+        with self._connect() as connection:
+            rows = connection.execute("SELECT * FROM jobs ORDER BY created DESC LIMIT ?", (limit,)).fetchall()
+        return [self._job(row) for row in rows]
+
+    def cancel(self, job_id):
+        """
+        Cancel a queued or running job, returns the job or None for an unknown job.
+        A job running in another process is stopped by that process on its next heartbeat
+        """
+        with self._connect() as connection:
+            cancelled = connection.execute(
+                "UPDATE jobs SET status = 'cancelled', finished = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id)
+            ).rowcount
+            if not cancelled:
+                connection.execute(
+                    "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'", (job_id,)
+                )
+        with self.condition:
+            if job_id in self.running:
+                self._stop_locally(job_id)
+        return self.get(job_id)
+
+    def output_directory(self, job_id):
+        return os.path.join(self.directory, "jobs", job_id, "output")
+
+    def artifacts(self, job_id):
+        """Names of the output files of a job."""
+        if not JOB_ID_PATTERN.match(job_id):
+            return []
+        directory = self.output_directory(job_id)
+        return sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+
+    def artifact_path(self, job_id, name):
+        """Path of an output file of a job, None when there is no such file."""
+        return os.path.join(self.output_directory(job_id), name) if name in self.artifacts(job_id) else None
+
+    def stats(self):
+        with self._connect() as connection:
+            counts = dict(connection.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {"workers": len(self.workers), **{state: counts.get(state, 0) for state in JOB_STATES}}
+
+    def _job(self, row):
+        stages = json.loads(row["stages"])
+        # The current (or last, for failed and cancelled jobs) stage is not complete
+        completed = max(len(stages) - 1, 0)
+        return {
+            "id": row["id"],
+            "status": row["status"],
+            "workspace": row["workspace"],
+            "request": json.loads(row["request"]),
+            "created": row["created"],
+            "started": row["started"],
+            "finished": row["finished"],
+            "stage": row["stage"],
+            "stages": stages,
+            "progress": 1.0 if row["status"] == "succeeded" else round(completed / len(BUILD_STAGES), 2),
+            "error": row["error"],
+            "artifacts": self.artifacts(row["id"]) if row["status"] == "succeeded" else []
+        }
+
+    def _requeue_stale(self, connection):
+        """Queue again the running jobs of processes that stopped sending heartbeats."""
+        stale = (time.time() - STALE_AFTER,)
+        condition = "status = 'running' AND (heartbeat IS NULL OR heartbeat < ?)"
+        connection.execute(
+            f"UPDATE jobs SET status = 'cancelled', finished = ? WHERE {condition} AND cancel_requested = 1",
+            (time.time(),) + stale
+        )
+        requeued = connection.execute(
+            "UPDATE jobs SET status = 'queued', started = NULL, stage = NULL, stages = '[]', owner = NULL, "
+            f"heartbeat = NULL WHERE {condition}", stale
+        ).rowcount
+        if requeued:
+            print(f"Queued {requeued} interrupted build jobs again")
+
+    def _claim(self):
+        """Mark the oldest queued job of an idle workspace as running, None when there is none."""
+        with self.condition:
+            with self._connect() as connection:
+                # Claims of all processes are serialized by the write lock of the database
+                connection.execute("BEGIN IMMEDIATE")
+                self._requeue_stale(connection)
+                row = connection.execute("""
+                    SELECT id, workspace, request FROM jobs
+                    WHERE status = 'queued'
+                    AND workspace NOT IN (SELECT workspace FROM jobs WHERE status = 'running')
+                    ORDER BY created LIMIT 1
+                """).fetchone()
+                if row is None:
+                    return None
+                now = time.time()
+                connection.execute(
+                    "UPDATE jobs SET status = 'running', started = ?, owner = ?, heartbeat = ? WHERE id = ?",
+                    (now, self.owner, now, row["id"])
+                )
+                self.running.add(row["id"])
+                return row["id"], row["workspace"], json.loads(row["request"])
+
+    def _heartbeat(self):
+        """Keep the jobs of this process alive, stopping those cancelled or taken over elsewhere."""
+        while True:
+            time.sleep(HEARTBEAT_INTERVAL)
+            try:
+                with self._connect() as connection:
+                    connection.execute(
+                        "UPDATE jobs SET heartbeat = ? WHERE owner = ? AND status = 'running'", (time.time(), self.owner)
+                    )
+                    active = {row["id"] for row in connection.execute(
+                        "SELECT id FROM jobs WHERE owner = ? AND status = 'running' AND cancel_requested = 0",
+                        (self.owner,)
+                    )}
+                with self.condition:
+                    for job_id in self.running - active:
+                        self._stop_locally(job_id)
+            except sqlite3.Error as e:
+                print(f"Build job heartbeat failed: {e}")
+
+    def _stop_locally(self, job_id):
+        """Stop a job of this process, called holding the condition."""
+        self.cancelled.add(job_id)
+        process = self.processes.get(job_id)
+        if process is not None:
+            process.terminate()
+
+    def _work(self):
+        while True:
+            claimed = self._claim()
+            if claimed is None:
+                with self.condition:
+                    self.condition.wait(timeout=5.0)
+                continue
+
+            job_id, workspace, build = claimed
+            try:
+                self._run(job_id, workspace, build)
+                self._finish(job_id, "succeeded")
+            except JobCancelled:
+                self._finish(job_id, "cancelled")
+            except Exception as e:
+                print(f"Build job {job_id} failed: {e}")
+                self._finish(job_id, "failed", str(e))
+            finally:
+                with self.condition:
+                    self.running.discard(job_id)
+                    self.processes.pop(job_id, None)
+                    self.cancelled.discard(job_id)
+                    self.condition.notify_all()
+
+    def _check_cancelled(self, job_id):
+        with self.condition:
+            if job_id in self.cancelled:
+                raise JobCancelled()
+
+    # Jobs are only updated while this process owns them, a job taken over by another process is left alone
+    def _set_stage(self, job_id, stage, details):
+        with self._connect() as connection:
+            row = connection.execute("SELECT stages FROM jobs WHERE id = ? AND owner = ?", (job_id, self.owner)).fetchone()
+            if row is None:
+                return
+            stages = json.loads(row[0])
+            stages.append({"stage": stage, "started": time.time(), "details": details})
+            connection.execute(
+                "UPDATE jobs SET stage = ?, stages = ? WHERE id = ? AND owner = ?",
+                (stage, json.dumps(stages), job_id, self.owner)
+            )
+
+    def _finish(self, job_id, status, error=None):
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = ?, finished = ?, error = ? WHERE id = ? AND owner = ? AND status = 'running'",
+                (status, time.time(), error, job_id, self.owner)
+            )
+
+    def _run(self, job_id, workspace, build):
+        job_directory = os.path.join(self.directory, "jobs", job_id)
+        output_directory = self.output_directory(job_id)
+        os.makedirs(output_directory, exist_ok=True)
+
+        self._set_stage(job_id, "load", {"documents": len(build["urls"]) if build["urls"] else None})
+        if build["urls"]:
+            input_directory = os.path.join(job_directory, "input")
+            self._download(job_id, build["urls"], input_directory)
+        else:
+            input_directory = os.path.realpath(os.path.join(self.input_root, build["directory"]))
+        self._check_cancelled(job_id)
+
+        command = [
+            self.python, GRAPH_SCRIPT, input_directory, os.path.join(output_directory, "graph.html"),
+            f"--format={build['format']}", f"--communities={build['communities']}",
+            f"--data-dir={os.path.join(self.directory, 'workspaces', workspace)}", "--progress"
+        ]
+        if build["incremental"]:
+            command.append("--incremental")
+
+        tail = deque(maxlen=LOG_TAIL_LINES)
+        with open(os.path.join(job_directory, "build.log"), "w", encoding="utf-8") as log:
+            process = subprocess.Popen(
+                command, cwd=job_directory, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1
+            )
+            with self.condition:
+                self.processes[job_id] = process
+                cancelled = job_id in self.cancelled
+            if cancelled:
+                process.terminate()
+            output_read = False
+            try:
+                for line in process.stdout:
+                    log.write(line)
+                    if line.startswith(PROGRESS_PREFIX):
+                        details = json.loads(line[len(PROGRESS_PREFIX):])
+                        self._set_stage(job_id, details.pop("stage"), details)
+                    else:
+                        tail.append(line.rstrip())
+                output_read = True
+            finally:
+                # Never leave the build running when reading its output failed (e.g. a malformed
+                # progress line), its workspace is released for the next build
+                if not output_read:
+                    process.kill()
+                returncode = process.wait()
+                process.stdout.close()
+
+        self._check_cancelled(job_id)
+        if returncode != 0:
+            raise RuntimeError(f"Build exited with status {returncode}: " + "\n".join(tail))
+
+    def _download(self, job_id, urls, input_directory):
+        """
+        Fetch the documents of a build, at most max_download_bytes each
+        Redirects are followed one by one so every hop is checked to be public
+        """
+        os.makedirs(input_directory, exist_ok=True)
+        for i, url in enumerate(urls):
+            name = os.path.basename(urlparse(url).path) or "document"
+            if not name.lower().endswith(".pdf"):
+                name += ".pdf"
+            path = os.path.join(input_directory, f"{i:04d}-{name}")
+            size = 0
+            with self._get_public(url) as response:
+                response.raise_for_status()
+                with open(path, "wb") as f:
+                    for block in response.iter_content(chunk_size=65536):
+                        self._check_cancelled(job_id)
+                        size += len(block)
+                        if size > self.max_download_bytes:
+                            raise ValueError(f"{url} is larger than {self.max_download_bytes} bytes")
+                        f.write(block)
+
+    def _get_public(self, url):
+        """Streamed GET of a public URL, following at most MAX_REDIRECTS redirects to public URLs."""
+        requested = url
+        for _ in range(MAX_REDIRECTS + 1):
+            check_public_url(url)
+            response = requests.get(url, stream=True, timeout=self.download_timeout, allow_redirects=False)
+            if not response.is_redirect:
+                return response
+            url = urljoin(url, response.headers["Location"])
+            response.close()
+        raise ValueError(f"Too many redirects fetching {requested}")
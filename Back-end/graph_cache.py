@@ -0,0 +1,132 @@
+import hashlib
+import json
+import math
+import threading
+from collections import OrderedDict
+
+from sparse_graph import SparseGraph
+
+def graph_content_hash(graph_data):
+    """Hash the nodes and edges of graph data, identical graphs get the same ID."""
+    content = {"nodes": graph_data.get("nodes", []), "edges": graph_data.get("edges", [])}
+    encoded = json.dumps(content, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:32]
+
+def compute_centralities(graph, betweenness_samples=None, seed=None, tol=1.0e-6, max_iter=100):
+    """
+    Compute the degree, betweenness and eigenvector centrality of every node of a SparseGraph
+    as arrays, "index" maps node ids to positions in them.
+    With betweenness_samples, betweenness is estimated from that many random source nodes.
+    Betweenness and eigenvector are None when they could not be computed.
+    The estimated error is an upper bound (95% confidence for sampling) of each measure's error
+    """
+    n = graph.number_of_nodes()
+    if betweenness_samples is not None and betweenness_samples >= n:
+        betweenness_samples = None
+
+    degree = graph.degree_centrality()
+    try:
+        betweenness = graph.betweenness_centrality(betweenness_samples, seed)
+        eigenvector = graph.eigenvector_centrality(max_iter=max_iter, tol=tol)
+    except Exception:
+        betweenness = eigenvector = None
+
+    return {
+        "index": graph.index,
+        "degree": degree,
+        "betweenness": betweenness,
+        "eigenvector": eigenvector,
+        "estimated_error": {
+            "degree": 0.0,
+            # Hoeffding bound for the mean of per-source contributions in [0, 1]
+            "betweenness": math.sqrt(math.log(2 / 0.05) / (2 * betweenness_samples)) if betweenness_samples else 0.0,
+            # Power iteration stops once the total change is below n * tol
+            "eigenvector": n * tol
+        }
+    }
+
+class CachedGraph:
+    """
+    A parsed graph (SparseGraph) with its full centrality vectors, computed once per set of options
+    Only the most recently used max_centralities sets of options are kept, since the options come
+    from clients and every set holds vectors the size of the graph
+    """
+    def __init__(self, graph_id, graph, max_centralities=4):
+        self.graph_id = graph_id
+        self.graph = graph
+        self.max_centralities = max_centralities
+        self.lock = threading.Lock()
+        self.centralities = OrderedDict()  # (betweenness samples, seed, tol, max_iter) -> centralities
+
+    def get_centralities(self, betweenness_samples=None, seed=None, tol=1.0e-6, max_iter=100):
+        """Get the centralities of every node (see compute_centralities), computing them on first use."""
+        if betweenness_samples is not None and betweenness_samples >= self.graph.number_of_nodes():
+            # Exact betweenness, whatever the seed
+            betweenness_samples = seed = None
+        key = (betweenness_samples, seed, tol, max_iter)
+        with self.lock:
+            if key in self.centralities:
+                self.centralities.move_to_end(key)
+            else:
+                self.centralities[key] = compute_centralities(self.graph, betweenness_samples, seed, tol, max_iter)
+                while len(self.centralities) > self.max_centralities:
+                    self.centralities.popitem(last=False)
+            return self.centralities[key]
+
+    def get_ego_centralities(self, node, radius=2, tol=1.0e-6, max_iter=100):
+        """
+        Get the exact centralities within the k-hop neighbourhood of a node only
+        The cost depends on the size of the neighbourhood, not of the whole graph
+        """
+        ego = self.graph.ego_subgraph(node, radius)
+        centralities = compute_centralities(ego, tol=tol, max_iter=max_iter)
+        centralities["scope_nodes"] = ego.number_of_nodes()
+        return centralities
+
+    def summary(self):
+        return {
+            "graph_id": self.graph_id,
+            "nodes": self.graph.number_of_nodes(),
+            "edges": self.graph.number_of_edges(),
+            "centralities_computed": len(self.centralities) > 0
+        }
+
+class GraphCache:
+    """
+    Least recently used cache of parsed graphs keyed by content hash
+    Clients can register a graph once and refer to it by its ID afterwards
+    """
+    def __init__(self, max_graphs=32):
+        self.max_graphs = max_graphs
+        self.entries = OrderedDict()  # graph ID -> CachedGraph
+        self.lock = threading.Lock()
+
+    def get(self, graph_id):
+        with self.lock:
+            entry = self.entries.get(graph_id)
+            if entry is not None:
+                self.entries.move_to_end(graph_id)
+            return entry
+
+    def get_or_build(self, graph_data):
+        """Get the cached graph for graph data, parsing and caching it on a miss."""
+        graph_id = graph_content_hash(graph_data)
+        entry = self.get(graph_id)
+        if entry is not None:
+            return entry
+
+        entry = CachedGraph(graph_id, SparseGraph.from_graph_data(graph_data))
+        with self.lock:
+            # Keep the entry of a concurrent request that built the same graph first
+            entry = self.entries.setdefault(graph_id, entry)
+            self.entries.move_to_end(graph_id)
+            while len(self.entries) > self.max_graphs:
+                self.entries.popitem(last=False)
+        return entry
+
+    def remove(self, graph_id):
+        with self.lock:
+            return self.entries.pop(graph_id, None) is not None
+
+    def __len__(self):
+        return len(self.entries)
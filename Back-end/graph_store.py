@@ -0,0 +1,370 @@
+import bisect
+import os
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+from reference_index import TOKEN_PATTERN
+from sparse_graph import SparseGraph
+
+# The artifact store is part of the graph pipeline
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "Graph"))
+from artifacts import ArtifactStore
+
+DEFAULT_NODE_COLOR = "#97c2fc"
+UNSTYLED = -1  # Style value of nodes outside a query result
+
+def style_changes(previous_ids, previous_values, ids, values):
+    """
+    Nodes whose style value differs between two query results (given as node rows with one value
+    each), with their new value, UNSTYLED for nodes that are no longer in the result
+    """
+    all_ids = np.union1d(previous_ids, ids)
+    before = _lookup(previous_ids, previous_values, all_ids)
+    after = _lookup(ids, values, all_ids)
+    changed = before != after
+    return all_ids[changed], after[changed]
+
+def _lookup(ids, values, keys):
+    ids = np.asarray(ids, dtype=np.int64)
+    values = np.asarray(values, dtype=np.int64)
+    if len(ids) == 0:
+        return np.full(len(keys), UNSTYLED, dtype=np.int64)
+    order = np.argsort(ids, kind="stable")
+    positions = np.minimum(np.searchsorted(ids[order], keys), len(ids) - 1)
+    found = ids[order][positions] == keys
+    return np.where(found, values[order][positions], UNSTYLED)
+
+class LabelIndex:
+    """
+    Inverted index of the words of node labels, the last word of a query also matches as a prefix
+    so results can be shown while typing
+    """
+    def __init__(self, labels):
+        postings = {}
+        for node, label in enumerate(labels):
+            for term in set(TOKEN_PATTERN.findall(str(label).lower())):
+                postings.setdefault(term, []).append(node)
+        self.terms = sorted(postings)
+        self.postings = [np.array(postings[term], dtype=np.int64) for term in self.terms]
+
+    def search(self, text):
+        """Sorted node rows whose label has every word of text, None when text has no words."""
+        words = TOKEN_PATTERN.findall(str(text).lower())
+        if not words:
+            return None
+        matches = None
+        for i, word in enumerate(words):
+            start = bisect.bisect_left(self.terms, word)
+            if i == len(words) - 1:
+                end = bisect.bisect_left(self.terms, word + "\uffff")
+            else:
+                end = start + (start < len(self.terms) and self.terms[start] == word)
+            nodes = np.unique(np.concatenate(self.postings[start:end])) if end > start else np.empty(0, dtype=np.int64)
+            matches = nodes if matches is None else np.intersect1d(matches, nodes, assume_unique=True)
+        return matches
+
+class StoredGraph:
+    """
+    One version of the graph built by the pipeline (Graph/generate_graph.py), read from its artifacts
+    and served by level of detail: a super-graph with one node per community, pages of the nodes of
+    a community and the nodes inside a rectangle of the precomputed layout.
+    Nodes are identified by their row in the nodes table, which stays the same within a version
+    """
+    def __init__(self, version, labels, graph, group, color, size, x=None, y=None):
+        self.version = version
+        self.labels = labels
+        self.graph = graph  # SparseGraph over the node rows
+        self.adjacency = graph.adjacency
+        self.group = group
+        self.color = color
+        self.size = size
+        self.degree = self.graph.degrees()
+        self.x = x
+        self.y = y
+
+        # Members of each community, highest degree first, as slices of one array
+        self.community_ids, community_index = np.unique(group, return_inverse=True)
+        self.community_index = community_index.ravel()
+        self.members = np.lexsort((np.arange(len(group)), -self.degree, self.community_index))
+        self.member_offsets = np.concatenate([[0], np.cumsum(np.bincount(self.community_index, minlength=len(self.community_ids)))])
+
+        # Nodes sorted by x, so a viewport is a binary search plus a filter on y
+        self.x_order = np.argsort(x, kind="stable") if x is not None else None
+        self.sorted_x = x[self.x_order] if x is not None else None
+
+        self._super_edges = self._aggregate_community_edges()
+
+        # Indexes of the neighbourhood, filter and search queries
+        self.edge_rows = np.repeat(np.arange(len(labels), dtype=np.int64), np.diff(self.adjacency.indptr))
+        self.label_index = LabelIndex(labels)
+
+    @classmethod
+    def from_artifacts(cls, artifact_store, version=None):
+        """Load a version (the current one by default) from an ArtifactStore."""
+        manifest = artifact_store.manifest(version)
+        if manifest is None:
+            raise FileNotFoundError(f"No graph artifacts in {artifact_store.directory}")
+        version = manifest["version"]
+
+        # The nodes table has the layout, older builds only have the communities
+        table = "nodes" if "nodes" in manifest["artifacts"] else "communities"
+        nodes = artifact_store.read_table(table, version=version)
+        edges = artifact_store.read_table("edges", columns=["node_1", "node_2", "weight"], version=version)
+
+        labels = nodes["node"].astype(str).to_numpy(dtype=object)
+        index = pd.Index(labels)
+        sources = index.get_indexer(edges["node_1"].astype(str))
+        targets = index.get_indexer(edges["node_2"].astype(str))
+        known = (sources >= 0) & (targets >= 0)
+        graph = SparseGraph.from_edges(range(len(labels)), sources[known], targets[known],
+                                       edges["weight"].to_numpy(dtype=np.float64)[known])
+
+        has_layout = "x" in nodes.columns
+        return cls(
+            version,
+            labels,
+            graph,
+            nodes["group"].to_numpy(dtype=np.int64),
+            nodes["color"].fillna(DEFAULT_NODE_COLOR).to_numpy(dtype=object),
+            nodes["size"].to_numpy(dtype=np.int64) if "size" in nodes.columns else np.full(len(nodes), 10),
+            nodes["x"].to_numpy(dtype=np.float32) if has_layout else None,
+            nodes["y"].to_numpy(dtype=np.float32) if has_layout else None
+        )
+
+    def number_of_nodes(self):
+        return len(self.labels)
+
+    def _aggregate_community_edges(self):
+        """Sum the weights of the edges between every pair of communities, once per pair."""
+        entries = self.adjacency.tocoo()
+        c1, c2 = self.community_index[entries.row], self.community_index[entries.col]
+        weights = entries.data
+        # Both directions of an edge are stored, only the one going to the higher community is counted
+        between = c1 < c2
+        keys = c1[between].astype(np.int64) * len(self.community_ids) + c2[between]
+        pairs, inverse = np.unique(keys, return_inverse=True)
+        return {
+            "source": pairs // len(self.community_ids),
+            "target": pairs % len(self.community_ids),
+            "weight": np.bincount(inverse, weights=weights[between], minlength=len(pairs)),
+            "count": np.bincount(inverse, minlength=len(pairs))
+        }
+
+    def super_graph(self, min_weight=0.0, max_edges=None):
+        """
+        Community-collapsed graph: one node per community (positioned at the centre of its members,
+        labelled after its highest-degree member) and one edge per pair of connected communities
+        with the summed weight and number of the edges between them. Only the heaviest max_edges are kept
+        """
+        first = self.members[self.member_offsets[:-1]]
+        counts = np.diff(self.member_offsets)
+        nodes = {
+            "id": self.community_ids.tolist(),
+            "label": [str(label) for label in self.labels[first]],
+            "size": counts.tolist(),
+            "color": self.color[first].tolist()
+        }
+        if self.x is not None:
+            nodes["x"] = np.round(np.bincount(self.community_index, weights=self.x) / counts, 1).tolist()
+            nodes["y"] = np.round(np.bincount(self.community_index, weights=self.y) / counts, 1).tolist()
+
+        edges = self._super_edges
+        keep = np.flatnonzero(edges["weight"] >= min_weight)
+        total_edges = len(keep)
+        if max_edges is not None and len(keep) > max_edges:
+            keep = keep[np.argsort(-edges["weight"][keep], kind="stable")[:max_edges]]
+        return {
+            "version": self.version,
+            "nodes": nodes,
+            "edges": {
+                "source": self.community_ids[edges["source"][keep]].tolist(),
+                "target": self.community_ids[edges["target"][keep]].tolist(),
+                "weight": np.round(edges["weight"][keep], 3).tolist(),
+                "count": edges["count"][keep].tolist()
+            },
+            "total_edges": total_edges
+        }
+
+    def community_page(self, community, page=0, budget=500, max_edges=None):
+        """
+        Page of the nodes of a community, highest degree first, with budget nodes per page.
+        The edges are those between the nodes of this page and the nodes of this and the previous
+        pages, so a client that loads the pages in order gets every edge of the community once.
+        Raises KeyError for an unknown community
+        """
+        c = np.searchsorted(self.community_ids, community)
+        if c >= len(self.community_ids) or self.community_ids[c] != community:
+            raise KeyError(community)
+        start, end = self.member_offsets[c], self.member_offsets[c + 1]
+        page_start = min(start + page * budget, end)
+        page_end = min(page_start + budget, end)
+
+        page_nodes = self.members[page_start:page_end]
+        loaded = np.zeros(self.number_of_nodes(), dtype=bool)
+        loaded[self.members[start:page_end]] = True
+        result = self._subgraph(page_nodes, loaded, max_edges)
+        result.update({
+            "community": int(community),
+            "page": page,
+            "total_nodes": int(end - start),
+            "next_page": page + 1 if page_end < end else None
+        })
+        return result
+
+    def viewport(self, x0, y0, x1, y1, budget=500, max_edges=None):
+        """
+        Nodes inside the rectangle (x0, y0)-(x1, y1) of the layout, the budget highest-degree ones
+        when there are more, with the edges between them. Raises ValueError without a stored layout
+        """
+        if self.x is None:
+            raise ValueError(f"Graph version {self.version} has no stored layout")
+        x0, x1 = min(x0, x1), max(x0, x1)
+        y0, y1 = min(y0, y1), max(y0, y1)
+        lo = np.searchsorted(self.sorted_x, x0, side="left")
+        hi = np.searchsorted(self.sorted_x, x1, side="right")
+        candidates = self.x_order[lo:hi]
+        inside = candidates[(self.y[candidates] >= y0) & (self.y[candidates] <= y1)]
+
+        selected = inside
+        if len(inside) > budget:
+            selected = inside[np.argsort(-self.degree[inside], kind="stable")[:budget]]
+        loaded = np.zeros(self.number_of_nodes(), dtype=bool)
+        loaded[selected] = True
+        result = self._subgraph(selected, loaded, max_edges)
+        result["total_nodes"] = int(len(inside))
+        return result
+
+    def neighbourhood(self, node, hops=2, max_nodes=None):
+        """
+        Nodes within hops edges of node, found breadth-first with each node visited once.
+        Returns the node rows and their distance to node (0 for node itself), and whether the search
+        stopped at max_nodes. Raises KeyError for an unknown node
+        """
+        if not 0 <= node < self.number_of_nodes():
+            raise KeyError(node)
+        distance = np.full(self.number_of_nodes(), UNSTYLED, dtype=np.int64)
+        distance[node] = 0
+        levels = [np.array([node], dtype=np.int64)]
+        found = 1
+        truncated = False
+        for hop in range(1, hops + 1):
+            # All neighbours of the frontier at once, from the CSR rows
+            neighbours = np.unique(self.adjacency[levels[-1]].indices)
+            new = neighbours[distance[neighbours] == UNSTYLED]
+            if max_nodes is not None and found + len(new) > max_nodes:
+                new = new[np.argsort(-self.degree[new], kind="stable")[:max_nodes - found]]
+                truncated = True
+            if len(new) == 0:
+                break
+            distance[new] = hop
+            levels.append(new)
+            found += len(new)
+            if truncated:
+                break
+        ids = np.concatenate(levels)
+        return ids, distance[ids], truncated
+
+    def filter_nodes(self, communities=None, min_degree=None, max_degree=None,
+                     min_similarity=None, max_similarity=None, text=None):
+        """
+        Sorted node rows matching every given condition: in one of communities, degree within
+        [min_degree, max_degree], at least one edge with a similarity within [min_similarity,
+        max_similarity] and a label with every word of text
+        """
+        matched = np.ones(self.number_of_nodes(), dtype=bool)
+        if communities is not None:
+            matched &= np.isin(self.group, np.asarray(list(communities), dtype=np.int64))
+        if min_degree is not None:
+            matched &= self.degree >= min_degree
+        if max_degree is not None:
+            matched &= self.degree <= max_degree
+        if min_similarity is not None or max_similarity is not None:
+            weights = self.adjacency.data
+            in_range = np.ones(len(weights), dtype=bool)
+            if min_similarity is not None:
+                in_range &= weights >= min_similarity
+            if max_similarity is not None:
+                in_range &= weights <= max_similarity
+            has_edge = np.zeros(self.number_of_nodes(), dtype=bool)
+            has_edge[self.edge_rows[in_range]] = True
+            matched &= has_edge
+        if text is not None:
+            found = self.label_index.search(text)
+            if found is not None:
+                has_label = np.zeros(self.number_of_nodes(), dtype=bool)
+                has_label[found] = True
+                matched &= has_label
+        return np.flatnonzero(matched)
+
+    def search(self, text, limit=20):
+        """Nodes whose label has every word of text, highest degree first."""
+        found = self.label_index.search(text)
+        if found is None:
+            found = np.empty(0, dtype=np.int64)
+        top = found[np.argsort(-self.degree[found], kind="stable")[:limit]]
+        return {"version": self.version, "nodes": self.nodes_payload(top), "total_nodes": int(len(found))}
+
+    def _subgraph(self, nodes, loaded, max_edges=None):
+        """Payload of nodes with their edges to loaded nodes (edges between two of nodes once)."""
+        rows = self.adjacency[nodes].tocoo()
+        sources, targets, weights = nodes[rows.row], rows.col, rows.data
+        in_nodes = np.zeros(self.number_of_nodes(), dtype=bool)
+        in_nodes[nodes] = True
+        keep = loaded[targets] & ~(in_nodes[targets] & (targets < sources))
+        sources, targets, weights = sources[keep], targets[keep], weights[keep]
+
+        total_edges = len(weights)
+        if max_edges is not None and total_edges > max_edges:
+            heaviest = np.argsort(-weights, kind="stable")[:max_edges]
+            sources, targets, weights = sources[heaviest], targets[heaviest], weights[heaviest]
+
+        return {
+            "version": self.version,
+            "nodes": self.nodes_payload(nodes),
+            "edges": {
+                "source": sources.tolist(),
+                "target": targets.tolist(),
+                "weight": np.round(weights, 3).tolist()
+            },
+            "total_edges": total_edges
+        }
+
+    def nodes_payload(self, nodes):
+        """Columns of the given node rows."""
+        payload = {
+            "id": nodes.tolist(),
+            "label": [str(label) for label in self.labels[nodes]],
+            "community": self.group[nodes].tolist(),
+            "color": self.color[nodes].tolist(),
+            "size": self.size[nodes].tolist(),
+            "degree": self.degree[nodes].tolist()
+        }
+        if self.x is not None:
+            payload["x"] = np.round(self.x[nodes].astype(np.float64), 1).tolist()
+            payload["y"] = np.round(self.y[nodes].astype(np.float64), 1).tolist()
+        return payload
+
+class GraphStore:
+    """
+    Serves the current version of the pipeline's graph artifacts
+    A new version committed by the pipeline is loaded on the next request
+    """
+    def __init__(self, directory):
+        self.artifact_store = ArtifactStore(directory)
+        self.graph = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        """Current StoredGraph, raises FileNotFoundError when nothing was built yet."""
+        version = self.artifact_store.current_version()
+        graph = self.graph
+        if graph is not None and graph.version == version:
+            return graph
+        with self.lock:
+            if self.graph is None or self.graph.version != version:
+                self.graph = StoredGraph.from_artifacts(self.artifact_store, version)
+                print(f"Loaded graph version {self.graph.version} ({self.graph.number_of_nodes()} nodes)")
+            return self.graph
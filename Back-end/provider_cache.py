@@ -0,0 +1,168 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+try:
+    import redis
+except ImportError:  # Redis is only needed when several workers share the cache
+    redis = None
+
+def normalize_claim(claim):
+    """Normalize claim text so that case, punctuation and spacing differences share a cache entry."""
+    text = re.sub(r"[^\w\s]", " ", str(claim).lower())
+    return " ".join(text.split())
+
+class MemoryBackend:
+    """
+    In-process cache backend
+    Entries expire after their TTL and the least recently used ones are evicted above the memory cap
+    """
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (expires_at, size, value)
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, size, value = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                self.size -= size
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        # The serialized length is a cheap approximation of the memory used by an entry
+        size = len(key) + len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            self.entries[key] = (time.monotonic() + ttl, size, value)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted_size, _) = self.entries.popitem(last=False)
+                self.size -= evicted_size
+
+    def __len__(self):
+        return len(self.entries)
+
+class RedisBackend:
+    """
+    Cache backend shared by several workers through a Redis-compatible store
+    Expiry uses the Redis TTL, the memory cap and LRU eviction come from the server's
+    maxmemory / allkeys-lru settings
+    """
+    def __init__(self, url):
+        if redis is None:
+            raise RuntimeError("The redis package is required for the Redis cache backend")
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        value = self.client.get(key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl):
+        self.client.setex(key, int(max(1, ttl)), json.dumps(value, default=str))
+
+    def __len__(self):
+        return self.client.dbsize()
+
+class ProviderCache:
+    """
+    Cache of fact-checking API responses keyed on provider and normalized claim text
+    Concurrent misses for the same key share a single upstream request
+    """
+    def __init__(self, backend=None, default_ttl=3600):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.default_ttl = default_ttl
+        self.inflight = {}  # key -> Future of the request being made for it
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def make_key(self, provider, claim):
+        digest = hashlib.sha1(normalize_claim(claim).encode("utf-8")).hexdigest()
+        return f"factcheck:{provider}:{digest}"
+
+    def _backend_get(self, key):
+        # A cache outage must not fail the query, it only turns into a miss
+        try:
+            return self.backend.get(key)
+        except Exception as e:
+            print(f"Provider cache read failed: {e}")
+            return None
+
+    def _backend_set(self, key, value, ttl):
+        try:
+            self.backend.set(key, value, ttl)
+        except Exception as e:
+            print(f"Provider cache write failed: {e}")
+
+    def get_or_query(self, provider, claim, query, ttl=None):
+        """
+        Return (result, cached) for the claim, calling query() on a miss
+        Error results are handed back to the waiting callers but never stored.
+        Backend errors are logged and the provider is queried without caching
+        """
+        key = self.make_key(provider, claim)
+        value = self._backend_get(key)
+        if value is not None:
+            with self.lock:
+                self.hits += 1
+            return value, True
+
+        with self.lock:
+            future = self.inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self.inflight[key] = future
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            # Another thread is already querying the provider for this claim
+            return future.result(), True
+
+        try:
+            # The previous leader may have stored the result right before we registered
+            value = self._backend_get(key)
+            if value is None:
+                value = query()
+                if "error" not in value:
+                    self._backend_set(key, value, ttl if ttl is not None else self.default_ttl)
+            future.set_result(value)
+            return value, False
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                del self.inflight[key]
+
+    def stats(self):
+        try:
+            entries = len(self.backend)
+        except Exception:
+            entries = None
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "entries": entries
+            }
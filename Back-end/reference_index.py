@@ -0,0 +1,93 @@
+import json
+import os
+import re
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+def tokenize(text):
+    """Split text into its set of lowercase word tokens, ignoring punctuation."""
+    return set(TOKEN_PATTERN.findall(str(text).lower()))
+
+class ReferenceIndex:
+    """
+    Inverted index (term -> postings) over a curated reference corpus
+    Built once, then used to find the reference documents sharing the most words with a claim
+    """
+    def __init__(self, documents):
+        self.documents = []
+        postings = {}
+
+        for doc_id, document in enumerate(documents):
+            self.documents.append({
+                "id": str(document.get("id", doc_id)),
+                "text": document.get("text", ""),
+                "source": document.get("source")
+            })
+            for term in tokenize(document.get("text", "")):
+                postings.setdefault(term, []).append(doc_id)
+
+        # Sorted int32 arrays keep the index compact and fast to merge
+        self.postings = {term: np.array(ids, dtype=np.int32) for term, ids in postings.items()}
+
+    @classmethod
+    def from_path(cls, path):
+        """
+        Load a reference corpus from a JSONL file ({"id", "text", "source"} per line)
+        or from a directory of .txt files
+        """
+        if os.path.isdir(path):
+            documents = []
+            for name in sorted(os.listdir(path)):
+                if name.endswith(".txt"):
+                    with open(os.path.join(path, name), encoding="utf-8") as f:
+                        documents.append({"id": name, "text": f.read(), "source": name})
+            return cls(documents)
+
+        with open(path, encoding="utf-8") as f:
+            return cls(json.loads(line) for line in f if line.strip())
+
+    def search(self, text, k=5):
+        """
+        Find the k reference documents with the largest word overlap with the text
+        Each match has the fraction of the text's words found in the document as "overlap"
+        Documents with the same overlap are ranked by their position in the corpus
+        """
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        terms = tokenize(text)
+        matched = [self.postings[term] for term in terms if term in self.postings]
+        if not matched:
+            return []
+
+        doc_ids = np.concatenate(matched)
+        if len(doc_ids) * 8 < len(self.documents):
+            # Few postings: count them directly instead of allocating a counter per document
+            doc_ids, counts = np.unique(doc_ids, return_counts=True)
+        else:
+            counts = np.bincount(doc_ids, minlength=len(self.documents))
+            doc_ids = np.flatnonzero(counts)
+            counts = counts[doc_ids]
+
+        if len(doc_ids) > k:
+            # Keep the documents above the k-th best count, then the first documents tied with it
+            kth_count = -np.partition(-counts, k - 1)[k - 1]
+            above = np.flatnonzero(counts > kth_count)
+            tied = np.flatnonzero(counts == kth_count)[:k - len(above)]
+            top = np.concatenate([above, tied])
+            doc_ids, counts = doc_ids[top], counts[top]
+        order = np.lexsort((doc_ids, -counts))
+
+        return [
+            {
+                "id": self.documents[doc_id]["id"],
+                "source": self.documents[doc_id]["source"],
+                "snippet": self.documents[doc_id]["text"][:200],
+                "overlap": count / len(terms)
+            }
+            for doc_id, count in zip(doc_ids[order].tolist(), counts[order].tolist())
+        ]
+
+    def __len__(self):
+        return len(self.documents)
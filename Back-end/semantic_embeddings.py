@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from reference_index import TOKEN_PATTERN
+
+try:
+    import faiss
+except ImportError:  # The approximate index is optional, exact search is used without it
+    faiss = None
+
+class StubEmbeddings:
+    """
+    Deterministic offline embedding model with the same interface as the LangChain embeddings
+    Words are hashed into a fixed number of dimensions, so texts sharing words get similar vectors
+    """
+    def __init__(self, dimension=256):
+        self.dimension = dimension
+
+    def embed_query(self, text):
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for token in TOKEN_PATTERN.findall(str(text).lower()):
+            digest = hashlib.md5(token.encode("utf-8")).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dimension
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        return vector.tolist()
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+def load_embedding_model(model_name):
+    """Get the embedding model used for semantic alignment, "stub" gives the offline model."""
+    if model_name == "stub":
+        return StubEmbeddings()
+    # Same embeddings as the knowledge graph pipeline in Graph/generate_graph.py
+    from langchain_community.embeddings import OllamaEmbeddings
+    return OllamaEmbeddings(model=model_name)
+
+def normalize_rows(vectors):
+    """L2-normalize vectors as float32 so dot products are cosine similarities."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def build_embedding_index(chunks, model, model_name, output_directory, batch_size=64, ann=False):
+    """
+    Pre-embed reference chunks ({"id", "text", "source"}) into an index directory:
+    - vectors.npy: normalized float32 matrix, memory-mapped when loaded
+    - chunks.jsonl: chunk metadata in the same row order
+    - meta.json: embedding model and matrix shape
+    - vectors.faiss: approximate nearest-neighbour index (optional, requires faiss)
+    """
+    chunks = list(chunks)
+    os.makedirs(output_directory, exist_ok=True)
+
+    vectors = None
+    for start in range(0, len(chunks), batch_size):
+        batch = normalize_rows(model.embed_documents([c["text"] for c in chunks[start:start + batch_size]]))
+        if vectors is None:
+            # Rows are written straight to disk so the corpus never has to fit in memory
+            vectors = np.lib.format.open_memmap(
+                os.path.join(output_directory, "vectors.npy"), mode="w+",
+                dtype=np.float32, shape=(len(chunks), batch.shape[1])
+            )
+        vectors[start:start + len(batch)] = batch
+    if vectors is None:
+        raise ValueError("No chunks to index")
+    vectors.flush()
+
+    with open(os.path.join(output_directory, "chunks.jsonl"), "w", encoding="utf-8") as f:
+        for i, chunk in enumerate(chunks):
+            f.write(json.dumps({
+                "id": str(chunk.get("id", i)),
+                "source": chunk.get("source"),
+                "snippet": chunk.get("text", "")[:200]
+            }) + "\n")
+
+    with open(os.path.join(output_directory, "meta.json"), "w") as f:
+        json.dump({"model": model_name, "count": vectors.shape[0], "dimension": vectors.shape[1]}, f)
+
+    if ann:
+        if faiss is None:
+            raise RuntimeError("The faiss package is required to build an approximate index")
+        index = faiss.IndexHNSWFlat(vectors.shape[1], 32, faiss.METRIC_INNER_PRODUCT)
+        for start in range(0, vectors.shape[0], 65536):
+            index.add(np.ascontiguousarray(vectors[start:start + 65536]))
+        faiss.write_index(index, os.path.join(output_directory, "vectors.faiss"))
+
+    return output_directory
+
+class EmbeddingIndex:
+    """
+    Pre-embedded reference chunks, loaded once at startup
+    Claims are scored with blocked matrix products against the memory-mapped vectors,
+    or through the approximate index when one was built
+    """
+    def __init__(self, directory, model=None, block_size=65536):
+        with open(os.path.join(directory, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.model = model if model is not None else load_embedding_model(self.meta["model"])
+        self.block_size = block_size
+        self.vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+
+        with open(os.path.join(directory, "chunks.jsonl"), encoding="utf-8") as f:
+            self.chunks = [json.loads(line) for line in f]
+
+        self.ann_index = None
+        ann_path = os.path.join(directory, "vectors.faiss")
+        if faiss is not None and os.path.exists(ann_path):
+            self.ann_index = faiss.read_index(ann_path)
+
+    def search_vectors(self, queries, k=5):
+        """
+        Find the k most similar chunks for each normalized query vector
+        Returns (similarities, chunk indices), both of shape (queries, k)
+        """
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        k = min(k, self.vectors.shape[0])
+
+        if self.ann_index is not None:
+            return self.ann_index.search(queries, k)
+
+        best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        best_ids = np.full((len(queries), k), -1, dtype=np.int64)
+        for start in range(0, self.vectors.shape[0], self.block_size):
+            block = self.vectors[start:start + self.block_size]
+            scores = queries @ block.T
+
+            # Merge the top-k of this block with the best found so far
+            top = np.argpartition(-scores, min(k, scores.shape[1]) - 1, axis=1)[:, :k]
+            scores = np.concatenate([best_scores, np.take_along_axis(scores, top, axis=1)], axis=1)
+            ids = np.concatenate([best_ids, top + start], axis=1)
+            keep = np.argsort(-scores, axis=1)[:, :k]
+            best_scores = np.take_along_axis(scores, keep, axis=1)
+            best_ids = np.take_along_axis(ids, keep, axis=1)
+
+        return best_scores, best_ids
+
+    def search(self, texts, k=5):
+        """Find the k most similar reference chunks for each text, embedded in one batch."""
+        queries = normalize_rows(self.model.embed_documents(list(texts)))
+        scores, ids = self.search_vectors(queries, k)
+        return [
+            [dict(self.chunks[i], similarity=float(s)) for s, i in zip(row_scores, row_ids) if i >= 0]
+            for row_scores, row_ids in zip(scores, ids)
+        ]
+
+    def similarity(self, text, reference_text):
+        """Cosine similarity between two texts with the index's embedding model."""
+        vectors = normalize_rows(self.model.embed_documents([text, reference_text]))
+        return float(vectors[0] @ vectors[1])
+
+    def __len__(self):
+        return self.vectors.shape[0]
@@ -0,0 +1,211 @@
+import numpy as np
+import scipy.sparse as sp
+
+class PowerIterationFailedConvergence(Exception):
+    pass
+
+class SparseGraph:
+    """
+    Compact undirected graph: CSR adjacency matrix over integer node ids plus a node id table
+    Centralities follow the NetworkX definitions (unweighted, normalized) using array operations
+    """
+    def __init__(self, node_ids, adjacency, node_attributes=None):
+        self.node_ids = list(node_ids)  # integer id -> node id
+        self.index = {node: i for i, node in enumerate(self.node_ids)}  # node id -> integer id
+        self.adjacency = adjacency.tocsr()  # Symmetric, edge weights as values
+        self.adjacency.sort_indices()
+        self.node_attributes = node_attributes  # Optional list of attribute dicts, only kept for export
+
+    @classmethod
+    def from_graph_data(cls, graph_data):
+        """Create a graph from {"nodes": [{"id", "attributes"}], "edges": [{"source", "target", "weight"}]}."""
+        index = {}
+        node_attributes = []
+        for node in graph_data.get("nodes", []):
+            if node["id"] not in index:
+                index[node["id"]] = len(index)
+                node_attributes.append(node.get("attributes", {}))
+            else:
+                node_attributes[index[node["id"]]].update(node.get("attributes", {}))
+
+        edges = graph_data.get("edges", [])
+        sources = np.empty(len(edges), dtype=np.int64)
+        targets = np.empty(len(edges), dtype=np.int64)
+        weights = np.empty(len(edges), dtype=np.float64)
+        for i, edge in enumerate(edges):
+            # Nodes only referenced by edges are added implicitly, like NetworkX does
+            for key in (edge["source"], edge["target"]):
+                if key not in index:
+                    index[key] = len(index)
+                    node_attributes.append({})
+            sources[i] = index[edge["source"]]
+            targets[i] = index[edge["target"]]
+            weights[i] = edge.get("weight", 1.0)
+
+        keep_attributes = any(node_attributes)
+        return cls.from_edges(list(index), sources, targets, weights, node_attributes if keep_attributes else None)
+
+    @classmethod
+    def from_edges(cls, node_ids, sources, targets, weights=None, node_attributes=None):
+        """Create a graph from edge arrays of integer ids, duplicate edges keep the last weight."""
+        n = len(node_ids)
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        weights = np.ones(len(sources)) if weights is None else np.asarray(weights, dtype=np.float64)
+
+        # Deduplicate undirected edges, keeping the last occurrence like repeated add_edge calls
+        low, high = np.minimum(sources, targets), np.maximum(sources, targets)
+        keys = low * n + high
+        _, last = np.unique(keys[::-1], return_index=True)
+        last = len(keys) - 1 - last
+        low, high, weights = low[last], high[last], weights[last]
+
+        # Store both directions, self-loops only once
+        off_diagonal = low != high
+        rows = np.concatenate([low, high[off_diagonal]])
+        cols = np.concatenate([high, low[off_diagonal]])
+        data = np.concatenate([weights, weights[off_diagonal]])
+        adjacency = sp.csr_matrix((data, (rows, cols)), shape=(n, n))
+        return cls(node_ids, adjacency, node_attributes)
+
+    def __contains__(self, node):
+        return node in self.index
+
+    def number_of_nodes(self):
+        return len(self.node_ids)
+
+    def number_of_edges(self):
+        self_loops = np.count_nonzero(self.adjacency.diagonal())
+        return int(self.adjacency.nnz + self_loops) // 2
+
+    def degrees(self):
+        """Degree of every node, self-loops count twice like in NetworkX."""
+        return np.diff(self.adjacency.indptr) + (self.adjacency.diagonal() != 0)
+
+    def degree_centrality(self):
+        n = self.number_of_nodes()
+        if n <= 1:
+            return np.ones(n)
+        return self.degrees() / (n - 1)
+
+    def eigenvector_centrality(self, max_iter=100, tol=1.0e-6):
+        """Power iteration on A + I, same convergence test as NetworkX."""
+        n = self.number_of_nodes()
+        if n == 0:
+            raise ValueError("cannot compute centrality for the null graph")
+
+        # Unweighted, like nx.eigenvector_centrality without a weight attribute
+        pattern = self.adjacency.copy()
+        pattern.data[:] = 1.0
+
+        x = np.full(n, 1.0 / n)
+        for _ in range(max_iter):
+            x_last = x
+            x = x_last + pattern @ x_last
+            norm = np.linalg.norm(x) or 1.0
+            x = x / norm
+            if np.abs(x - x_last).sum() < n * tol:
+                return x
+        raise PowerIterationFailedConvergence(max_iter)
+
+    def betweenness_centrality(self, samples=None, seed=None):
+        """
+        Normalized (unweighted) betweenness centrality
+        With samples, it is estimated from that many random source nodes
+        """
+        n = self.number_of_nodes()
+        betweenness = np.zeros(n)
+        if samples is not None and samples >= n:
+            samples = None
+        sources = np.arange(n) if samples is None else np.random.default_rng(seed).choice(n, samples, replace=False)
+
+        for source in sources:
+            betweenness += self._source_dependencies(source)
+
+        # Same rescaling as NetworkX with normalized=True and endpoints=False
+        pairs = n - 1
+        if pairs < 2:
+            return betweenness
+        if samples is None:
+            return betweenness / (pairs * (pairs - 1))
+        scale = np.full(n, 1.0 / (samples * (pairs - 1)))
+        scale[sources] = 1.0 / ((samples - 1) * (pairs - 1)) if samples > 1 else np.nan
+        return betweenness * scale
+
+    def _source_dependencies(self, source):
+        """
+        Brandes dependencies of every node for one source, with a level-synchronous BFS
+        Each level is a sparse matrix-vector product over the frontier's rows only
+        """
+        n = self.number_of_nodes()
+        pattern = self.adjacency
+        sigma = np.zeros(n)
+        reached = np.zeros(n, dtype=bool)
+        sigma[source] = 1.0
+        reached[source] = True
+
+        levels = [np.array([source])]
+        while True:
+            frontier = levels[-1]
+            rows = pattern[frontier]
+            # Number of shortest paths reaching each neighbour through the frontier
+            paths = np.bincount(rows.indices, weights=np.repeat(sigma[frontier], np.diff(rows.indptr)), minlength=n)
+            next_level = np.flatnonzero((paths > 0) & ~reached)
+            if len(next_level) == 0:
+                break
+            sigma[next_level] = paths[next_level]
+            reached[next_level] = True
+            levels.append(next_level)
+
+        delta = np.zeros(n)
+        coefficients = np.zeros(n)
+        for depth in range(len(levels) - 2, -1, -1):
+            successors = levels[depth + 1]
+            coefficients[successors] = (1.0 + delta[successors]) / sigma[successors]
+            level = levels[depth]
+            rows = pattern[level]
+            # Neighbours in the next level are exactly the successors on shortest paths
+            row_ids = np.repeat(np.arange(len(level)), np.diff(rows.indptr))
+            incoming = np.bincount(row_ids, weights=coefficients[rows.indices], minlength=len(level))
+            delta[level] = sigma[level] * incoming
+            coefficients[successors] = 0.0
+
+        delta[source] = 0.0
+        return delta
+
+    def ego_subgraph(self, node, radius=2):
+        """Subgraph induced by the nodes within radius hops of node, without touching the rest of the graph."""
+        nodes = np.array([self.index[node]])
+        frontier = nodes
+        for _ in range(radius):
+            neighbours = np.unique(self.adjacency[frontier].indices)
+            frontier = np.setdiff1d(neighbours, nodes, assume_unique=True)
+            if len(frontier) == 0:
+                break
+            nodes = np.union1d(nodes, frontier)
+
+        rows = self.adjacency[nodes]
+        # Keep only the edges between selected nodes and renumber them
+        positions = np.searchsorted(nodes, rows.indices)
+        positions = np.minimum(positions, len(nodes) - 1)
+        inside = nodes[positions] == rows.indices
+        row_ids = np.repeat(np.arange(len(nodes)), np.diff(rows.indptr))
+        adjacency = sp.csr_matrix(
+            (rows.data[inside], (row_ids[inside], positions[inside])),
+            shape=(len(nodes), len(nodes))
+        )
+        node_ids = [self.node_ids[i] for i in nodes]
+        attributes = [self.node_attributes[i] for i in nodes] if self.node_attributes else None
+        return SparseGraph(node_ids, adjacency, attributes)
+
+    def to_networkx(self):
+        """Export to a NetworkX graph, only for visualization or analyses not implemented here."""
+        import networkx as nx
+        G = nx.Graph()
+        for i, node in enumerate(self.node_ids):
+            G.add_node(node, **(self.node_attributes[i] if self.node_attributes else {}))
+        upper = sp.triu(self.adjacency).tocoo()
+        G.add_weighted_edges_from(
+            (self.node_ids[u], self.node_ids[v], w) for u, v, w in zip(upper.row, upper.col, upper.data)
+        )
+        return G
@@ -0,0 +1,175 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+def classify_engagement_changes(mean_change, std_change):
+    """
+    Map the mean and standard deviation of engagement changes to a temporal score
+    Same rules as check_temporal_patterns, but works on whole arrays at once
+    """
+    mean_change = np.asarray(mean_change, dtype=np.float64)
+    std_change = np.asarray(std_change, dtype=np.float64)
+    growing = mean_change > 0
+
+    return np.select(
+        [
+            (std_change > 3 * mean_change) & growing,  # High volatility with growth, potential viral misinformation
+            (std_change > 2 * mean_change) & growing,  # Moderate volatility with growth
+            growing  # Steady growth pattern, more trustworthy
+        ],
+        [4.0, 5.0, 7.0],
+        default=6.0  # Declining interest or stable pattern
+    )
+
+def temporal_scores_batch(values, offsets=None, lengths=None, temporal_weight=1.0):
+    """
+    Score many engagement series at once
+
+    The series are given either as:
+    - a ragged layout: 1-D values with offsets, series i being values[offsets[i]:offsets[i + 1]]
+    - a padded layout: 2-D values with one row per series and optional lengths of the valid prefix of each row
+
+    Returns an array with one score per series, NaN for empty series (callers fall back to the
+    date heuristic for those). Scores are identical to check_temporal_patterns.
+    """
+    values = np.asarray(values, dtype=np.float64)
+
+    if offsets is not None:
+        offsets = np.asarray(offsets, dtype=np.intp)
+        starts = offsets[:-1]
+        lengths = np.diff(offsets)
+        flat = values.reshape(-1)
+    else:
+        if values.ndim != 2:
+            raise ValueError("Padded series must be a 2-D array")
+        count, width = values.shape
+        lengths = np.full(count, width, dtype=np.intp) if lengths is None else np.asarray(lengths, dtype=np.intp)
+        if np.any(lengths > width):
+            raise ValueError("Series lengths can't exceed the padded width")
+        starts = np.arange(count, dtype=np.intp) * width
+        flat = np.ascontiguousarray(values).reshape(-1)
+
+    scores = np.full(len(lengths), np.nan)
+
+    # Series of the same length are gathered into one dense block, so the statistics are
+    # computed row by row exactly like np.diff/np.std/np.mean do for a single series.
+    # Only the number of distinct lengths is looped over in Python.
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for length in np.unique(lengths):
+            if length == 0:
+                continue
+            rows = np.flatnonzero(lengths == length)
+            if length == 1:
+                # No changes to analyze, the statistics are NaN and classify as a stable pattern
+                scores[rows] = classify_engagement_changes(np.nan, np.nan)
+                continue
+            block = flat[starts[rows, None] + np.arange(length)]
+            changes = np.diff(block, axis=1)
+            scores[rows] = classify_engagement_changes(changes.mean(axis=1), changes.std(axis=1))
+
+    return scores * temporal_weight
+
+class EngagementState:
+    """Running statistics of the engagement changes of one claim"""
+    __slots__ = ("last_value", "last_time", "count", "weight", "mean", "m2")
+
+    def __init__(self):
+        self.last_value = None
+        self.last_time = None
+        self.count = 0  # Number of changes seen
+        self.weight = 0.0  # Total (decayed) weight of the changes
+        self.mean = 0.0
+        self.m2 = 0.0  # Weighted sum of squared deviations from the mean
+
+class TemporalAnalyzer:
+    """
+    Incremental temporal analysis of live engagement streams
+    Keeps a running (Welford-style) mean and variance of the first differences per claim,
+    so appending points and reading the score take constant time. With a half-life, older
+    changes are exponentially down-weighted so past spikes age out.
+    """
+    def __init__(self, half_life=None, max_claims=1000000):
+        self.half_life = half_life
+        self.max_claims = max_claims
+        self.states = OrderedDict()  # claim id -> EngagementState, least recently updated first
+        self.lock = threading.Lock()
+
+    def append(self, claim_id, values, timestamps=None):
+        """
+        Append engagement counts (with optional timestamps in seconds) for a claim
+        The whole input is validated before the state of the claim is changed.
+        Returns the current temporal score of the claim
+        """
+        if timestamps is None:
+            timestamps = [time.time()] * len(values)
+        elif len(timestamps) != len(values):
+            raise ValueError("values and timestamps must have the same length")
+        points = [(float(value), float(timestamp)) for value, timestamp in zip(values, timestamps)]
+        if not all(np.isfinite(value) and np.isfinite(timestamp) for value, timestamp in points):
+            raise ValueError("values and timestamps must be finite numbers")
+
+        with self.lock:
+            state = self.states.get(claim_id)
+            if state is None:
+                state = self.states[claim_id] = EngagementState()
+                while len(self.states) > self.max_claims:
+                    self.states.popitem(last=False)
+            else:
+                self.states.move_to_end(claim_id)
+
+            for value, timestamp in points:
+                if state.last_value is not None:
+                    if self.half_life and timestamp > state.last_time:
+                        # Decay the old changes, the mean is unaffected by a common scale
+                        decay = 0.5 ** ((timestamp - state.last_time) / self.half_life)
+                        state.weight *= decay
+                        state.m2 *= decay
+                    change = value - state.last_value
+                    state.count += 1
+                    state.weight += 1.0
+                    delta = change - state.mean
+                    state.mean += delta / state.weight
+                    state.m2 += delta * (change - state.mean)
+                state.last_value = value
+                state.last_time = timestamp
+
+            return self._score(state)
+
+    def score(self, claim_id):
+        """Get the current temporal score of a claim, None when nothing was streamed for it."""
+        with self.lock:
+            state = self.states.get(claim_id)
+            return self._score(state) if state is not None else None
+
+    def stats(self, claim_id):
+        """Get the running statistics of a claim, None when nothing was streamed for it."""
+        with self.lock:
+            state = self.states.get(claim_id)
+            if state is None:
+                return None
+            mean, std = self._moments(state)
+            return {
+                "changes": state.count,
+                "mean_change": None if np.isnan(mean) else mean,
+                "std_change": None if np.isnan(std) else std,
+                "last_value": state.last_value,
+                "last_time": state.last_time
+            }
+
+    def remove(self, claim_id):
+        with self.lock:
+            return self.states.pop(claim_id, None) is not None
+
+    def __len__(self):
+        return len(self.states)
+
+    def _moments(self, state):
+        if state.count == 0 or state.weight <= 0:
+            return np.nan, np.nan
+        return state.mean, float(np.sqrt(max(state.m2, 0.0) / state.weight))
+
+    def _score(self, state):
+        mean, std = self._moments(state)
+        return float(classify_engagement_changes(mean, std))
@@ -0,0 +1,342 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+RESOLUTIONS = {"minute": 60, "hour": 3600, "day": 86400}
+QUERY_MAX_BUCKETS = 100000  # Queries read the finest rollup with at most this many buckets in range
+CHUNK_BUCKETS = 1024  # Rollup buckets are allocated this many at a time
+
+# Ingested timestamps must be seconds since the epoch from 2000-01-01 to a day from now, which also
+# rejects timestamps in milliseconds
+TIMESTAMP_MIN = 946684800.0
+TIMESTAMP_MAX_AHEAD = 86400.0
+DOWNSAMPLING_METHODS = ("lttb", "minmax")
+
+EVENT_COLUMNS = {
+    "timestamp": np.float64,
+    "category": np.int32,
+    "claim": np.int32,  # -1 when the event is not tied to a claim
+    "value": np.float32
+}
+
+def lttb(timestamps, values, points):
+    """
+    Largest-Triangle-Three-Buckets downsampling to at most points points
+    Keeps the first and last points and, per bucket, the point forming the largest triangle
+    with the previously kept point and the average of the next bucket
+    """
+    n = len(values)
+    if points >= n:
+        return timestamps, values
+    if points < 3:
+        # No room for a bucket between the first and the last point, keep those only
+        kept = [0, n - 1][:max(points, 0)]
+        return timestamps[kept], values[kept]
+
+    kept = np.empty(points, dtype=np.int64)
+    kept[0] = 0
+    kept[-1] = n - 1
+    # Bucket boundaries over the points between the first and the last
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    previous = 0
+    for bucket in range(points - 2):
+        start, end = edges[bucket], max(edges[bucket + 1], edges[bucket] + 1)
+        next_start, next_end = edges[bucket + 1], edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_end = max(next_end, next_start + 1)
+        average_t = timestamps[next_start:next_end].mean()
+        average_v = values[next_start:next_end].mean()
+        # Twice the triangle area, the constant factor does not change the maximum
+        areas = np.abs(
+            (timestamps[previous] - average_t) * (values[start:end] - values[previous])
+            - (timestamps[previous] - timestamps[start:end]) * (average_v - values[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        kept[bucket + 1] = previous
+    return timestamps[kept], values[kept]
+
+def minmax(timestamps, values, points):
+    """Downsample to at most points points by keeping the minimum and maximum of each bucket, in time order."""
+    n = len(values)
+    if points >= n:
+        return timestamps, values
+    if points < 2:
+        # No room for a minimum and a maximum, keep the maximum only
+        kept = [int(np.argmax(values))] if points == 1 else []
+        return timestamps[kept], values[kept]
+
+    edges = np.linspace(0, n, points // 2 + 1).astype(np.int64)
+    starts = edges[:-1][edges[:-1] < edges[1:]]
+    lowest = np.minimum.reduceat(values, starts)
+    highest = np.maximum.reduceat(values, starts)
+    bucket_ids = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, n)))
+    # Position of the first minimum and maximum of each bucket
+    low_index = np.flatnonzero(values == lowest[bucket_ids])
+    low_index = low_index[np.unique(bucket_ids[low_index], return_index=True)[1]]
+    high_index = np.flatnonzero(values == highest[bucket_ids])
+    high_index = high_index[np.unique(bucket_ids[high_index], return_index=True)[1]]
+    kept = np.unique(np.concatenate([low_index, high_index]))
+    return timestamps[kept], values[kept]
+
+class Rollup:
+    """
+    Per-category sums and event counts over fixed-width time buckets
+    Buckets are stored in chunks of CHUNK_BUCKETS consecutive buckets, created when an event falls
+    in them, so memory follows the time spans that have events rather than the whole time range
+    """
+    def __init__(self, step):
+        self.step = step
+        self.sums = {}  # category code -> {chunk number -> float64 array}
+        self.counts = {}  # category code -> {chunk number -> int64 array}
+
+    def add(self, categories, timestamps, values):
+        buckets = np.floor_divide(timestamps, self.step).astype(np.int64)
+        chunks, offsets = np.divmod(buckets, CHUNK_BUCKETS)
+        # One group of events per (category, chunk)
+        order = np.lexsort((chunks, categories))
+        categories, chunks, offsets, values = categories[order], chunks[order], offsets[order], values[order]
+        starts = np.flatnonzero(np.r_[True, (categories[1:] != categories[:-1]) | (chunks[1:] != chunks[:-1])])
+        for start, end in zip(starts, np.r_[starts[1:], len(order)]):
+            code, chunk = int(categories[start]), int(chunks[start])
+            sums = self.sums.setdefault(code, {})
+            counts = self.counts.setdefault(code, {})
+            if chunk not in sums:
+                sums[chunk] = np.zeros(CHUNK_BUCKETS, dtype=np.float64)
+                counts[chunk] = np.zeros(CHUNK_BUCKETS, dtype=np.int64)
+            sums[chunk] += np.bincount(offsets[start:end], weights=values[start:end], minlength=CHUNK_BUCKETS)
+            counts[chunk] += np.bincount(offsets[start:end], minlength=CHUNK_BUCKETS)
+
+    def bucket_count(self, start, end):
+        return int(end // self.step - start // self.step) + 1
+
+    def series(self, code, start, end):
+        """Bucket start times and sums of a category between start and end (inclusive), zero-filled."""
+        first, last = int(start // self.step), int(end // self.step)
+        timestamps = np.arange(first, last + 1, dtype=np.float64) * self.step
+        values = np.zeros(last - first + 1)
+        for chunk, array in self.sums.get(code, {}).items():
+            # Overlap between the requested buckets and the chunk's
+            low = max(first, chunk * CHUNK_BUCKETS)
+            high = min(last + 1, (chunk + 1) * CHUNK_BUCKETS)
+            if low < high:
+                values[low - first:high - first] = array[low - chunk * CHUNK_BUCKETS:high - chunk * CHUNK_BUCKETS]
+        return timestamps, values
+
+class TimeSeriesStore:
+    """
+    Append-only store of timestamped engagement events with minute/hour/day rollups per category
+    With a directory, events are appended to one binary file per column (timestamp, category,
+    claim, value) and category/claim names to text files, then replayed into the rollups on startup.
+    With on_claim_bucket, the total of each claim per claim_resolution bucket is passed on once the
+    bucket is over, e.g. to TemporalAnalyzer.append(claim_id, values, timestamps)
+    """
+    def __init__(self, directory=None, on_claim_bucket=None, claim_resolution="hour", max_gap_buckets=24):
+        self.directory = directory
+        self.on_claim_bucket = on_claim_bucket
+        self.claim_step = RESOLUTIONS[claim_resolution]
+        self.max_gap_buckets = max_gap_buckets
+        self.lock = threading.Lock()
+        self.rollups = {name: Rollup(step) for name, step in RESOLUTIONS.items()}
+        self.categories = []
+        self.category_codes = {}
+        self.claims = []
+        self.claim_codes = {}
+        self.open_buckets = {}  # claim code -> [bucket number, total]
+        self.event_count = 0
+        self.first_time = None
+        self.last_time = None
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self._replay()
+
+    def ingest(self, timestamps, categories, values=None, claim_ids=None):
+        """
+        Append events given as columns: timestamps (seconds), category names,
+        values (default 1 per event) and claim IDs (optional, None for events without a claim)
+        Returns the number of events ingested
+        """
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        n = len(timestamps)
+        if len(categories) != n or (values is not None and len(values) != n) or (claim_ids is not None and len(claim_ids) != n):
+            raise ValueError("All event columns must have the same length")
+        if n == 0:
+            return 0
+        if not np.all(np.isfinite(timestamps)):
+            raise ValueError("Timestamps must be finite numbers")
+        if timestamps.min() < TIMESTAMP_MIN or timestamps.max() > time.time() + TIMESTAMP_MAX_AHEAD:
+            raise ValueError("Timestamps must be in seconds since the epoch, from 2000-01-01 to a day from now")
+        values = np.ones(n, dtype=np.float32) if values is None else np.asarray(values, dtype=np.float32)
+
+        with self.lock:
+            new_names = {"categories": [], "claims": []}
+            category_codes = np.array([self._code(name, self.categories, self.category_codes, new_names["categories"])
+                                       for name in map(str, categories)], dtype=np.int32)
+            claim_codes = np.full(n, -1, dtype=np.int32)
+            if claim_ids is not None:
+                claim_codes = np.array([
+                    -1 if claim_id is None else self._code(str(claim_id), self.claims, self.claim_codes, new_names["claims"])
+                    for claim_id in claim_ids
+                ], dtype=np.int32)
+
+            if self.directory is not None:
+                self._append_to_disk(new_names, {
+                    "timestamp": timestamps, "category": category_codes, "claim": claim_codes, "value": values
+                })
+            self._apply(timestamps, category_codes, claim_codes, values)
+        return n
+
+    def query(self, categories=None, start=None, end=None, points=500, method="lttb", resolution=None):
+        """
+        Category series between start and end (seconds, default the whole stored range),
+        downsampled to at most points points per category with "lttb" or "minmax".
+        The finest rollup with at most QUERY_MAX_BUCKETS buckets in range is used unless resolution is given
+        """
+        if method not in DOWNSAMPLING_METHODS:
+            raise ValueError(f"Unknown downsampling method {method}, expected one of {DOWNSAMPLING_METHODS}")
+        if resolution is not None and resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution {resolution}, expected one of {tuple(RESOLUTIONS)}")
+
+        with self.lock:
+            if categories is None:
+                categories = list(self.categories)
+            if self.first_time is None:
+                return {"resolution": resolution, "start": start, "end": end, "method": method,
+                        "series": {name: {"timestamps": [], "values": []} for name in categories}}
+            start = self.first_time if start is None else float(start)
+            end = self.last_time if end is None else float(end)
+            if end < start:
+                raise ValueError("end must not be before start")
+
+            if resolution is None:
+                resolution = next(
+                    (name for name, rollup in self.rollups.items() if rollup.bucket_count(start, end) <= QUERY_MAX_BUCKETS),
+                    "day"
+                )
+            rollup = self.rollups[resolution]
+            if rollup.bucket_count(start, end) > QUERY_MAX_BUCKETS:
+                raise ValueError(f"The time range spans more than {QUERY_MAX_BUCKETS} {resolution} buckets")
+            downsample = lttb if method == "lttb" else minmax
+
+            series = {}
+            for name in categories:
+                timestamps, values = rollup.series(self.category_codes.get(name, -1), start, end)
+                timestamps, values = downsample(timestamps, values, points)
+                series[name] = {"timestamps": timestamps.tolist(), "values": values.tolist()}
+
+        return {"resolution": resolution, "start": start, "end": end, "method": method, "series": series}
+
+    def stats(self):
+        with self.lock:
+            return {
+                "events": self.event_count,
+                "categories": list(self.categories),
+                "claims": len(self.claims),
+                "first_time": self.first_time,
+                "last_time": self.last_time
+            }
+
+    def _code(self, name, names, codes, new_names):
+        code = codes.get(name)
+        if code is None:
+            code = codes[name] = len(names)
+            names.append(name)
+            new_names.append(name)
+        return code
+
+    def _apply(self, timestamps, category_codes, claim_codes, values):
+        for rollup in self.rollups.values():
+            rollup.add(category_codes, timestamps, values)
+        self.event_count += len(timestamps)
+        low, high = float(timestamps.min()), float(timestamps.max())
+        self.first_time = low if self.first_time is None else min(self.first_time, low)
+        self.last_time = high if self.last_time is None else max(self.last_time, high)
+        if self.on_claim_bucket is not None:
+            self._feed_claims(timestamps, claim_codes, values)
+
+    def _feed_claims(self, timestamps, claim_codes, values):
+        """Add events to their claim's open bucket, passing on the buckets that are over."""
+        with_claim = claim_codes >= 0
+        if not np.any(with_claim):
+            return
+        codes = claim_codes[with_claim]
+        buckets = np.floor_divide(timestamps[with_claim], self.claim_step).astype(np.int64)
+        order = np.lexsort((buckets, codes))
+        codes, buckets, values = codes[order], buckets[order], values[with_claim][order].astype(np.float64)
+
+        # Totals per (claim, bucket), then one run of consecutive groups per claim
+        group_starts = np.flatnonzero(np.r_[True, (codes[1:] != codes[:-1]) | (buckets[1:] != buckets[:-1])])
+        group_codes = codes[group_starts]
+        group_buckets = buckets[group_starts]
+        group_totals = np.add.reduceat(values, group_starts)
+        claim_starts = np.flatnonzero(np.r_[True, group_codes[1:] != group_codes[:-1]])
+
+        for start, end in zip(claim_starts, np.r_[claim_starts[1:], len(group_codes)]):
+            code = int(group_codes[start])
+            claim_buckets, totals = group_buckets[start:end], group_totals[start:end]
+            current = self.open_buckets.get(code)
+            if current is not None:
+                # Late events are counted in the open bucket
+                late = claim_buckets <= current[0]
+                current[1] += float(totals[late].sum())
+                claim_buckets, totals = claim_buckets[~late], totals[~late]
+                if len(claim_buckets) == 0:
+                    continue
+                claim_buckets = np.r_[current[0], claim_buckets]
+                totals = np.r_[current[1], totals]
+
+            # Every bucket but the last one is over
+            self.open_buckets[code] = [int(claim_buckets[-1]), float(totals[-1])]
+            if len(claim_buckets) == 1:
+                continue
+
+            # Each closed bucket is followed by the empty buckets before the next one, up to max_gap_buckets
+            next_buckets = claim_buckets[1:]
+            gaps = np.minimum(next_buckets - claim_buckets[:-1] - 1, self.max_gap_buckets)
+            counts = gaps + 1
+            group = np.repeat(np.arange(len(counts)), counts)
+            position = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            closed_buckets = np.where(position == 0, claim_buckets[:-1][group], next_buckets[group] - gaps[group] + position - 1)
+            closed_totals = np.where(position == 0, totals[:-1][group], 0.0)
+            self.on_claim_bucket(self.claims[code], closed_totals.tolist(), (closed_buckets * self.claim_step).tolist())
+
+    def _append_to_disk(self, new_names, columns):
+        # Names first, so every code written to the columns can be resolved after a crash
+        for kind, names in new_names.items():
+            if names:
+                with open(os.path.join(self.directory, f"{kind}.txt"), "a", encoding="utf-8") as f:
+                    f.writelines(name.replace("\n", " ") + "\n" for name in names)
+        for name, dtype in EVENT_COLUMNS.items():
+            with open(os.path.join(self.directory, f"{name}.bin"), "ab") as f:
+                f.write(np.ascontiguousarray(columns[name], dtype=dtype).tobytes())
+
+    def _replay(self):
+        for kind, names, codes in (("categories", self.categories, self.category_codes),
+                                   ("claims", self.claims, self.claim_codes)):
+            path = os.path.join(self.directory, f"{kind}.txt")
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    for name in f.read().splitlines():
+                        codes[name] = len(names)
+                        names.append(name)
+
+        paths = {name: os.path.join(self.directory, f"{name}.bin") for name in EVENT_COLUMNS}
+        rows = min(
+            os.path.getsize(path) // np.dtype(dtype).itemsize if os.path.exists(path) else 0
+            for path, dtype in zip(paths.values(), EVENT_COLUMNS.values())
+        )
+        # Drop the rows of an append that was interrupted between columns
+        for name, dtype in EVENT_COLUMNS.items():
+            if os.path.exists(paths[name]) and os.path.getsize(paths[name]) > rows * np.dtype(dtype).itemsize:
+                with open(paths[name], "r+b") as f:
+                    f.truncate(rows * np.dtype(dtype).itemsize)
+        if rows == 0:
+            return
+
+        columns = {name: np.memmap(paths[name], dtype=dtype, mode="r", shape=(rows,))
+                   for name, dtype in EVENT_COLUMNS.items()}
+        # Replay in blocks so memory stays bounded for long histories
+        for start in range(0, rows, 1 << 22):
+            block = {name: np.array(column[start:start + (1 << 22)]) for name, column in columns.items()}
+            self._apply(block["timestamp"], block["category"], block["claim"], block["value"])
@@ -1,56 +1,64 @@
 // Filter highlight functionality
-function filterHighlight(params) {
-  allNodes = nodes.get({ returnType: "Object" });
-  // if something is selected:
-  if (params.nodes.length > 0) {
-    filterActive = true;
-    let selectedNodes = params.nodes;
+// Only the nodes whose visibility changes are updated. When graphQueryApi is set (graph-lod.js),
+// filters are evaluated by the back end (GET /network/filter) over the whole stored graph
 
-    // hiding all nodes and saving the label
-    for (let nodeId in allNodes) {
-      allNodes[nodeId].hidden = true;
-      if (allNodes[nodeId].savedLabel === undefined) {
-        allNodes[nodeId].savedLabel = allNodes[nodeId].label;
-        allNodes[nodeId].label = undefined;
-      }
-    }
+var filterVisible = null; // Set of the ids of the visible nodes while a filter is active
+var filterQuery = null; // Query string of the current back-end filter
+var filterRequest = 0;
 
-    for (let i = 0; i < selectedNodes.length; i++) {
-      allNodes[selectedNodes[i]].hidden = false;
-      if (allNodes[selectedNodes[i]].savedLabel !== undefined) {
-        allNodes[selectedNodes[i]].label =
-          allNodes[selectedNodes[i]].savedLabel;
-        allNodes[selectedNodes[i]].savedLabel = undefined;
-      }
-    }
-  } else if (filterActive === true) {
-    // reset all nodes
-    for (let nodeId in allNodes) {
-      allNodes[nodeId].hidden = false;
-      if (allNodes[nodeId].savedLabel !== undefined) {
-        allNodes[nodeId].label = allNodes[nodeId].savedLabel;
-        allNodes[nodeId].savedLabel = undefined;
-      }
-    }
-    filterActive = false;
+// Node update showing or hiding a node, hidden nodes keep their label aside
+function filterStyle(node, visible) {
+  const update = { id: node.id, hidden: !visible };
+  if (!visible && node.savedLabel === undefined) {
+    update.savedLabel = node.label;
+    update.label = undefined;
+  } else if (visible && node.savedLabel !== undefined) {
+    update.label = node.savedLabel;
+    update.savedLabel = undefined;
   }
+  return update;
+}
 
-  // transform the object into an array
-  var updateArray = [];
-  if (params.nodes.length > 0) {
-    for (let nodeId in allNodes) {
-      if (allNodes.hasOwnProperty(nodeId)) {
-        updateArray.push(allNodes[nodeId]);
-      }
-    }
-    nodes.update(updateArray);
+// Apply visibility changes (Map of node id -> visible) to the loaded nodes.
+// Entering or leaving the filter touches every node once
+function applyFilterChanges(changes, visible) {
+  const updateArray = [];
+  if (filterVisible === null || visible === null) {
+    nodes.forEach(function (node) {
+      updateArray.push(filterStyle(node, visible === null || visible.has(node.id)));
+    });
   } else {
-    for (let nodeId in allNodes) {
-      if (allNodes.hasOwnProperty(nodeId)) {
-        updateArray.push(allNodes[nodeId]);
+    changes.forEach(function (isVisible, nodeId) {
+      const node = nodes.get(nodeId);
+      if (node !== null) {
+        updateArray.push(filterStyle(node, isVisible));
       }
+    });
+  }
+  filterVisible = visible;
+  filterActive = visible !== null;
+  nodes.update(updateArray);
+}
+
+function filterHighlight(params) {
+  if (params.nodes.length > 0) {
+    const visible = new Set(params.nodes);
+    const changes = new Map();
+    if (filterVisible !== null) {
+      filterVisible.forEach(function (nodeId) {
+        if (!visible.has(nodeId)) changes.set(nodeId, false);
+      });
+      visible.forEach(function (nodeId) {
+        if (!filterVisible.has(nodeId)) changes.set(nodeId, true);
+      });
     }
-    nodes.update(updateArray);
+    filterQuery = null;
+    applyFilterChanges(changes, visible);
+  } else if (filterActive === true) {
+    // reset all nodes
+    filterRequest++;
+    filterQuery = null;
+    applyFilterChanges(null, null);
   }
 }
 
@@ -60,31 +68,66 @@ function selectNodes(nodes) {
   return nodes;
 }
 
+// Filter by a back-end query string (see GET /network/filter), only the changes since the
+// previous query are sent back
+function remoteFilter(query) {
+  const request = ++filterRequest;
+  let url = `${graphQueryApi}/network/filter?${query}`;
+  if (filterQuery !== null) {
+    url += `&previous=${encodeURIComponent(filterQuery)}`;
+  }
+  const previousVisible = filterQuery !== null ? filterVisible : null;
+
+  return fetch(url)
+    .then(function (response) {
+      if (!response.ok) {
+        throw new Error(`Could not filter the graph (${response.status})`);
+      }
+      return response.json();
+    })
+    .then(function (result) {
+      if (request !== filterRequest) return;
+      const visible = new Set(previousVisible || []);
+      const changes = new Map();
+      result.changed.id.forEach(function (nodeId, i) {
+        const isVisible = result.changed.visible[i] > 0;
+        changes.set(nodeId, isVisible);
+        if (isVisible) visible.add(nodeId);
+        else visible.delete(nodeId);
+      });
+      if (previousVisible === null) {
+        filterVisible = null;
+      }
+      filterQuery = query;
+      applyFilterChanges(changes, visible);
+    })
+    .catch(function (error) {
+      console.error(error);
+    });
+}
+
 function highlightFilter(filter) {
-  let selectedNodes = [];
   let selectedProp = filter["property"];
+  // Community filters of a graph served by the back end are evaluated there
+  if (graphQueryApi !== null && filter["item"] === "node" && selectedProp === "group") {
+    return remoteFilter(`community=${encodeURIComponent(filter["value"].join(","))}`);
+  }
+
+  let selectedNodes = [];
   if (filter["item"] === "node") {
-    let allNodes = nodes.get({ returnType: "Object" });
-    for (let nodeId in allNodes) {
-      if (
-        allNodes[nodeId][selectedProp] &&
-        filter["value"].includes(allNodes[nodeId][selectedProp].toString())
-      ) {
-        selectedNodes.push(nodeId);
+    nodes.forEach(function (node) {
+      if (node[selectedProp] && filter["value"].includes(node[selectedProp].toString())) {
+        selectedNodes.push(node.id);
       }
-    }
+    });
   } else if (filter["item"] === "edge") {
-    let allEdges = edges.get({ returnType: "object" });
     // check if the selected property exists for selected edge and select the nodes connected to the edge
-    for (let edge in allEdges) {
-      if (
-        allEdges[edge][selectedProp] &&
-        filter["value"].includes(allEdges[edge][selectedProp].toString())
-      ) {
-        selectedNodes.push(allEdges[edge]["from"]);
-        selectedNodes.push(allEdges[edge]["to"]);
+    edges.forEach(function (edge) {
+      if (edge[selectedProp] && filter["value"].includes(edge[selectedProp].toString())) {
+        selectedNodes.push(edge["from"]);
+        selectedNodes.push(edge["to"]);
       }
-    }
+    });
   }
-  selectNodes(selectedNodes);
+  selectNodes([...new Set(selectedNodes)]);
 }
@@ -1,100 +1,150 @@
 // Neighborhood highlight functionality
-function neighbourhoodHighlight(params) {
-  // console.log("in nieghbourhoodhighlight");
-  allNodes = nodes.get({ returnType: "Object" });
-  // originalNodes = JSON.parse(JSON.stringify(allNodes));
-  // if something is selected:
-  if (params.nodes.length > 0) {
-    highlightActive = true;
-    var i, j;
-    var selectedNode = params.nodes[0];
-    var degrees = 2;
+// Only the nodes whose highlight level changes are updated: the selected node is level 0, its
+// neighbours the number of hops to it, every other node is dimmed while a node is selected.
+// When graphQueryApi is set (graph-lod.js), the levels are computed by the back end
+// (GET /network/neighbourhood/<id>) instead of walking the loaded graph
 
-    // mark all nodes as hard to read.
-    for (let nodeId in allNodes) {
-      // nodeColors[nodeId] = allNodes[nodeId].color;
-      allNodes[nodeId].color = "rgba(200,200,200,0.5)";
-      if (allNodes[nodeId].hiddenLabel === undefined) {
-        allNodes[nodeId].hiddenLabel = allNodes[nodeId].label;
-        allNodes[nodeId].label = undefined;
-      }
-    }
-    var connectedNodes = network.getConnectedNodes(selectedNode);
-    var allConnectedNodes = [];
+var highlightDegrees = 2;
+var highlightLevels = null; // Node id -> level of the current highlight, null when nothing is selected
+var highlightedNode = null;
+var highlightRequest = 0;
+var graphQueryApi = null;
 
-    // get the second degree nodes
-    for (i = 1; i < degrees; i++) {
-      for (j = 0; j < connectedNodes.length; j++) {
-        allConnectedNodes = allConnectedNodes.concat(
-          network.getConnectedNodes(connectedNodes[j])
-        );
-      }
-    }
+const DIMMED_COLOR = "rgba(200,200,200,0.5)";
+const SECOND_DEGREE_COLOR = "rgba(150,150,150,0.75)";
 
-    // all second degree nodes get a different color and their label back
-    for (i = 0; i < allConnectedNodes.length; i++) {
-      // allNodes[allConnectedNodes[i]].color = "pink";
-      allNodes[allConnectedNodes[i]].color = "rgba(150,150,150,0.75)";
-      if (allNodes[allConnectedNodes[i]].hiddenLabel !== undefined) {
-        allNodes[allConnectedNodes[i]].label =
-          allNodes[allConnectedNodes[i]].hiddenLabel;
-        allNodes[allConnectedNodes[i]].hiddenLabel = undefined;
-      }
+// Node update giving a node the style of a level, or dimming it when level is undefined
+function highlightStyle(node, level) {
+  const update = { id: node.id };
+  if (level === undefined) {
+    update.color = DIMMED_COLOR;
+    if (node.hiddenLabel === undefined) {
+      update.hiddenLabel = node.label;
+      update.label = undefined;
     }
+    return update;
+  }
+  update.color = level <= 1 ? nodeColors[node.id] : SECOND_DEGREE_COLOR;
+  if (node.hiddenLabel !== undefined) {
+    update.label = node.hiddenLabel;
+    update.hiddenLabel = undefined;
+  }
+  return update;
+}
 
-    // all first degree nodes get their own color and their label back
-    for (i = 0; i < connectedNodes.length; i++) {
-      // allNodes[connectedNodes[i]].color = undefined;
-      allNodes[connectedNodes[i]].color = nodeColors[connectedNodes[i]];
-      if (allNodes[connectedNodes[i]].hiddenLabel !== undefined) {
-        allNodes[connectedNodes[i]].label =
-          allNodes[connectedNodes[i]].hiddenLabel;
-        allNodes[connectedNodes[i]].hiddenLabel = undefined;
+// Levels of the nodes within degrees hops of selectedNode, each node visited once
+function neighbourhoodLevels(selectedNode, degrees) {
+  const levels = new Map([[selectedNode, 0]]);
+  let frontier = [selectedNode];
+  for (let hop = 1; hop <= degrees && frontier.length > 0; hop++) {
+    const next = [];
+    for (const nodeId of frontier) {
+      for (const neighbour of network.getConnectedNodes(nodeId)) {
+        if (!levels.has(neighbour)) {
+          levels.set(neighbour, hop);
+          next.push(neighbour);
+        }
       }
     }
+    frontier = next;
+  }
+  return levels;
+}
 
-    // the main node gets its own color and its label back.
-    // allNodes[selectedNode].color = undefined;
-    allNodes[selectedNode].color = nodeColors[selectedNode];
-    if (allNodes[selectedNode].hiddenLabel !== undefined) {
-      allNodes[selectedNode].label = allNodes[selectedNode].hiddenLabel;
-      allNodes[selectedNode].hiddenLabel = undefined;
-    }
-  } else if (highlightActive === true) {
-    // console.log("highlightActive was true");
-    // reset all nodes
-    for (let nodeId in allNodes) {
-      // allNodes[nodeId].color = "purple";
-      allNodes[nodeId].color = nodeColors[nodeId];
-      // delete allNodes[nodeId].color;
-      if (allNodes[nodeId].hiddenLabel !== undefined) {
-        allNodes[nodeId].label = allNodes[nodeId].hiddenLabel;
-        allNodes[nodeId].hiddenLabel = undefined;
+// Apply the level changes to the loaded nodes, changes is a Map of node id -> new level
+// (undefined to dim). Entering or leaving the highlight touches every node once
+function applyHighlightChanges(changes, levels) {
+  const updateArray = [];
+  if (highlightLevels === null && levels !== null) {
+    nodes.forEach(function (node) {
+      updateArray.push(highlightStyle(node, levels.get(node.id)));
+    });
+  } else if (levels === null) {
+    nodes.forEach(function (node) {
+      const update = highlightStyle(node, 0);
+      update.color = nodeColors[node.id];
+      updateArray.push(update);
+    });
+  } else {
+    changes.forEach(function (level, nodeId) {
+      const node = nodes.get(nodeId);
+      if (node !== null) {
+        updateArray.push(highlightStyle(node, level));
       }
-    }
-    highlightActive = false;
+    });
   }
+  highlightLevels = levels;
+  highlightActive = levels !== null;
+  nodes.update(updateArray);
+}
 
-  // transform the object into an array
-  var updateArray = [];
-  if (params.nodes.length > 0) {
-    for (let nodeId in allNodes) {
-      if (allNodes.hasOwnProperty(nodeId)) {
-        // console.log(allNodes[nodeId]);
-        updateArray.push(allNodes[nodeId]);
+// Highlight changes between the current levels and new levels computed in the browser
+function localHighlightChanges(levels) {
+  const changes = new Map();
+  if (highlightLevels !== null) {
+    highlightLevels.forEach(function (level, nodeId) {
+      if (levels.get(nodeId) !== level) changes.set(nodeId, levels.get(nodeId));
+    });
+  }
+  levels.forEach(function (level, nodeId) {
+    if (highlightLevels === null || highlightLevels.get(nodeId) !== level) changes.set(nodeId, level);
+  });
+  return changes;
+}
+
+// Ask the back end which nodes change level, only node ids it knows (numbers) can be queried
+function remoteHighlight(selectedNode) {
+  const request = ++highlightRequest;
+  let url = `${graphQueryApi}/network/neighbourhood/${selectedNode}?hops=${highlightDegrees}`;
+  if (highlightLevels !== null && typeof highlightedNode === "number") {
+    url += `&previous=${highlightedNode}`;
+  }
+  const previousLevels = highlightLevels === null || typeof highlightedNode !== "number" ? null : highlightLevels;
+
+  fetch(url)
+    .then(function (response) {
+      if (!response.ok) {
+        throw new Error(`Could not load the neighbourhood of ${selectedNode} (${response.status})`);
       }
-    }
-    nodes.update(updateArray);
-  } else {
-    // console.log("Nothing was selected");
-    for (let nodeId in allNodes) {
-      if (allNodes.hasOwnProperty(nodeId)) {
-        // console.log(allNodes[nodeId]);
-        // allNodes[nodeId].color = {};
-        updateArray.push(allNodes[nodeId]);
+      return response.json();
+    })
+    .then(function (result) {
+      // A later click was made while this one was loading
+      if (request !== highlightRequest) return;
+      const levels = new Map(previousLevels || []);
+      const changes = new Map();
+      result.changed.id.forEach(function (nodeId, i) {
+        const level = result.changed.level[i] < 0 ? undefined : result.changed.level[i];
+        changes.set(nodeId, level);
+        if (level === undefined) levels.delete(nodeId);
+        else levels.set(nodeId, level);
+      });
+      if (previousLevels === null) {
+        highlightLevels = null;
       }
+      highlightedNode = selectedNode;
+      applyHighlightChanges(changes, levels);
+    })
+    .catch(function (error) {
+      console.error(error);
+    });
+}
+
+function neighbourhoodHighlight(params) {
+  if (params.nodes.length > 0) {
+    const selectedNode = params.nodes[0];
+    if (graphQueryApi !== null && typeof selectedNode === "number") {
+      remoteHighlight(selectedNode);
+      return;
     }
-    nodes.update(updateArray);
+    const levels = neighbourhoodLevels(selectedNode, highlightDegrees);
+    highlightedNode = selectedNode;
+    applyHighlightChanges(localHighlightChanges(levels), levels);
+  } else if (highlightActive === true) {
+    // reset all nodes
+    highlightRequest++;
+    highlightedNode = null;
+    applyHighlightChanges(null, null);
   }
 }
 
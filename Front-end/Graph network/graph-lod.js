@@ -0,0 +1,325 @@
+// Level-of-detail loader for large graphs served by the back end (GET /network/...)
+// The graph starts collapsed to one node per community. Double-clicking a community expands it page
+// by page, zooming in loads the nodes of the visible area, so the browser only ever holds a bounded
+// part of the graph at the positions precomputed by the pipeline
+
+// API location, can be overridden with ?api=<url>
+function apiUrl() {
+  const params = new URLSearchParams(window.location.search);
+  return params.get("api") || "http://localhost:8000";
+}
+
+const PAGE_NODES = 500;
+const MAX_LOADED_NODES = 20000; // Expanded communities are collapsed again, oldest first, above this
+const VIEWPORT_MIN_SCALE = 1.5; // Zoom level from which the visible area is loaded
+const VIEWPORT_NODES = 1000;
+
+var graphVersion = null;
+var superGraph = null; // Community-collapsed graph, kept to collapse communities again
+var expanded = new Map(); // Community id -> {nextPage, nodeIds}, in expansion order
+var viewportNodeIds = new Set();
+var viewportTimer = null;
+
+function communityNodeId(community) {
+  return `c${community}`;
+}
+
+function fetchJson(path) {
+  return fetch(`${apiUrl()}${path}`).then(function (response) {
+    if (!response.ok) {
+      throw new Error(`Could not load ${path} (${response.status})`);
+    }
+    return response.json();
+  });
+}
+
+// Node entries of the columnar node payload of /network/communities/<id> and /network/viewport
+function payloadNodes(columns) {
+  const nodeData = new Array(columns.id.length);
+  for (let i = 0; i < columns.id.length; i++) {
+    nodeData[i] = {
+      id: columns.id[i],
+      label: columns.label[i],
+      x: columns.x ? columns.x[i] : undefined,
+      y: columns.y ? columns.y[i] : undefined,
+      group: columns.community[i],
+      color: columns.color[i],
+      size: columns.size[i],
+      shape: "dot",
+      font: { color: "#36454F" },
+    };
+  }
+  return nodeData;
+}
+
+// Edge entries of a columnar edge payload, ids are prefixed for community edges
+function payloadEdges(columns, toId) {
+  const edgeData = new Array(columns.source.length);
+  for (let i = 0; i < columns.source.length; i++) {
+    const from = toId(columns.source[i]);
+    const to = toId(columns.target[i]);
+    edgeData[i] = {
+      id: `${from}-${to}`,
+      from: from,
+      to: to,
+      width: columns.count ? Math.log2(1 + columns.count[i]) : columns.weight[i],
+      title: columns.count
+        ? `${columns.count[i]} edges, total similarity ${columns.weight[i].toFixed(2)}`
+        : `Similarity: ${columns.weight[i].toFixed(2)}`,
+    };
+  }
+  return edgeData;
+}
+
+// Add nodes and edges, skipping edges to nodes that are not loaded
+function addToGraph(nodeData, edgeData) {
+  nodes.update(nodeData);
+  edges.update(
+    edgeData.filter(function (edge) {
+      return nodes.get(edge.from) !== null && nodes.get(edge.to) !== null;
+    })
+  );
+  nodeData.forEach(function (node) {
+    nodeColors[node.id] = node.color;
+  });
+}
+
+function removeNodes(nodeIds) {
+  const removed = new Set(nodeIds);
+  edges.remove(
+    edges.getIds({
+      filter: function (edge) {
+        return removed.has(edge.from) || removed.has(edge.to);
+      },
+    })
+  );
+  nodes.remove(nodeIds);
+}
+
+// Community nodes and edges of the super-graph, for the communities that are collapsed
+function superGraphData(communities) {
+  const columns = superGraph.nodes;
+  const nodeData = [];
+  for (let i = 0; i < columns.id.length; i++) {
+    if (communities && !communities.has(columns.id[i])) continue;
+    nodeData.push({
+      id: communityNodeId(columns.id[i]),
+      label: `${columns.label[i]} (${columns.size[i]})`,
+      x: columns.x ? columns.x[i] : undefined,
+      y: columns.y ? columns.y[i] : undefined,
+      group: columns.id[i],
+      color: columns.color[i],
+      size: 10 + 3 * Math.sqrt(columns.size[i]),
+      shape: "dot",
+      font: { color: "#36454F" },
+      community: columns.id[i],
+    });
+  }
+  return { nodes: nodeData, edges: payloadEdges(superGraph.edges, communityNodeId) };
+}
+
+// Load the next page of a community, replacing its community node on the first page
+function expandCommunity(community) {
+  const state = expanded.get(community) || { nextPage: 0, nodeIds: [] };
+  if (state.nextPage === null) return Promise.resolve();
+
+  return fetchJson(`/network/communities/${community}?page=${state.nextPage}&budget=${PAGE_NODES}`).then(
+    function (result) {
+      if (result.version !== graphVersion) return loadGraph();
+      if (state.nextPage === 0) {
+        removeNodes([communityNodeId(community)]);
+      }
+      const nodeData = payloadNodes(result.nodes);
+      addToGraph(nodeData, payloadEdges(result.edges, Number));
+      state.nodeIds = state.nodeIds.concat(result.nodes.id);
+      state.nextPage = result.next_page;
+      // Keep the expansion order, most recent last
+      expanded.delete(community);
+      expanded.set(community, state);
+      enforceNodeBudget(community);
+    }
+  );
+}
+
+// Put a community back as a single node
+function collapseCommunity(community) {
+  const state = expanded.get(community);
+  if (!state) return;
+  expanded.delete(community);
+  removeNodes(state.nodeIds.filter((id) => !viewportNodeIds.has(id)));
+  const data = superGraphData(new Set([community]));
+  addToGraph(data.nodes, data.edges);
+}
+
+function enforceNodeBudget(keep) {
+  for (const community of expanded.keys()) {
+    if (nodes.length <= MAX_LOADED_NODES) break;
+    if (community !== keep) collapseCommunity(community);
+  }
+}
+
+// Load the nodes of the visible area when zoomed in, replacing those of the previous area
+function loadViewport() {
+  if (network.getScale() < VIEWPORT_MIN_SCALE || !superGraph.nodes.x) {
+    return;
+  }
+  const topLeft = network.DOMtoCanvas({ x: 0, y: 0 });
+  const bottomRight = network.DOMtoCanvas({ x: container.clientWidth, y: container.clientHeight });
+  const query = `x0=${topLeft.x}&y0=${topLeft.y}&x1=${bottomRight.x}&y1=${bottomRight.y}&budget=${VIEWPORT_NODES}`;
+
+  fetchJson(`/network/viewport?${query}`).then(function (result) {
+    if (result.version !== graphVersion) return loadGraph();
+    const expandedIds = new Set();
+    expanded.forEach((state) => state.nodeIds.forEach((id) => expandedIds.add(id)));
+    const stale = [...viewportNodeIds].filter((id) => !expandedIds.has(id));
+    viewportNodeIds = new Set(result.nodes.id);
+    removeNodes(stale.filter((id) => !viewportNodeIds.has(id)));
+    addToGraph(payloadNodes(result.nodes), payloadEdges(result.edges, Number));
+  });
+}
+
+// Show a node found by the search box, adding it on its own when its community is not expanded
+function focusNode(row) {
+  if (nodes.get(row.id) === null) {
+    viewportNodeIds.add(row.id);
+    addToGraph(
+      payloadNodes({
+        id: [row.id],
+        label: [row.label],
+        x: row.x === undefined ? undefined : [row.x],
+        y: row.y === undefined ? undefined : [row.y],
+        community: [row.community],
+        color: [row.color],
+        size: [row.size],
+      }),
+      []
+    );
+  }
+  network.focus(row.id, { scale: VIEWPORT_MIN_SCALE });
+  selectNode([row.id]);
+}
+
+// Search box over the node labels of the whole graph (GET /network/search)
+function setupNodeSearch() {
+  const rows = {};
+  new TomSelect("#select-node", {
+    valueField: "id",
+    labelField: "label",
+    searchField: [],
+    load: function (query, callback) {
+      fetchJson(`/network/search?q=${encodeURIComponent(query)}`)
+        .then(function (result) {
+          const columns = result.nodes;
+          callback(
+            columns.id.map(function (id, i) {
+              rows[id] = {
+                id: id,
+                label: columns.label[i],
+                x: columns.x ? columns.x[i] : undefined,
+                y: columns.y ? columns.y[i] : undefined,
+                community: columns.community[i],
+                color: columns.color[i],
+                size: columns.size[i],
+              };
+              return rows[id];
+            })
+          );
+        })
+        .catch(function () {
+          callback();
+        });
+    },
+    onChange: function (value) {
+      if (rows[value]) focusNode(rows[value]);
+    },
+  });
+}
+
+function scheduleViewportLoad() {
+  clearTimeout(viewportTimer);
+  viewportTimer = setTimeout(loadViewport, 250);
+}
+
+// Fetch the super-graph and draw it at the centres of the communities
+function loadGraph() {
+  return fetchJson("/network/communities").then(function (result) {
+    graphVersion = result.version;
+    superGraph = result;
+    expanded = new Map();
+    viewportNodeIds = new Set();
+    nodeColors = {};
+    nodes.clear();
+    edges.clear();
+    const data = superGraphData(null);
+    addToGraph(data.nodes, data.edges);
+  });
+}
+
+function drawLodGraph() {
+  container = document.getElementById("mynetwork");
+  nodes = new vis.DataSet([]);
+  edges = new vis.DataSet([]);
+  nodeColors = {};
+  data = { nodes: nodes, edges: edges };
+
+  options = {
+    configure: {
+      enabled: false,
+    },
+    edges: {
+      color: {
+        inherit: true,
+      },
+      smooth: false,
+    },
+    interaction: {
+      dragNodes: true,
+      hideEdgesOnDrag: true,
+      hideNodesOnDrag: false,
+    },
+    layout: {
+      improvedLayout: false,
+    },
+    physics: {
+      enabled: false,
+    },
+  };
+
+  network = new vis.Network(container, data, options);
+  // Highlights and filters are computed by the back end over the whole graph
+  graphQueryApi = apiUrl();
+
+  // Double-click a community to expand it, a node of an expanded community to load its next page,
+  // or to collapse the community once every page is loaded
+  network.on("doubleClick", function (params) {
+    if (params.nodes.length === 0) return;
+    const node = nodes.get(params.nodes[0]);
+    if (node.community !== undefined) {
+      expandCommunity(node.community);
+    } else if (expanded.has(node.group) && expanded.get(node.group).nextPage !== null) {
+      expandCommunity(node.group);
+    } else {
+      collapseCommunity(node.group);
+    }
+  });
+  network.on("selectNode", neighbourhoodHighlight);
+  network.on("zoom", scheduleViewportLoad);
+  network.on("dragEnd", scheduleViewportLoad);
+  setupNodeSearch();
+
+  return loadGraph()
+    .then(function () {
+      document.getElementById("loadingBar").style.display = "none";
+      network.fit();
+      return network;
+    })
+    .catch(function (error) {
+      document.getElementById("text").innerHTML = "Error";
+      console.error(error);
+    });
+}
+
+// Load the graph when the page is loaded
+document.addEventListener("DOMContentLoaded", function () {
+  drawLodGraph();
+});
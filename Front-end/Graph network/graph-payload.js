@@ -0,0 +1,104 @@
+// Loader for the precomputed graph payload written by Back-end/Graph/generate_graph.py
+// Node positions are computed by the pipeline, so the network is drawn with physics turned off
+
+// Payload location, can be overridden with ?data=<url>
+function payloadUrl() {
+  const params = new URLSearchParams(window.location.search);
+  return params.get("data") || "graph.json";
+}
+
+// Build the node and edge datasets from the columnar payload
+function payloadToDataSets(payload) {
+  const columns = payload.nodes;
+  const palette = {};
+  payload.communities.id.forEach(function (id, i) {
+    palette[id] = payload.communities.color[i];
+  });
+
+  const nodeData = new Array(columns.id.length);
+  for (let i = 0; i < columns.id.length; i++) {
+    nodeData[i] = {
+      id: columns.id[i],
+      label: columns.label[i],
+      x: columns.x[i],
+      y: columns.y[i],
+      group: columns.community[i],
+      color: palette[columns.community[i]],
+      size: columns.size[i],
+      shape: "dot",
+      font: { color: "#36454F" },
+    };
+  }
+
+  const edgeColumns = payload.edges;
+  const edgeData = new Array(edgeColumns.source.length);
+  for (let i = 0; i < edgeColumns.source.length; i++) {
+    edgeData[i] = {
+      from: columns.id[edgeColumns.source[i]],
+      to: columns.id[edgeColumns.target[i]],
+      width: edgeColumns.weight[i],
+      title: `Similarity: ${edgeColumns.weight[i].toFixed(2)}`,
+    };
+  }
+
+  return { nodes: new vis.DataSet(nodeData), edges: new vis.DataSet(edgeData) };
+}
+
+// Fetch the payload and draw it at its precomputed positions
+function drawPayloadGraph(url) {
+  container = document.getElementById("mynetwork");
+
+  return fetch(url)
+    .then(function (response) {
+      if (!response.ok) {
+        throw new Error(`Could not load ${url} (${response.status})`);
+      }
+      return response.json();
+    })
+    .then(function (payload) {
+      data = payloadToDataSets(payload);
+      nodes = data.nodes;
+      edges = data.edges;
+
+      options = {
+        configure: {
+          enabled: false,
+        },
+        edges: {
+          color: {
+            inherit: true,
+          },
+          // Straight edges are much cheaper to draw than dynamic curves
+          smooth: false,
+        },
+        interaction: {
+          dragNodes: true,
+          hideEdgesOnDrag: true,
+          hideNodesOnDrag: false,
+        },
+        layout: {
+          improvedLayout: false,
+        },
+        physics: {
+          enabled: false,
+        },
+      };
+
+      network = new vis.Network(container, data, options);
+      network.on("selectNode", neighbourhoodHighlight);
+
+      storeNodeColors();
+      populateNodeDropdown();
+      document.getElementById("loadingBar").style.display = "none";
+      return network;
+    })
+    .catch(function (error) {
+      document.getElementById("text").innerHTML = "Error";
+      console.error(error);
+    });
+}
+
+// Load the graph when the page is loaded
+document.addEventListener("DOMContentLoaded", function () {
+  drawPayloadGraph(payloadUrl());
+});